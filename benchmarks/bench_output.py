@@ -0,0 +1,80 @@
+"""Count the bytes and flushes superprompt() writes to the terminal per run
+
+Each run prints a banner of --prints "print" questions before every one of
+--questions text questions, answered through a pipe input, and writes to a terminal
+output whose stream counts what reaches it.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_output [--prints N] [--questions Q] [--repeat R]
+"""
+
+import argparse
+import io
+import statistics
+
+from prompt_toolkit.application import create_app_session
+from prompt_toolkit.data_structures import Size
+from prompt_toolkit.input.defaults import create_pipe_input
+from prompt_toolkit.output.vt100 import Vt100_Output
+
+from superprompt import superprompt
+
+
+class CountingStream(io.StringIO):
+    """Terminal stream that counts the characters written and the flushes"""
+
+    def __init__(self):
+        super().__init__()
+        self.flushes = 0
+
+    def flush(self):
+        self.flushes += 1
+
+    def isatty(self):
+        return True
+
+
+def make_questions(prints, questions):
+    """Return questions with a banner of prints "print" questions before each text
+    question"""
+    result = []
+    for i in range(questions):
+        for j in range(prints):
+            result.append(
+                {"type": "print", "message": f"Banner {i} line {j}", "style": "bold"}
+            )
+        result.append({"name": f"q{i}", "type": "text", "message": f"Q{i}?"})
+    return result
+
+
+def measure(questions, text):
+    """Return the bytes written and flushes made answering questions with text"""
+    stream = CountingStream()
+    output = Vt100_Output(stream, lambda: Size(rows=24, columns=80), term="xterm")
+    with create_pipe_input() as inp, create_app_session(output=output):
+        inp.send_text(text)
+        superprompt(questions, input=inp, output=output)
+    return len(stream.getvalue().encode()), stream.flushes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prints", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    questions = make_questions(args.prints, args.questions)
+    text = "x\r" * args.questions
+    results = [measure(questions, text) for _ in range(args.repeat)]
+    written = statistics.median(size for size, _ in results)
+    flushes = statistics.median(count for _, count in results)
+    print(
+        f"{args.questions} questions, {args.prints} prints before each: "
+        f"{written:.0f} bytes, {flushes:.0f} flushes per run"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Measure per-question latency of superprompt() with and without session=True
+
+Run from the repository root:
+
+    python -m benchmarks.bench_session [--questions N] [--repeat R]
+"""
+
+import argparse
+import statistics
+import time
+
+from prompt_toolkit.input.defaults import create_pipe_input
+from prompt_toolkit.output import DummyOutput
+
+from superprompt import superprompt
+
+
+def make_questions(n):
+    """Return n questions cycling through text, confirm and select"""
+    questions = []
+    for i in range(n):
+        if i % 3 == 0:
+            questions.append({"name": f"q{i}", "type": "text", "message": f"Q{i}?"})
+        elif i % 3 == 1:
+            questions.append({"name": f"q{i}", "type": "confirm", "message": f"Q{i}?"})
+        else:
+            questions.append(
+                {
+                    "name": f"q{i}",
+                    "type": "select",
+                    "message": f"Q{i}?",
+                    "choices": ["a", "b", "c"],
+                }
+            )
+    return questions
+
+
+def make_input(n):
+    """Return keystrokes answering the questions from make_questions(n)"""
+    return "".join(["text\r", "y", "\r"][i % 3] for i in range(n))
+
+
+def time_run(questions, text, session):
+    """Return seconds taken to answer questions with text"""
+    with create_pipe_input() as inp:
+        inp.send_text(text)
+        start = time.perf_counter()
+        superprompt(questions, input=inp, output=DummyOutput(), session=session)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    questions = make_questions(args.questions)
+    text = make_input(args.questions)
+    for session in (False, True):
+        times = [time_run(questions, text, session) for _ in range(args.repeat)]
+        per_question = statistics.median(times) / args.questions * 1000
+        print(f"session={session!s:<5} {per_question:.3f} ms/question")
+
+
+if __name__ == "__main__":
+    main()
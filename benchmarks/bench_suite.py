@@ -0,0 +1,142 @@
+"""Measure the cost of superprompt() per question for synthetic question trees
+
+Each tree is answered three ways:
+
+    traversal   - questionary's prompts are replaced with stubs that answer immediately,
+                  measuring the cost of walking the tree
+    headless    - answered from responses (no prompts are created)
+    end_to_end  - real prompts answered through a pipe input with DummyOutput
+                  (only for trees with at most --end-to-end-limit questions)
+
+Run from the repository root:
+
+    python -m benchmarks.bench_suite [--output results.json]
+        [--baseline baseline.json [--threshold 0.25]]
+
+With --baseline, the run fails (exit status 1) if any measurement is more than
+threshold (a fraction) slower than in the baseline results.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+from prompt_toolkit.input.defaults import create_pipe_input
+from prompt_toolkit.output import DummyOutput
+
+import superprompt
+from benchmarks.trees import answer_tree, make_tree, stubbed_prompts
+
+# name: make_tree() arguments
+CASES = {
+    "flat": dict(depth=1, width=200),
+    "deep": dict(depth=200, width=1),
+    "multiple": dict(depth=1, width=10, multiple=20),
+    "if": dict(depth=5, width=40, if_density=0.5),
+    "mixed": dict(depth=10, width=10, multiple=-3, if_density=0.3),
+    "small": dict(depth=3, width=4, multiple=2, if_density=0.5),
+}
+
+
+def best_time(func, repeat):
+    """Return the shortest time, in seconds, taken by func() over repeat calls"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_case(questions, repeat, end_to_end_limit):
+    """Return the measurements for questions, in microseconds per question asked"""
+    plan = superprompt.compile_questions(questions)
+    answers, asked, keystrokes = answer_tree(plan)
+    n = len(asked)
+    result = {"questions": n}
+
+    def traversal():
+        superprompt.superprompt(plan)
+
+    with stubbed_prompts():
+        result["traversal"] = best_time(traversal, repeat) / n * 1e6
+
+    result["headless"] = (
+        best_time(lambda: superprompt.superprompt(plan, responses=answers), repeat)
+        / n
+        * 1e6
+    )
+
+    if n <= end_to_end_limit:
+
+        def end_to_end():
+            with create_pipe_input() as inp:
+                inp.send_text(keystrokes)
+                superprompt.superprompt(plan, input=inp, output=DummyOutput())
+
+        # real prompts are slow, so fewer repeats are needed to get a stable time
+        result["end_to_end"] = best_time(end_to_end, max(1, repeat // 5)) / n * 1e6
+    return result
+
+
+def regressions(results, baseline, threshold):
+    """Return a description of each measurement in results that is more than threshold
+    slower than in baseline"""
+    found = []
+    for case, measurements in results["cases"].items():
+        for metric, value in measurements.items():
+            if metric == "questions":
+                continue
+            before = baseline.get("cases", {}).get(case, {}).get(metric)
+            if before and value > before * (1 + threshold):
+                found.append(
+                    f"{case}.{metric}: {value:.1f} us/question, was {before:.1f} "
+                    f"({value / before - 1:+.0%})"
+                )
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--end-to-end-limit", type=int, default=60)
+    parser.add_argument("--case", action="append", choices=sorted(CASES))
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cases": {},
+    }
+    for name in args.case or CASES:
+        result = run_case(make_tree(**CASES[name]), args.repeat, args.end_to_end_limit)
+        results["cases"][name] = result
+        timings = "  ".join(
+            f"{metric}={value:.1f}"
+            for metric, value in result.items()
+            if metric != "questions"
+        )
+        print(f"{name:<10} {result['questions']:>5} questions  {timings} us/question")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        found = regressions(results, baseline, args.threshold)
+        for regression in found:
+            print(f"REGRESSION {regression}")
+        if found:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
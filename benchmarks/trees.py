@@ -0,0 +1,103 @@
+"""Synthetic question trees and stubbed prompts for benchmarking superprompt()"""
+
+import contextlib
+import random
+
+import superprompt
+
+# answer given by the stub prompts, and the keystrokes that give it at a real prompt
+STUB_ANSWERS = {"text": "x", "confirm": True}
+KEYSTROKES = {"text": "x\r", "confirm": "y"}
+
+
+def make_tree(depth=1, width=10, multiple=0, if_density=0.0, seed=0):
+    """Return a synthetic list of questions
+
+    Args:
+        depth: number of levels of nested "dict" groups
+        width: number of questions at each level, in addition to the nested group
+        multiple: if non-zero, the "multiple" option of every text question
+        if_density: fraction of the questions that are confirms with an "if" branch
+            asking one more text question
+        seed: seed for choosing which questions have an "if" branch
+    """
+    rng = random.Random(seed)
+    questions = []
+    level = questions
+    for d in range(depth):
+        for w in range(width):
+            name = f"q{d}_{w}"
+            if rng.random() < if_density:
+                branch = {"name": f"{name}_if", "type": "text", "message": "If?"}
+                level.append(
+                    {
+                        "name": name,
+                        "type": "confirm",
+                        "message": f"{name}?",
+                        "if": [True, [_with_multiple(branch, multiple)]],
+                    }
+                )
+            else:
+                question = {"name": name, "type": "text", "message": f"{name}?"}
+                level.append(_with_multiple(question, multiple))
+        if d < depth - 1:
+            group = {"name": f"group{d}", "type": "dict", "questions": []}
+            level.append(group)
+            level = group["questions"]
+    return questions
+
+
+def _with_multiple(question, multiple):
+    """Return question with the "multiple" option set, if multiple is non-zero"""
+    if multiple:
+        question = dict(question, multiple=multiple, multiple_message="Another?")
+    return question
+
+
+class StubQuestion:
+    """Stand-in for a questionary Question that answers immediately"""
+
+    __slots__ = ("answer",)
+
+    def __init__(self, answer):
+        self.answer = answer
+
+    def unsafe_ask(self, patch_stdout=False):
+        return self.answer
+
+    async def unsafe_ask_async(self, patch_stdout=False):
+        return self.answer
+
+
+@contextlib.contextmanager
+def stubbed_prompts(asked=None):
+    """Replace superprompt's prompts with StubQuestion for the duration of the context
+
+    Args:
+        asked: if given, a list that the type of every question asked is appended to
+    """
+
+    def prompt_by_name(_type):
+        def prompt(*args, **kwargs):
+            if asked is not None:
+                asked.append(_type)
+            return StubQuestion(STUB_ANSWERS[_type])
+
+        return prompt
+
+    saved = superprompt.prompt_by_name, superprompt.confirm
+    superprompt.prompt_by_name = prompt_by_name
+    superprompt.confirm = prompt_by_name("confirm")
+    try:
+        yield
+    finally:
+        superprompt.prompt_by_name, superprompt.confirm = saved
+
+
+def answer_tree(questions):
+    """Return the answers, the types of question asked and the keystrokes that answer
+    questions at real prompts"""
+    asked = []
+    with stubbed_prompts(asked):
+        answers = superprompt.superprompt(questions)
+    return answers, asked, "".join(KEYSTROKES[_type] for _type in asked)
@@ -1,50 +1,1210 @@
 """superprompt extension for questionary's prompt method"""
 
-from typing import Any, Dict, Iterable, Mapping, Optional, Union
+import functools
+import itertools
+import os
+import sys
+import time
+from collections import OrderedDict, deque
+from collections.abc import Awaitable as AwaitableABC
+from collections.abc import MutableMapping
+from types import CoroutineType, MappingProxyType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    FrozenSet,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
-from questionary import confirm, prompt
-from questionary.constants import DEFAULT_KBI_MESSAGE
-from questionary.prompt import PromptParameterException
-from questionary.prompts.common import print_formatted_text
+# questionary and prompt_toolkit are imported when first needed, not when superprompt is
+# imported, so scripts that never prompt (or only answer headlessly) don't pay for them
+if TYPE_CHECKING:  # pragma: no cover
+    import concurrent.futures
 
+    from prompt_toolkit.application import Application
+    from questionary.question import Question
 
-def superprompt(
+# same as questionary.constants
+DEFAULT_KBI_MESSAGE = "Cancelled by user"
+INVALID_INPUT = "Invalid input"
+
+# question types implemented by superprompt rather than questionary
+GROUP_TYPES = ("list", "dict")
+PRINT_TYPE = "print"
+INCLUDE_TYPE = "include"
+SEARCH_SELECT_TYPE = "search_select"
+
+# "layout" of a group whose questions are all asked at once, in a single application
+FORM_LAYOUT = "form"
+# question types that can be fields of a form
+FORM_FIELD_TYPES = ("text", "password", "confirm", "select")
+
+# options handled by superprompt that must not be passed on to questionary
+SUPERPROMPT_OPTIONS = (
+    "if",
+    "multiple",
+    "multiple_message",
+    "multiple_batch",
+    "questions",
+    "layout",
+    "memoize",
+    "template",
+)
+
+# options handled by superprompt when asking an ordinary question
+PROMPT_OPTIONS = ("type", "name", "when", "filter", "choice_cache", "defer_filter")
+
+# question types whose answer must be one of the question's choices
+CHOICE_TYPES = ("select", "rawselect", "rawlist", "checkbox")
+
+# required arguments of the question types built in to questionary so compile_questions()
+# can check question configs without importing questionary;
+# ("list" is also questionary's alias for "select" but superprompt uses it for groups)
+PROMPT_REQUIRED_ARGUMENTS = {
+    "autocomplete": ("message", "choices"),
+    "checkbox": ("message", "choices"),
+    "confirm": ("message",),
+    "input": ("message",),
+    "password": ("message",),
+    "path": ("message",),
+    "rawlist": ("message", "choices"),
+    "rawselect": ("message", "choices"),
+    "select": ("message", "choices"),
+    "text": ("message",),
+    # implemented by superprompt
+    SEARCH_SELECT_TYPE: ("message", "choices"),
+}
+
+# sentinel for a missing answer in headless mode
+_MISSING = object()
+
+# question types whose previous answer is used as the default when the user goes back
+BACK_DEFAULT_TYPES = ("text", "password", "path", "autocomplete", "confirm", "select")
+
+
+def confirm(*args: Any, **kwargs: Any) -> "Question":
+    """questionary.confirm(), imported on first use"""
+    from questionary import confirm as _confirm
+
+    return _confirm(*args, **kwargs)
+
+
+def prompt_by_name(name: str) -> Optional[Callable[..., "Question"]]:
+    """questionary.prompts.prompt_by_name(), imported on first use; also knows the
+    question types implemented by superprompt"""
+    if name == SEARCH_SELECT_TYPE:
+        return search_select
+    from questionary.prompts import prompt_by_name as _prompt_by_name
+
+    return _prompt_by_name(name)
+
+
+def _parameter_error(parameter: str) -> ValueError:
+    """Return questionary's PromptParameterException for a missing parameter"""
+    from questionary.prompt import PromptParameterException
+
+    return PromptParameterException(parameter)
+
+
+# QuestionConfigError subclasses PromptParameterException so it is created on first use
+_question_config_error: Optional[type] = None
+
+
+def _question_config_error_class() -> type:
+    """Return the QuestionConfigError class, creating it if needed"""
+    global _question_config_error  # pylint: disable=global-statement
+    if _question_config_error is None:
+        from questionary.prompt import PromptParameterException
+
+        class QuestionConfigError(PromptParameterException):
+            """Raised by :func:`compile_questions` when one or more question configs are invalid.
+
+            Subclasses :class:`questionary.prompt.PromptParameterException` (and thus
+            :class:`ValueError`) so existing error handling keeps working.
+
+            Attributes:
+                errors: list of (path, exception) tuples, one for each problem found;
+                    path identifies the offending question, e.g. ``[0].if[2].questions[1]``
+            """
+
+            def __init__(self, errors: List[Tuple[str, Exception]]) -> None:
+                # pylint: disable=non-parent-init-called,super-init-not-called
+                self.errors = errors
+                message = "\n".join(
+                    f"{path}: {error.args[0]}" for path, error in errors
+                )
+                ValueError.__init__(self, message)
+
+        QuestionConfigError.__module__ = __name__
+        _question_config_error = QuestionConfigError
+    return _question_config_error
+
+
+def __getattr__(name: str) -> Any:
+    """Create lazily defined module attributes"""
+    if name == "QuestionConfigError":
+        return _question_config_error_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class _Node(NamedTuple):
+    """A single compiled question config"""
+
+    type: str
+    name: Optional[str]
+    config: Mapping[str, Any]
+    prompt_kwargs: Mapping[str, Any]
+    questions: Optional["_Plan"] = None
+    if_condition: Any = None
+    if_questions: Optional["_Plan"] = None
+    multiple: Optional[int] = None
+    multiple_message: Optional[str] = None
+    repeat: Optional["_Node"] = None
+    template: Optional[Callable[["AnswerStore"], str]] = None
+    # separator of the values of a "multiple" question entered in one batch
+    multiple_batch: Optional[str] = None
+    layout: Optional[str] = None
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Any, ...]]:
+        # mappingproxy can't be pickled; pickle the mappings it wraps instead
+        fields = self._replace(
+            config=dict(self.config), prompt_kwargs=dict(self.prompt_kwargs)
+        )
+        return _unpickle_node, (tuple(fields),)
+
+
+def _unpickle_node(fields: Tuple[Any, ...]) -> _Node:
+    """Rebuild a pickled _Node"""
+    node = _Node._make(fields)
+    return node._replace(
+        config=MappingProxyType(node.config),
+        prompt_kwargs=MappingProxyType(node.prompt_kwargs),
+    )
+
+
+class QuestionPlan:
+    """An immutable, validated execution plan for a tree of questions.
+
+    Create with :func:`compile_questions`; pass to :func:`superprompt` in place of
+    the question configs. A plan may be reused for any number of runs.
+    """
+
+    __slots__ = ("_nodes",)
+
+    def __init__(self, nodes: Iterable[_Node]) -> None:
+        object.__setattr__(self, "_nodes", tuple(nodes))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("QuestionPlan is immutable")
+
+    def __iter__(self) -> Iterator[_Node]:
+        return iter(self._nodes)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Any, ...]]:
+        return QuestionPlan, (self._nodes,)
+
+    def __repr__(self) -> str:
+        names = ", ".join(repr(node.name) for node in self._nodes)
+        return f"QuestionPlan([{names}])"
+
+
+class _LazyPlan:
+    """Plan for nested questions given as an iterator (e.g. a generator) of question
+    configs; each question is compiled when the walk first reaches it and kept, so the
+    plan can be walked again."""
+
+    __slots__ = ("_source", "_nodes", "_path", "_defaults")
+
+    def __init__(
+        self,
+        source: Iterator[Mapping[str, Any]],
+        path: str,
+        defaults: Mapping[str, Any],
+    ) -> None:
+        self._source: Optional[Iterator[Mapping[str, Any]]] = source
+        self._nodes: List[_Node] = []
+        self._path = path
+        self._defaults = defaults
+
+    def __iter__(self) -> Iterator[_Node]:
+        idx = 0
+        while True:
+            if idx == len(self._nodes):
+                config = (
+                    _MISSING if self._source is None else next(self._source, _MISSING)
+                )
+                if config is _MISSING:
+                    self._source = None
+                    return
+                errors: List[Tuple[str, Exception]] = []
+                plan = _compile_plan([config], self._path, self._defaults, errors, idx)
+                if errors:
+                    raise _question_config_error_class()(errors)
+                self._nodes.extend(plan)
+            yield self._nodes[idx]
+            idx += 1
+
+
+class _LazyQuestions:
+    """Nested questions given as a callable that is passed the current answers and
+    returns question configs; called when the walk reaches them.
+
+    If memoize is True, the compiled questions are kept, keyed by the answers the callable
+    read (see :meth:`AnswerStore.trace`), and reused while those answers are the same.
+    """
+
+    __slots__ = ("func", "path", "defaults", "memo")
+
+    def __init__(
+        self,
+        func: Callable[..., Any],
+        path: str,
+        defaults: Mapping[str, Any],
+        memoize: bool,
+    ) -> None:
+        self.func = func
+        self.path = path
+        self.defaults = defaults
+        # paths read: {values read: plan}
+        self.memo: Optional[Dict[Tuple[Any, ...], Dict[Tuple[Any, ...], Any]]] = (
+            {} if memoize else None
+        )
+
+    def expand(self, answers: "AnswerStore") -> Generator[Any, Any, "_Plan"]:
+        """Return the plan for the questions; use with yield from"""
+        memo = self.memo
+        if memo is not None:
+            for paths, plans in memo.items():
+                try:
+                    plan = plans.get(tuple(answers.lookup(path) for path in paths))
+                except TypeError:  # unhashable answer
+                    continue
+                if plan is not None:
+                    return plan
+            reads = answers.trace()
+        try:
+            questions = yield from _call(self.func, answers)
+        finally:
+            if memo is not None:
+                answers.untrace()
+        plan = _plan(questions, self.path, self.defaults)
+        if memo is not None and None not in reads:
+            try:
+                memo.setdefault(tuple(reads), {})[tuple(reads.values())] = plan
+            except TypeError:  # unhashable answer
+                pass
+        return plan
+
+
+# compiled nested questions
+_Plan = Union["QuestionPlan", _LazyPlan, _LazyQuestions, "_Include"]
+
+
+def _lazy_plan(
+    questions: Any, path: str, defaults: Mapping[str, Any], memoize: bool
+) -> Optional[Union[_LazyPlan, _LazyQuestions]]:
+    """Return the lazy plan for nested questions given as a callable or an iterator,
+    otherwise None"""
+    if isinstance(questions, (_LazyPlan, _LazyQuestions)):
+        return questions
+    if callable(questions):
+        return _LazyQuestions(questions, path, defaults, memoize)
+    if isinstance(questions, Iterator):
+        return _LazyPlan(questions, path, defaults)
+    return None
+
+
+def _plan(questions: Any, path: str, defaults: Mapping[str, Any]) -> _Plan:
+    """Return the plan for questions returned by a _LazyQuestions callable"""
+    if isinstance(questions, (QuestionPlan, _LazyPlan)):
+        return questions
+    if isinstance(questions, Iterator):
+        return _LazyPlan(questions, path, defaults)
+    errors: List[Tuple[str, Exception]] = []
+    plan = _compile_plan(questions, path, defaults, errors)
+    if errors:
+        raise _question_config_error_class()(errors)
+    return plan
+
+
+class _Include:
+    """Questions of an "include" question, loaded from a file when first reached"""
+
+    __slots__ = ("path", "defaults")
+
+    def __init__(self, path: str, defaults: Mapping[str, Any]) -> None:
+        self.path = path
+        self.defaults = defaults
+
+    def load(self) -> "QuestionPlan":
+        """Return the compiled questions in the file"""
+        return include_cache.load(self.path, self.defaults)
+
+
+class IncludeCache:
+    """Cache of the question files loaded by "include" questions.
+
+    A file is only read when an "include" question naming it is reached. The compiled
+    questions are kept in memory, keyed by the file's absolute path, and reused until the
+    file's modification time or size changes. If directory is given, the parsed contents
+    of each file are also saved there, with the file's modification time, size and
+    SHA-256 hash, so later processes can skip parsing: a file whose modification time and
+    size match is not read at all, and one that was only touched is read and hashed but
+    not parsed again. The entries are stored as JSON, so a cache directory others can
+    write to can't be used to run code; contents JSON can't represent exactly, such as
+    TOML dates, are not saved. superprompt uses the module's ``include_cache``; set its
+    ``directory`` attribute to enable the on-disk cache.
+
+    Args:
+        directory: directory for the on-disk cache, created if needed; None to only
+            cache in memory.
+    """
+
+    def __init__(
+        self, directory: Optional[Union[str, "os.PathLike[str]"]] = None
+    ) -> None:
+        self.directory = directory
+        # (path, names of the default options): ((mtime, size), plan)
+        self._plans: Dict[
+            Tuple[str, FrozenSet[str]], Tuple[Tuple[int, int], "QuestionPlan"]
+        ] = {}
+
+    def load(
+        self,
+        path: Union[str, "os.PathLike[str]"],
+        defaults: Optional[Mapping[str, Any]] = None,
+    ) -> "QuestionPlan":
+        """Return the compiled questions in the file at path.
+
+        The file may hold a list of questions, a single question or, as TOML requires,
+        a table whose "questions" value is the list of questions. Relative paths in its
+        "include" questions are relative to the file's directory.
+
+        Args:
+            path: path to a JSON, TOML or YAML file, read according to its suffix as
+                by :func:`load_responses`.
+            defaults: the default options the questions are asked with, as for
+                :func:`compile_questions`.
+
+        Raises:
+            QuestionConfigError: if the file can't be read or its questions are invalid.
+        """
+        path = os.path.abspath(os.path.expanduser(path))
+        defaults = defaults or {}
+        key = (path, frozenset(defaults))
+        try:
+            stat = os.stat(path)
+            version = (stat.st_mtime_ns, stat.st_size)
+            cached = self._plans.get(key)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            questions = self._read(path, version)
+        except Exception as exception:
+            raise _question_config_error_class()([(path, exception)]) from exception
+        if (
+            isinstance(questions, dict)
+            and "type" not in questions
+            and "questions" in questions
+        ):
+            questions = questions["questions"]
+
+        errors: List[Tuple[str, Exception]] = []
+        plan = _compile_plan(
+            questions, path, defaults, errors, base=os.path.dirname(path)
+        )
+        if errors:
+            raise _question_config_error_class()(errors)
+        self._plans[key] = (version, plan)
+        return plan
+
+    def _read(self, path: str, version: Tuple[int, int]) -> Any:
+        """Return the parsed contents of the file at path, using the on-disk cache"""
+        if self.directory is None:
+            with open(path, "rb") as file:
+                return _parse_document(path, file.read())
+
+        import hashlib
+        import json
+
+        directory = os.path.expanduser(self.directory)
+        cache_path = os.path.join(
+            directory, hashlib.sha256(path.encode("utf-8")).hexdigest() + ".json"
+        )
+        try:
+            with open(cache_path, encoding="utf-8") as file:
+                entry = json.load(file)
+            if not isinstance(entry, dict) or not {"version", "sha256", "data"} <= set(
+                entry
+            ):
+                entry = None
+        except (OSError, ValueError):  # missing or unreadable cache entry
+            entry = None
+        if entry is not None and entry["version"] == list(version):
+            return entry["data"]
+
+        with open(path, "rb") as file:
+            content = file.read()
+        digest = hashlib.sha256(content).hexdigest()
+        if entry is not None and entry["sha256"] == digest:
+            data = entry["data"]
+        else:
+            data = _parse_document(path, content)
+        try:
+            text = json.dumps(
+                {"version": list(version), "sha256": digest, "data": data}
+            )
+            # only cache contents JSON gives back unchanged: not e.g. TOML datetimes
+            # or YAML mappings with integer keys
+            if json.loads(text)["data"] == data:
+                os.makedirs(directory, exist_ok=True)
+                temp_path = f"{cache_path}.{os.getpid()}.tmp"
+                with open(temp_path, "w", encoding="utf-8") as file:
+                    file.write(text)
+                os.replace(temp_path, cache_path)
+        except (OSError, TypeError, ValueError):  # the cache is only an optimization
+            pass
+        return data
+
+    def clear(self) -> None:
+        """Forget the compiled questions cached in memory"""
+        self._plans.clear()
+
+
+include_cache = IncludeCache()
+
+
+def compile_questions(
+    questions: Union[Dict[str, Any], Iterable[Mapping[str, Any]]],
+    **kwargs: Any,
+) -> QuestionPlan:
+    """Validate a tree of question configs and compile it into a reusable plan.
+
+    The whole tree is validated up front, including nested "questions" and "if"
+    branches that may never be reached at run time.
+
+    Args:
+        questions: question configs in any form accepted by :func:`superprompt`.
+        kwargs: default options that will be passed to every question, as for
+            :func:`superprompt`; used only to check for missing arguments.
+
+    Returns:
+        QuestionPlan that may be passed to :func:`superprompt` in place of questions.
+
+    Raises:
+        QuestionConfigError: if any question config is invalid; the exception's
+            ``errors`` attribute lists every problem found.
+    """
+    errors: List[Tuple[str, Exception]] = []
+    plan = _compile_plan(questions, "", kwargs, errors)
+    if errors:
+        raise _question_config_error_class()(errors)
+    return plan
+
+
+def _compile_plan(
+    questions: Union[Dict[str, Any], Iterable[Mapping[str, Any]]],
+    path: str,
+    defaults: Mapping[str, Any],
+    errors: List[Tuple[str, Exception]],
+    start: int = 0,
+    base: Optional[str] = None,
+) -> QuestionPlan:
+    """Compile questions into a QuestionPlan, appending any problems to errors
+
+    start is the index of the first question in the questions at path and base is the
+    directory that relative "include" paths are relative to (None for the current
+    directory when the questions are reached).
+
+    The tree is walked with an explicit stack instead of recursion so trees of any
+    depth can be compiled. Questions are checked in document order and the nodes
+    are then built in reverse, so every nested plan is built before its parent.
+    """
+    if isinstance(questions, QuestionPlan):
+        return questions
+
+    root: List[Any] = []
+    stack = _expand_plan(questions, path, root, start)
+    checked = []
+    while stack:
+        question_config, node_path, nodes, idx = stack.pop()
+        fields, nested = _check_node(question_config, node_path, defaults, errors, base)
+        children = []
+        # push the 'if' branch first so nested 'questions' are checked first
+        for field, nested_questions, nested_path in reversed(nested):
+            lazy = _lazy_plan(
+                nested_questions,
+                nested_path,
+                defaults,
+                bool(question_config.get("memoize")),
+            )
+            if isinstance(nested_questions, QuestionPlan):
+                children.append((field, nested_questions))
+            elif lazy is not None:
+                children.append((field, lazy))
+            else:
+                child_nodes: List[Any] = []
+                children.append((field, child_nodes))
+                stack.extend(_expand_plan(nested_questions, nested_path, child_nodes))
+        checked.append((fields, children, nodes, idx))
+
+    for fields, children, nodes, idx in reversed(checked):
+        for field, child in children:
+            if isinstance(child, list):
+                child = QuestionPlan(child)
+            fields[field] = child
+        nodes[idx] = _build_node(fields)
+    return QuestionPlan(root)
+
+
+def _expand_plan(
     questions: Union[Dict[str, Any], Iterable[Mapping[str, Any]]],
+    path: str,
+    nodes: List[Any],
+    start: int = 0,
+) -> List[Tuple[Mapping[str, Any], str, List[Any], int]]:
+    """Reserve a slot in nodes for each question and return them as stack entries
+
+    Entries are returned last question first, ready to be pushed on a stack.
+    """
+    if isinstance(questions, dict):
+        questions = [questions]
+    entries = [
+        (question_config, f"{path}[{start + idx}]", nodes, idx)
+        for idx, question_config in enumerate(questions)
+    ]
+    nodes.extend([None] * len(entries))
+    entries.reverse()
+    return entries
+
+
+def _check_node(
+    question_config: Mapping[str, Any],
+    path: str,
+    defaults: Mapping[str, Any],
+    errors: List[Tuple[str, Exception]],
+    base: Optional[str] = None,
+) -> Tuple[Dict[str, Any], List[Tuple[str, Any, str]]]:
+    """Check a single question config, appending any problems to errors
+
+    Returns:
+        The _Node fields for the question and a list of (field, questions, path)
+        for the nested questions that still need to be compiled.
+    """
+    name = question_config.get("name")
+    _type = question_config.get("type")
+    _if = question_config.get("if")
+    nested_questions = question_config.get("questions")
+    multiple = question_config.get("multiple")
+    multiple_message = question_config.get("multiple_message") or question_config.get(
+        "message"
+    )
+
+    config = {k: v for k, v in question_config.items() if k not in SUPERPROMPT_OPTIONS}
+
+    if _is_coroutine_function(config.get("validate")):
+        config["validate"] = AsyncValidation(config["validate"])
+    for option, names in (("when", ("answers",)), ("filter", ("value",))):
+        source = _expression_source(config.get(option))
+        if source is not None:
+            expression = _compile_option(option, source, names, path, errors)
+            if expression is None:
+                del config[option]
+            else:
+                config[option] = expression
+
+    # constraint checks
+    if "type" not in question_config:
+        errors.append((path, _parameter_error("type")))
+    elif _type in GROUP_TYPES:
+        if not nested_questions:
+            errors.append((path, _parameter_error("questions")))
+    elif _type == PRINT_TYPE:
+        if "message" not in question_config:
+            errors.append((path, _parameter_error("message")))
+    elif _type == INCLUDE_TYPE:
+        if "path" not in question_config:
+            errors.append((path, _parameter_error("path")))
+    else:
+        _check_prompt_config(config, path, defaults, errors)
+
+    valid_if = isinstance(_if, (list, tuple)) and len(_if) == 2
+    if _if and not valid_if:
+        errors.append(
+            (
+                path,
+                ValueError(
+                    "'if' value must be list or tuple in form [condition, questions]"
+                ),
+            )
+        )
+
+    if multiple is not None and (
+        isinstance(multiple, bool) or not isinstance(multiple, int)
+    ):
+        errors.append((path, ValueError("'multiple' must be an int")))
+        multiple = None
+
+    layout = question_config.get("layout")
+    if layout is not None:
+        error = _check_form(_type, layout, nested_questions)
+        if error is not None:
+            errors.append((path, ValueError(error)))
+            layout = None
+
+    multiple_batch = question_config.get("multiple_batch") or None
+    if multiple_batch is True:
+        multiple_batch = "\n"
+    if multiple_batch is not None:
+        if not isinstance(multiple_batch, str):
+            errors.append(
+                (
+                    path,
+                    ValueError("'multiple_batch' must be a bool or a separator string"),
+                )
+            )
+            multiple_batch = None
+        elif not multiple:
+            errors.append((path, ValueError("'multiple_batch' needs 'multiple'")))
+            multiple_batch = None
+        elif _type != "text":
+            errors.append(
+                (
+                    path,
+                    ValueError("'multiple_batch' is only supported for text questions"),
+                )
+            )
+            multiple_batch = None
+
+    # nested questions
+    nested = []
+    if _type in GROUP_TYPES and nested_questions:
+        nested.append(("questions", nested_questions, f"{path}.questions"))
+
+    if_condition = None
+    if _if and valid_if:
+        if_condition = _if[0]
+        nested.append(("if_questions", _if[1], f"{path}.if"))
+
+    # expressions and templates are compiled once, with the plan
+    source = _expression_source(if_condition, strings=False)
+    if source is not None:
+        if_condition = _compile_option("if", source, ("value",), path, errors)
+    template = None
+    if question_config.get("template") and "message" in config:
+        try:
+            template = _Template(config["message"])
+        except ValueError as exception:
+            errors.append((path, ValueError(f"Invalid message template: {exception}")))
+
+    if _type == PRINT_TYPE:
+        # questions can take 'input' arg but print_formatted_text does not
+        # Remove 'input', if present, to avoid breaking during tests
+        prompt_kwargs = {
+            k: v
+            for k, v in config.items()
+            if k not in ("input", "name", "type", "message")
+        }
+    else:
+        prompt_kwargs = {k: v for k, v in config.items() if k not in PROMPT_OPTIONS}
+        if multiple_batch == "\n":
+            # one value per line, so a block of values can be pasted
+            prompt_kwargs.setdefault("multiline", True)
+
+    include = None
+    if _type == INCLUDE_TYPE and "path" in question_config:
+        include_path = os.path.expanduser(os.fspath(question_config["path"]))
+        if base is not None:
+            include_path = os.path.join(base, include_path)
+        include = _Include(include_path, defaults)
+
+    fields = {
+        "type": _type,
+        "name": name,
+        "config": config,
+        "prompt_kwargs": prompt_kwargs,
+        "questions": include,
+        "if_condition": if_condition,
+        "if_questions": None,
+        "multiple": multiple or None,
+        "multiple_message": multiple_message,
+        "template": template,
+        "multiple_batch": multiple_batch,
+        "layout": layout,
+    }
+    return fields, nested
+
+
+def _check_form(_type: Any, layout: Any, questions: Any) -> Optional[str]:
+    """Return the problem with a group's "layout" option, if any"""
+    if layout != FORM_LAYOUT:
+        return f"'layout' must be {FORM_LAYOUT!r}"
+    if _type not in GROUP_TYPES:
+        return "'layout' is only supported for list and dict groups"
+    if isinstance(questions, Mapping):
+        questions = [questions]
+    if not isinstance(questions, (list, tuple)):
+        return "the questions of a form must be given as a list"
+    for i, question in enumerate(questions):
+        if not isinstance(question, Mapping):
+            continue  # reported when the question is compiled
+        if question.get("type") not in FORM_FIELD_TYPES or any(
+            option in question for option in ("if", "multiple", "when")
+        ):
+            return (
+                f"question {i} of a form must be a "
+                f"{', '.join(FORM_FIELD_TYPES)} question without 'if', 'multiple' "
+                "or 'when'"
+            )
+    return None
+
+
+def _build_node(fields: Dict[str, Any]) -> _Node:
+    """Build a _Node from the fields returned by _check_node"""
+    config = fields["config"]
+    prompt_kwargs = fields["prompt_kwargs"]
+    node = _Node(
+        **dict(
+            fields,
+            config=MappingProxyType(config),
+            prompt_kwargs=MappingProxyType(prompt_kwargs),
+        )
+    )
+
+    if node.multiple and node.multiple > 0 and node.multiple_batch is None:
+        # use multiple_message on subsequent prompts
+        multiple_message = node.multiple_message
+        repeat_kwargs = dict(prompt_kwargs, message=multiple_message)
+        node = node._replace(
+            repeat=node._replace(
+                config=MappingProxyType(dict(config, message=multiple_message)),
+                prompt_kwargs=MappingProxyType(repeat_kwargs),
+                template=None,
+            ),
+        )
+    return node
+
+
+# functions that can be called in expressions
+EXPRESSION_BUILTINS = {
+    func.__name__: func
+    for func in (
+        abs,
+        all,
+        any,
+        bool,
+        dict,
+        float,
+        int,
+        len,
+        list,
+        max,
+        min,
+        round,
+        set,
+        sorted,
+        str,
+        sum,
+        tuple,
+    )
+}
+
+# types whose attributes (e.g. methods such as str.upper) can be used in expressions
+_EXPRESSION_TYPES = (
+    str,
+    int,
+    float,
+    bool,
+    list,
+    tuple,
+    dict,
+    set,
+    frozenset,
+    type(None),
+)
+
+# attributes that can't be used in expressions: str.format can read private attributes
+_EXPRESSION_DENIED_ATTRIBUTES = ("format", "format_map")
+
+_EXPRESSION_NODES: Tuple[type, ...] = ()
+
+
+def _expression_source(value: Any, strings: bool = True) -> Optional[str]:
+    """Return the source of the expression given as an option's value, if it is one:
+    a {"expr": source} mapping or, if strings is True, a string"""
+    if isinstance(value, str) and strings:
+        return value
+    if isinstance(value, Mapping) and len(value) == 1 and "expr" in value:
+        return value["expr"]
+    return None
+
+
+def _compile_option(
+    option: str,
+    source: str,
+    names: Tuple[str, ...],
+    path: str,
+    errors: List[Tuple[str, Exception]],
+) -> Optional["_Expression"]:
+    """Compile the expression for option, appending any problem to errors"""
+    try:
+        return _Expression(source, names)
+    except ValueError as exception:
+        errors.append((path, ValueError(f"Invalid '{option}' expression: {exception}")))
+        return None
+
+
+class _Expression(functools.partial):  # type: ignore[type-arg]
+    """An expression compiled into a function of the given names.
+
+    Expressions are a safe subset of Python expressions: literals, the names, the
+    functions in EXPRESSION_BUILTINS, boolean, comparison and arithmetic operators
+    (except **), conditional expressions, subscripts and the public attributes and
+    methods of plain values such as strings, numbers, lists and dicts.
+    ``answers.fries`` reads the answer to the fries question, or None if it has
+    not been answered; ``answers.toppings.size`` reads it by its dotted path (see
+    :class:`AnswerStore`).
+
+    The validated expression is compiled to the bytecode of a lambda, so evaluating
+    it costs about the same as calling a hand-written lambda. Expressions can be
+    pickled and are compiled again when unpickled.
+    """
+
+    def __new__(cls, source: str, names: Tuple[str, ...]) -> "_Expression":
+        self = super().__new__(cls, _compile_expression(source, names))
+        self.source = source
+        self.names = names
+        return self
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return type(self), (self.source, self.names)
+
+    def __repr__(self) -> str:
+        return f"<expression {self.source!r}>"
+
+
+def _compile_expression(source: str, names: Tuple[str, ...]) -> Callable[..., Any]:
+    """Validate the expression source and compile it into a function of names"""
+    import ast
+
+    global _EXPRESSION_NODES  # pylint: disable=global-statement
+    if not _EXPRESSION_NODES:
+        _EXPRESSION_NODES = tuple(
+            getattr(ast, name)
+            for name in (
+                "Expression BoolOp And Or UnaryOp Not USub UAdd Invert BinOp Add Sub "
+                "Mult Div FloorDiv Mod BitAnd BitOr BitXor Compare Eq NotEq Lt LtE Gt "
+                "GtE Is IsNot In NotIn IfExp Constant Name Load Attribute Subscript "
+                "Index Slice Call keyword List Tuple Dict Set"
+            ).split()
+            if hasattr(ast, name)  # Index only exists before Python 3.9
+        )
+
+    def check(node: ast.AST) -> ast.AST:
+        """Return node with answers.name reads and attribute accesses made safe"""
+        if not isinstance(node, _EXPRESSION_NODES):
+            raise ValueError(f"{type(node).__name__} is not allowed in expressions")
+        if isinstance(node, ast.Name):
+            if node.id not in names and node.id not in EXPRESSION_BUILTINS:
+                raise ValueError(f"unknown name {node.id!r}")
+            return node
+        if isinstance(node, ast.Attribute):
+            # answers.a.b -> answers.get("a.b")
+            attrs = [node.attr]
+            value = node.value
+            while isinstance(value, ast.Attribute):
+                attrs.append(value.attr)
+                value = value.value
+            if (
+                "answers" in names
+                and isinstance(value, ast.Name)
+                and value.id == "answers"
+            ):
+                return ast.Call(
+                    func=ast.Attribute(value=value, attr="get", ctx=ast.Load()),
+                    args=[ast.Constant(".".join(reversed(attrs)))],
+                    keywords=[],
+                )
+            if node.attr.startswith("_"):
+                raise ValueError(f"private attribute {node.attr!r}")
+            return ast.Call(
+                func=ast.Name(id="_attribute", ctx=ast.Load()),
+                args=[check(node.value), ast.Constant(node.attr)],
+                keywords=[],
+            )
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, (ast.Name, ast.Attribute)) or (
+                isinstance(node.func, ast.Name)
+                and node.func.id not in EXPRESSION_BUILTINS
+            ):
+                raise ValueError("only built in functions and methods can be called")
+            if isinstance(node.func, ast.Attribute):
+                if node.func.attr.startswith("_"):
+                    raise ValueError(f"private attribute {node.func.attr!r}")
+                # a method call on an answer, not the answer of a nested question
+                node.func = ast.Call(
+                    func=ast.Name(id="_attribute", ctx=ast.Load()),
+                    args=[check(node.func.value), ast.Constant(node.func.attr)],
+                    keywords=[],
+                )
+                node.args = [check(arg) for arg in node.args]
+                node.keywords = [check(keyword) for keyword in node.keywords]
+                return node
+        if isinstance(node, ast.keyword) and node.arg is None:
+            raise ValueError("** arguments are not allowed in expressions")
+        for field, value in ast.iter_fields(node):
+            if isinstance(value, list):
+                setattr(
+                    node,
+                    field,
+                    [
+                        check(item) if isinstance(item, ast.AST) else item
+                        for item in value
+                    ],
+                )
+            elif isinstance(value, ast.AST):
+                setattr(node, field, check(value))
+        return node
+
+    if not isinstance(source, str):
+        raise ValueError("expression must be a string")
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as exception:
+        raise ValueError(f"{exception.msg}: {source!r}") from None
+    function = ast.Expression(
+        ast.Lambda(
+            args=ast.arguments(
+                posonlyargs=[],
+                args=[ast.arg(arg=name) for name in names],
+                kwonlyargs=[],
+                kw_defaults=[],
+                defaults=[],
+            ),
+            body=check(tree.body),
+        )
+    )
+    ast.fix_missing_locations(function)
+    code = compile(function, f"<expression {source!r}>", "eval")
+    namespace = dict(EXPRESSION_BUILTINS, __builtins__={}, _attribute=_attribute)
+    return eval(code, namespace)  # pylint: disable=eval-used
+
+
+def _attribute(obj: Any, name: str) -> Any:
+    """Return an attribute of a plain value for an expression"""
+    if type(obj) not in _EXPRESSION_TYPES or name in _EXPRESSION_DENIED_ATTRIBUTES:
+        raise ValueError(f"{type(obj).__name__}.{name} can't be used in expressions")
+    return getattr(obj, name)
+
+
+class _Template(functools.partial):  # type: ignore[type-arg]
+    """A message template compiled into a function of the answers.
+
+    Replacement fields name an answer, by its name in the current scope or its dotted
+    path (see :class:`AnswerStore`), and may have a conversion and format spec as for
+    str.format(), e.g. "Add {toppings.size!s:>6} fries?"; an unanswered question is
+    replaced with an empty string. Use {{ and }} for literal braces.
+    """
+
+    def __new__(cls, source: str) -> "_Template":
+        self = super().__new__(cls, _compile_template(source))
+        self.source = source
+        return self
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return type(self), (self.source,)
+
+
+def _compile_template(source: str) -> Callable[["AnswerStore"], str]:
+    """Parse the template source into a function of the answers"""
+    import string
+
+    if not isinstance(source, str):
+        raise ValueError("message template must be a string")
+    conversions = {None: None, "s": str, "r": repr, "a": ascii}
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(source):
+        if field is not None:
+            if not field or "{" in (spec or ""):
+                raise ValueError(f"replacement fields must name an answer: {source!r}")
+            if conversion not in conversions:
+                raise ValueError(f"unknown conversion !{conversion}: {source!r}")
+        parts.append((literal, field, spec or "", conversions.get(conversion)))
+
+    def render(answers: "AnswerStore") -> str:
+        text = []
+        for literal, field, spec, convert in parts:
+            text.append(literal)
+            if field is not None:
+                value = answers.get(field)
+                if value is None:
+                    value = ""
+                elif convert is not None:
+                    value = convert(value)
+                text.append(format(value, spec))
+        return "".join(text)
+
+    return render
+
+
+def _check_prompt_config(
+    config: Mapping[str, Any],
+    path: str,
+    defaults: Mapping[str, Any],
+    errors: List[Tuple[str, Exception]],
+) -> None:
+    """Check an ordinary question config the same way questionary.prompt() would"""
+    if "name" not in config:
+        errors.append((path, _parameter_error("name")))
+
+    _type = config["type"]
+    required_arguments = PROMPT_REQUIRED_ARGUMENTS.get(_type)
+    if required_arguments is None:
+        # not built in to questionary 1.10; check the installed version of questionary
+        required_arguments = _prompt_required_arguments(_type)
+    if required_arguments is None:
+        from questionary.prompts import AVAILABLE_PROMPTS
+
+        errors.append(
+            (
+                path,
+                ValueError(
+                    f"No question type '{_type}' found. "
+                    f"Known question types are {', '.join(AVAILABLE_PROMPTS)}."
+                ),
+            )
+        )
+    else:
+        for argument in required_arguments:
+            if argument not in config and argument not in defaults:
+                errors.append((path, _parameter_error(argument)))
+                break
+
+    if config.get("when") and not callable(config["when"]):
+        errors.append(
+            (
+                path,
+                ValueError("'when' needs to be function that accepts a dict argument"),
+            )
+        )
+    if config.get("filter") and not callable(config["filter"]):
+        errors.append(
+            (path, ValueError("'filter' needs to be function that accepts an argument"))
+        )
+    choice_cache = config.get("choice_cache")
+    if choice_cache not in (None, True, False) and not isinstance(
+        choice_cache, ChoiceCache
+    ):
+        errors.append(
+            (path, ValueError("'choice_cache' must be a bool or a ChoiceCache"))
+        )
+    defer_filter = config.get("defer_filter")
+    if defer_filter not in (None, True, False) and not callable(
+        getattr(defer_filter, "submit", None)
+    ):
+        errors.append(
+            (path, ValueError("'defer_filter' must be a bool or an Executor"))
+        )
+
+
+def _prompt_required_arguments(_type: str) -> Optional[Tuple[str, ...]]:
+    """Return the required arguments of questionary question type _type or None if
+    questionary has no such question type"""
+    from questionary.prompts import prompt_by_name as _prompt_by_name
+    from questionary.utils import required_arguments
+
+    create_question_func = _prompt_by_name(_type)
+    if not create_question_func:
+        return None
+    return tuple(
+        argument
+        for argument in required_arguments(create_question_func)
+        if argument not in PROMPT_OPTIONS
+    )
+
+
+def superprompt(
+    questions: Union[Dict[str, Any], Iterable[Mapping[str, Any]], QuestionPlan],
     answers: Optional[Mapping[str, Any]] = None,
     patch_stdout: bool = False,
     true_color: bool = False,
     kbi_msg: str = DEFAULT_KBI_MESSAGE,
+    responses: Optional[Union[Mapping[str, Any], str, "os.PathLike[str]"]] = None,
+    session: Union[bool, "QuestionSession"] = False,
+    journal: Optional[Union[str, "os.PathLike[str]", "Journal"]] = None,
+    resume: bool = False,
+    on_event: Optional[Callable[["Event"], Any]] = None,
+    back_key: Optional[str] = None,
+    prefetch: int = 0,
     **kwargs: Any,
 ) -> Dict[str, Any]:
     """Prompt the user for input on all the questions.
 
-    Catches keyboard interrupts and prints a message.
+    Catches keyboard interrupts, prints a message and returns no answers.
 
     See :func:`unsafe_prompt` for possible question configurations.
 
     Args:
         questions: A list of question configs representing questions to
-                   ask. A question config may have the following options:
+                   ask or a QuestionPlan returned by :func:`compile_questions`.
+                   A question config may have the following options:
 
                    * type - The type of question.  Implements two additional types beyond those supported by prompt/unsafe_prompt:
                      "list" and "dict".  If type is "list" or "dict",
                      then "questions" option must also be set.  "list" type returns a list of values from the questions
                      in "questions" while "dict" type returns a dict of values for questions in "questions" where the key
                      is "name" of the question and the value is the answer to the question.
+                     Type "include" asks the questions in the JSON, TOML or YAML file named by its "path" option,
+                     in the current scope, loading the file only when the question is reached (see :class:`IncludeCache`).
 
                    * name - An ID for the question (to identify it in the answers :obj:`dict`).
 
                    * when - Callable to conditionally show the question. This function
-                     takes a :obj:`dict` representing the current answers.
+                     takes an :class:`AnswerStore` representing the current answers.
+                     May also be an expression string of ``answers``, e.g. "answers.fries and not answers.vegan".
 
                    * filter - Function that the answer is passed to. The return value of this
-                     function is saved as the answer.
+                     function is saved as the answer. May also be an expression string of ``value``,
+                     e.g. "value.strip()".
 
                    * if - List or Tuple in form [condition, nested_questions]; condition is a Callable or value to conditionally ask the nested_questions.
                      If a callable, the function will be passed the answer to this question;
                      if any other value, the answer to the question will be compared to this value.
+                     A condition of the form {"expr": expression} is an expression of ``value``, the answer.
 
                    * questions - Union[Dict[str, Any], Iterable[Mapping[str, Any]]] of questions to ask for "list" or "dict" type.
+                     May also be a generator of questions, compiled as they are reached, or a callable
+                     that is passed an :class:`AnswerStore` and returns the questions when they are reached.
+                     Nested questions in "if" may be given the same ways.
+
+                   * defer_filter - bool or concurrent.futures.Executor; if set, the "filter" runs on
+                     the executor (True for a thread pool of the run's own) while the following questions
+                     are asked, and is only waited for when the answer is read.
+
+                   * choice_cache - bool or :class:`ChoiceCache`; if True, the choices returned by a "choices"
+                     callable are reused for the rest of the run while the answers it read are unchanged;
+                     a ChoiceCache shares them between runs.
+
+                   * template - bool, if True, the message is a template whose {name} fields are
+                     replaced with the answers to earlier questions.
+
+                   * memoize - bool, if True, questions returned by a "questions" or "if" callable are
+                     reused while the answers the callable read are unchanged.
 
                    * multiple - int, if positive int N, the user will be prompted for exactly N values for this question.
                      If negative, user will be be prompted to enter multiple values, but at most -N values.
@@ -52,6 +1212,16 @@ def superprompt(
                    * multiple_message - str, if passed, will be used as the message prompt when prompting user for additional values for
                      questions where "multiple" == True.
 
+                   * layout - str, if "form" on a "list" or "dict" group, all of its questions are asked at
+                     once, as the fields of a single form that can be moved around freely and is submitted
+                     once every field is valid. The fields may be text, password, confirm or select
+                     questions without "if", "multiple" or "when".
+
+                   * multiple_batch - bool or str, if set on a "text" question with "multiple", all the values are
+                     entered at a single prompt: one per line if True, otherwise separated by the given string.
+                     The number of values and each value are validated before the prompt is accepted, and the
+                     "filter" is applied to each value.
+
                    Additional options correspond to the parameter names for
                    particular question types.
 
@@ -63,6 +1233,45 @@ def superprompt(
         kbi_msg: The message to be printed on a keyboard interrupt.
         true_color: Use true color output.
 
+        session: If True, or a :class:`QuestionSession`, every question is asked in the
+                 session's single, long-lived prompt_toolkit Application rather than in
+                 an Application of its own.
+
+        responses: Answers to use instead of prompting the user (headless mode), either a
+                   mapping or the path to a JSON or TOML file (see :func:`load_responses`).
+                   The answers have the same shape as the answers returned by superprompt():
+                   "dict" groups take a mapping, "list" groups a mapping or a list of answers
+                   in the order the questions are asked, and "multiple" questions a list of values.
+                   "when", "if", "filter" and "validate" are applied as when prompting;
+                   a question with no answer uses its "default" value.
+                   No prompts are created and "print" messages are not printed.
+
+        journal: Path of a journal file, or a :class:`Journal`, that records every answer
+                 given at a prompt as soon as it is given, except passwords.
+
+        resume: If True, the answers recorded in the journal by an earlier, interrupted,
+                run are replayed and the user is only asked the questions that follow
+                them. Otherwise the journal is started afresh.
+
+        on_event: Callable that is passed an :class:`Event` with a monotonic timestamp as
+                  each question is started, rendered and answered, as "when", "filter"
+                  and "if" callables are evaluated, as list/dict groups are entered and
+                  exited and as each value of a "multiple" question is asked.
+
+        back_key: A prompt_toolkit key, e.g. "s-tab", that returns to the previous question
+                  to change its answer. The answers that follow it are kept and only the
+                  questions that are no longer answered are asked; "when", "filter" and
+                  "if" callables are only called again if the answers they read changed.
+
+        prefetch: Number of background threads that call the "choices" and "default"
+                  callables of the questions that are likely to be asked next (the
+                  questions that follow in the same group and the "if" branch of the
+                  question being asked) while the user answers the current question.
+                  A result is used if the answers the callable read are unchanged when
+                  its question is reached; the calls for a branch that isn't taken are
+                  cancelled. 0 (the default) to call them when the question is reached.
+                  Ignored in headless mode.
+
         color_depth: Color depth to use. If ``true_color`` is set to true then this
                      value is ignored.
 
@@ -75,135 +1284,3210 @@ def superprompt(
 
     Returns:
         Dictionary of question answers.
+
+    Raises:
+        QuestionConfigError: if questions is not a QuestionPlan and any question config is invalid.
+        ResponseError: in headless mode, if an answer is missing or invalid.
     """
-    if isinstance(questions, dict):
-        questions = [questions]
+    run, walker = _start_run(
+        questions,
+        answers,
+        patch_stdout,
+        true_color,
+        kbi_msg,
+        responses,
+        session,
+        journal,
+        resume,
+        on_event,
+        back_key,
+        prefetch,
+        kwargs,
+    )
+    try:
+        return _drive(walker, run)
+    finally:
+        run.close()
 
-    answers = dict(answers or {})
-
-    for question_config in questions:
-        question_config = dict(question_config)
-        # get options from the question_config dict
-        # some of the options are popped out of the dict because prompt() doesn't recognize them
-        # questions is left in the dict and will be handled by recursive calls to superprompt
-        name = question_config.get("name")
-        _type = question_config.get("type")
-        _if = question_config.pop("if", None)
-        nested_questions = question_config.get("questions")
-        multiple = question_config.pop("multiple", None)
-        multiple_message = question_config.pop(
-            "multiple_message", None
-        ) or question_config.get("message")
-
-        # constraint checks
-        if _type in ["dict", "list"] and not nested_questions:
-            raise PromptParameterException("questions")
-
-        if _if and not isinstance(_if, (list, tuple)):
-            raise ValueError(
-                "'if' value must be list or tuple in form [condition, questions]"
-            )
 
-        if multiple:
-            # handle multiple questions (where question is asked repeatedly)
-            # multiple > 0 == ask for exactly multiple values
-            # multiple < 0 == ask for no more than multiple values
-            multiple_answers = []
-            multiple_question = question_config.copy()
+async def superprompt_async(
+    questions: Union[Dict[str, Any], Iterable[Mapping[str, Any]], QuestionPlan],
+    answers: Optional[Mapping[str, Any]] = None,
+    patch_stdout: bool = False,
+    true_color: bool = False,
+    kbi_msg: str = DEFAULT_KBI_MESSAGE,
+    responses: Optional[Union[Mapping[str, Any], str, "os.PathLike[str]"]] = None,
+    session: Union[bool, "QuestionSession"] = False,
+    journal: Optional[Union[str, "os.PathLike[str]", "Journal"]] = None,
+    resume: bool = False,
+    on_event: Optional[Callable[["Event"], Any]] = None,
+    back_key: Optional[str] = None,
+    prefetch: int = 0,
+    **kwargs: Any,
+) -> Dict[str, Any]:
+    """Prompt the user for input on all the questions using asyncio.
 
-            # ask for first answer
-            answers = superprompt(
-                multiple_question,
-                answers,
-                patch_stdout,
-                true_color,
-                kbi_msg,
-                **kwargs,
-            )
-            multiple_answers.append(answers[name])
+    Takes the same arguments and has the same semantics as :func:`superprompt` but every
+    question is asked with ``unsafe_ask_async()`` on the running event loop.
+    In addition, "when", "filter", "if", "choices" and "default" callables may be
+    coroutine functions or otherwise return awaitables, which are awaited.
 
-            # use multiple_message on subsequent prompts
-            if multiple > 0:
-                multiple_question["message"] = multiple_message
+    Returns:
+        Dictionary of question answers.
+    """
+    run, walker = _start_run(
+        questions,
+        answers,
+        patch_stdout,
+        true_color,
+        kbi_msg,
+        responses,
+        session,
+        journal,
+        resume,
+        on_event,
+        back_key,
+        prefetch,
+        kwargs,
+    )
+    try:
+        return await _drive_async(walker, run)
+    finally:
+        run.close()
 
-            n = 1
-            while n < abs(multiple):
-                if multiple < 0 and not confirm(multiple_message).ask():
-                    break
-                answers = superprompt(
-                    multiple_question,
-                    answers,
-                    patch_stdout,
-                    true_color,
-                    kbi_msg,
-                    **kwargs,
-                )
-                multiple_answers.append(answers[name])
-                n += 1
 
-            answers[name] = multiple_answers
-            continue
+def iter_superprompt(
+    questions: Union[Dict[str, Any], Iterable[Mapping[str, Any]], QuestionPlan],
+    answers: Optional[Mapping[str, Any]] = None,
+    patch_stdout: bool = False,
+    true_color: bool = False,
+    kbi_msg: str = DEFAULT_KBI_MESSAGE,
+    responses: Optional[Union[Mapping[str, Any], str, "os.PathLike[str]"]] = None,
+    session: Union[bool, "QuestionSession"] = False,
+    journal: Optional[Union[str, "os.PathLike[str]", "Journal"]] = None,
+    resume: bool = False,
+    on_event: Optional[Callable[["Event"], Any]] = None,
+    back_key: Optional[str] = None,
+    prefetch: int = 0,
+    **kwargs: Any,
+) -> Generator[Tuple[Optional[str], Any], None, Dict[str, Any]]:
+    """Prompt the user for input on all the questions, yielding each answer as it is given.
 
-        if _type in ("list", "dict"):
-            list_dict_questions = nested_questions
-            list_dict_answers = {}
-            list_dict_answers = superprompt(
-                list_dict_questions,
-                list_dict_answers,
-                patch_stdout,
-                true_color,
-                kbi_msg,
-                **kwargs,
-            )
-            if _type == "list":
-                answers[name] = [v for v in list_dict_answers.values()]
-            else:
-                answers[name] = list_dict_answers
+    Takes the same arguments and has the same semantics as :func:`superprompt` but is a
+    generator that yields a ``(path, value)`` tuple as soon as each question is answered,
+    each value of a "multiple" question is given and each "print" message is printed.
+    path is the dotted path of the answer, as used by :class:`AnswerStore`; values of a
+    "multiple" question are numbered, e.g. ``books.0.title``. A "print" yields a value
+    of None and a path of None if it has no name. Questions skipped by "when" yield
+    nothing. The next question isn't asked until the consumer asks for the next event.
+
+    Returns:
+        Dictionary of question answers, as the value of the StopIteration exception
+        (i.e. the result of ``yield from iter_superprompt(...)``).
+    """
+    run, walker = _start_run(
+        questions,
+        answers,
+        patch_stdout,
+        true_color,
+        kbi_msg,
+        responses,
+        session,
+        journal,
+        resume,
+        on_event,
+        back_key,
+        prefetch,
+        kwargs,
+        stream=True,
+    )
+    try:
+        return (yield from _drive_iter(walker, run))
+    finally:
+        run.close()
+
+
+class Event(NamedTuple):
+    """Something that happened during a run of superprompt(); see the on_event option.
+
+    Attributes:
+        kind: What happened, one of:
+
+            * "question_start" - a question is about to be asked; value is its type
+            * "render" - the question's prompt has been rendered for the first time
+            * "answer" - the answer has been received, before it is filtered;
+              value is the answer. The time since "render" is the user's think time.
+            * "question_end" - the answer has been filtered and stored; value is the
+              answer, or None if the question was skipped by "when"
+            * "when", "filter", "if" - a "when", "filter" or "if" callable has returned;
+              duration is the time it took and value is what it returned
+            * "group_enter", "group_exit" - a list/dict group has been entered or exited
+            * "multiple" - a value of a "multiple" question is about to be asked;
+              value is the number of the value, starting at 0
+
+        path: The dotted path of the question or group (see :class:`AnswerStore`)
+        time: time.perf_counter() when it happened
+        duration: For "when", "filter" and "if", seconds taken by the callable
+        value: See kind
+    """
+
+    kind: str
+    path: Optional[str]
+    time: float
+    duration: Optional[float] = None
+    value: Any = None
+
+
+class _Run(NamedTuple):
+    """Options common to every node visited during a single run of superprompt()"""
+
+    patch_stdout: bool
+    kbi_msg: str
+    kwargs: Mapping[str, Any]
+    prompt_kwargs: Mapping[str, Any]
+    headless: bool = False
+    session: Optional["QuestionSession"] = None
+    # if True, the walker yields an _Emit effect for every answer; see iter_superprompt()
+    stream: bool = False
+    journal: Optional["Journal"] = None
+    on_event: Optional[Callable[["Event"], Any]] = None
+    back_key: Optional[str] = None
+    history: Optional["_History"] = None
+    # cache for the questions with the choice_cache option set to True
+    choice_cache: Optional["ChoiceCache"] = None
+    prefetch: Optional["_Prefetcher"] = None
+    deferrals: Optional["_Deferrals"] = None
+    prints: Optional["_Prints"] = None
+
+    def replay(self, kind: str, path: str) -> Any:
+        """Return the answer already given to the question at path, if any, from the
+        run's history or journal; otherwise _MISSING"""
+        if self.history is not None:
+            answer = self.history.answers.get((kind, path), _MISSING)
+            if answer is not _MISSING:
+                return answer
+        if self.journal is not None:
+            return self.journal.replay(kind, path)
+        return _MISSING
+
+    def record(self, kind: str, path: str, answer: Any, secret: bool = False) -> None:
+        """Record answer, given to the question at path, in the run's history and journal;
+        if secret is True (e.g. a password), the answer isn't written to the journal"""
+        if self.history is not None:
+            self.history.record(kind, path, answer)
+        if self.journal is not None:
+            self.journal.record(kind, path, answer, secret)
+
+    def close(self) -> None:
+        """Release anything held for the run once it has finished"""
+        if self.prints is not None:
+            self.prints.flush()
+        if self.journal is not None:
+            self.journal.close()
+        if self.prefetch is not None:
+            self.prefetch.close()
+        if self.deferrals is not None:
+            self.deferrals.close()
+
+    def replaying(self) -> bool:
+        """Return True while the walk is replaying answers given before the question the
+        user went back to; their prints were already written and answers streamed"""
+        return self.history is not None and self.history.replaying()
+
+    @property
+    def terminal_kwargs(self) -> Dict[str, Any]:
+        """The input and output options, if any, passed to every question"""
+        return {k: v for k, v in self.kwargs.items() if k in ("input", "output")}
+
+
+class _History:
+    """The answers given at the prompts of a run with a back key.
+
+    When the user goes back, only the answer to the question before the current one is
+    forgotten and the questions are walked again from the start: every other answer
+    still in the history, including those to the questions the user went back over, is
+    used instead of asking again, and "when", "filter" and "if" callables are only
+    called again if the answers they read have changed. Until the walk reaches the
+    question the user went back to, prints are not written and answers are not streamed
+    again.
+    """
+
+    __slots__ = ("answers", "order", "previous", "results", "editing", "kept")
+
+    def __init__(self) -> None:
+        # (kind, path): answer for every answer in the history
+        self.answers: Dict[Tuple[str, str], Any] = {}
+        # (kind, path) of each answer given or used by the current walk, in order
+        self.order: List[Tuple[str, str]] = []
+        # (kind, path): answer for answers the user went back to change
+        self.previous: Dict[Tuple[str, str], Any] = {}
+        # (kind, path): (callable, inputs, result) for "when", "filter" and "if"
+        # callables; inputs are the answers read, by path, or the answer passed
+        self.results: Dict[Tuple[str, str], Tuple[Callable[..., Any], Any, Any]] = {}
+        # (kind, path) of the answer forgotten by the last rewind, if any
+        self.editing: Optional[Tuple[str, str]] = None
+        # number of answers the walk replays before that answer's question, if any
+        self.kept: Optional[int] = None
+
+    def record(self, kind: str, path: str, answer: Any) -> None:
+        """Record answer, given to the question at path"""
+        self.answers[(kind, path)] = answer
+        self.order.append((kind, path))
+
+    def rewind(self) -> int:
+        """Forget the last answer so its question is asked again and start a new walk
+
+        If the user went back from a question they went back to, its old answer is
+        kept, so it is used again once they have changed the answer before it.
+
+        Returns:
+            The number of answers in the new walk before that question.
+        """
+        editing = self.editing
+        if editing is not None and editing not in self.answers:
+            self.answers[editing] = self.previous.pop(editing)
+        self.editing = None
+        if self.order:
+            key = self.editing = self.order.pop()
+            self.previous[key] = self.answers.pop(key)
+        kept = self.kept = len(self.order)
+        self.order = []
+        return kept
+
+    def replaying(self) -> bool:
+        """Return True until the walk has passed the question the user went back to"""
+        return self.kept is not None and len(self.order) <= self.kept
+
+
+# generator that walks a plan, yielding effects for the driver to perform;
+# see _drive() and _drive_async()
+_Walker = Generator["_Effect", Any, Any]
+
+
+def _start_run(
+    questions: Union[Dict[str, Any], Iterable[Mapping[str, Any]], QuestionPlan],
+    answers: Optional[Mapping[str, Any]],
+    patch_stdout: bool,
+    true_color: bool,
+    kbi_msg: str,
+    responses: Optional[Union[Mapping[str, Any], str, "os.PathLike[str]"]],
+    session: Union[bool, "QuestionSession"],
+    journal: Optional[Union[str, "os.PathLike[str]", "Journal"]],
+    resume: bool,
+    on_event: Optional[Callable[["Event"], Any]],
+    back_key: Optional[str],
+    prefetch: int,
+    kwargs: Mapping[str, Any],
+    stream: bool = False,
+) -> Tuple[_Run, _Walker]:
+    """Set up a run of superprompt(); returns the run options and the plan walker"""
+    if not isinstance(questions, QuestionPlan):
+        questions = compile_questions(questions, **kwargs)
+
+    # options common to every question in the run;
+    # type, name, when and filter are handled per question, not passed to questionary
+    prompt_kwargs = {k: v for k, v in kwargs.items() if k not in PROMPT_OPTIONS}
+    if true_color:
+        from prompt_toolkit.output import ColorDepth
+
+        prompt_kwargs["color_depth"] = ColorDepth.TRUE_COLOR
+
+    if responses is not None and not isinstance(responses, Mapping):
+        responses = load_responses(responses)
+
+    run = _Run(
+        patch_stdout=patch_stdout,
+        kbi_msg=kbi_msg,
+        kwargs=kwargs,
+        prompt_kwargs=prompt_kwargs,
+        headless=responses is not None,
+        session=QuestionSession() if session is True else session or None,
+        stream=stream,
+        journal=(
+            journal
+            if journal is None or isinstance(journal, Journal)
+            else Journal(journal, resume=resume)
+        ),
+        on_event=on_event,
+        back_key=back_key,
+        history=_History() if back_key is not None and responses is None else None,
+        choice_cache=ChoiceCache(maxsize=None),
+        prefetch=_Prefetcher(prefetch) if prefetch and responses is None else None,
+        deferrals=_Deferrals(),
+        prints=_Prints(),
+    )
+    return run, _walk_plan(questions, answers, run, responses)
+
+
+class _Effect:
+    """Something the plan walker needs the driver to do, e.g. ask a question"""
+
+    __slots__ = ()
+
+    def perform(self, run: _Run) -> Any:
+        """Perform the effect synchronously and return the result"""
+        raise NotImplementedError
+
+    async def perform_async(self, run: _Run) -> Any:
+        """Perform the effect on the running event loop and return the result"""
+        raise NotImplementedError
+
+
+class _Ask(_Effect):
+    """Ask a questionary Question"""
+
+    __slots__ = ("question", "path")
+
+    def __init__(self, question: Any, path: str) -> None:
+        self.question = question
+        # path of the answer, for the run's observer
+        self.path = path
+
+    def perform(self, run: _Run) -> Any:
+        question = self._load(run)
+        unwatch = _watch_render(run, self.path, question)
+        try:
+            return question.unsafe_ask(run.patch_stdout)
+        finally:
+            if unwatch is not None:
+                unwatch()
+
+    async def perform_async(self, run: _Run) -> Any:
+        question = self._load(run)
+        unwatch = _watch_render(run, self.path, question)
+        try:
+            return await question.unsafe_ask_async(run.patch_stdout)
+        finally:
+            if unwatch is not None:
+                unwatch()
+
+    def _load(self, run: _Run) -> Any:
+        """Return the question to ask, with the run's back key and session applied"""
+        question = self.question
+        if run.back_key is not None:
+            _bind_back_key(question, run.back_key)
+        if run.session is not None:
+            question = run.session.load(question)
+        return question
+
+
+class _Prints:
+    """The messages of "print" questions waiting to be written.
+
+    Consecutive prints are written together when the walk reaches the next question or
+    group, or the run ends, with one write and flush instead of one per print.
+    """
+
+    __slots__ = ("pending",)
+
+    def __init__(self) -> None:
+        # (message, options) of each print not yet written
+        self.pending: List[Tuple[str, Mapping[str, Any]]] = []
+
+    def add(self, message: str, options: Mapping[str, Any]) -> None:
+        """Write message, with the print question's options, at the next flush"""
+        self.pending.append((message, options))
+
+    def flush(self) -> None:
+        """Write the pending messages"""
+        if self.pending:
+            pending, self.pending = self.pending, []
+            _write_prints(pending)
+
+
+def _write_prints(prints: Sequence[Tuple[str, Mapping[str, Any]]]) -> None:
+    """Print messages as questionary.print() would print each of them, with one write
+    and flush for each run of messages that go to the same output"""
+    from prompt_toolkit import print_formatted_text as _print
+    from prompt_toolkit.formatted_text import FormattedText
+    from questionary.constants import DEFAULT_STYLE
+
+    batches: List[Tuple[Dict[str, Any], List[Tuple[str, str]]]] = []
+    for message, options in prints:
+        options = dict(options)
+        style = options.pop("style", None)
+        end = options.pop("end", "\n")
+        options.pop("sep", None)  # only one value is printed
+        if not batches or batches[-1][0] != options:
+            batches.append((options, []))
+        fragments = batches[-1][1]
+        # questionary.print() gives the text its own style in place of the default one
+        fragments.append(
+            ("class:text" if style is None else f"class:text {style}", message)
+        )
+        fragments.append(("", end))
+    for options, fragments in batches:
+        _print(FormattedText(fragments), end="", style=DEFAULT_STYLE, **options)
+
+
+class _GoBack(Exception):
+    """Raised when the user presses the back key to return to the previous question"""
+
+
+def _bind_back_key(question: "Question", key: str) -> None:
+    """Make key exit question's Application by raising _GoBack"""
+    from prompt_toolkit.key_binding import KeyBindings, merge_key_bindings
+
+    bindings = KeyBindings()
+
+    @bindings.add(key, eager=True)
+    def _go_back(event: Any) -> None:
+        event.app.exit(exception=_GoBack())
+
+    application = question.application
+    if application.key_bindings is not None:
+        bindings = merge_key_bindings([application.key_bindings, bindings])
+    application.key_bindings = bindings
+
+
+def _watch_render(run: _Run, path: str, question: Any) -> Optional[Callable[[], None]]:
+    """Send a "render" event to the run's observer when question is first rendered
+
+    Returns:
+        Function that stops watching, or None if there is nothing to watch.
+    """
+    application = getattr(question, "application", None)
+    if run.on_event is None or application is None:
+        return None
+    rendered = []
+
+    def after_render(_: Any) -> None:
+        if not rendered:
+            rendered.append(True)
+            run.on_event(Event("render", path, time.perf_counter()))
+
+    application.after_render += after_render
+
+    def unwatch() -> None:
+        application.after_render -= after_render
+
+    return unwatch
+
+
+# Application attributes that define how a question looks and behaves,
+# copied from each question's application to the session's application
+_SESSION_APPLICATION_ATTRIBUTES = (
+    "layout",
+    "key_bindings",
+    "style",
+    "style_transformation",
+    "clipboard",
+    "_color_depth",
+    "paste_mode",
+    "editing_mode",
+    "erase_when_done",
+    "reverse_vi_search_direction",
+    "enable_page_navigation_bindings",
+    "cursor",
+    "ttimeoutlen",
+    "timeoutlen",
+)
+
+
+class QuestionSession:
+    """Ask a series of questionary questions in one long-lived prompt_toolkit Application.
+
+    Pass ``session=True`` to :func:`superprompt` to use a session for a single run or pass
+    a QuestionSession instance to share it between runs.
+
+    Each question is still created by questionary but instead of running the question's
+    own Application, its layout, key bindings and style are swapped into the session's
+    Application. The session's renderer, key processor and merged style are created
+    once and the renderer keeps what it has learned about the terminal (e.g. whether it
+    responds to cursor position requests) from one question to the next.
+    """
+
+    def __init__(self) -> None:
+        self.application: Optional["Application"] = None
+
+    def load(self, question: "Question") -> "Question":
+        """Load question into the session's Application.
+
+        Returns:
+            Question that runs the session's Application; ask it as you would question.
+        """
+        from prompt_toolkit.application import Application
+        from questionary.question import Question
+
+        app = question.application
+        host = self.application
+        if host is None or host.input is not app.input or host.output is not app.output:
+            host = self.application = Application(
+                layout=app.layout, input=app.input, output=app.output
+            )
+        for attribute in _SESSION_APPLICATION_ATTRIBUTES:
+            if hasattr(app, attribute):
+                setattr(host, attribute, getattr(app, attribute))
+        # PromptSession based questions (text, confirm, ...) exit their own Application
+        # when the answer is accepted; redirect that to the session's Application
+        app.exit = host.exit
+
+        session_question = Question(host)
+        session_question.should_skip_question = question.should_skip_question
+        session_question.default = question.default
+        return session_question
+
+
+class _Await(_Effect):
+    """Await an awaitable returned by a question's callable"""
+
+    __slots__ = ("awaitable",)
+
+    def __init__(self, awaitable: Awaitable[Any]) -> None:
+        self.awaitable = awaitable
+
+    def perform(self, run: _Run) -> Any:
+        if isinstance(self.awaitable, CoroutineType):
+            self.awaitable.close()
+        raise TypeError("Callable returned an awaitable; use superprompt_async()")
+
+    async def perform_async(self, run: _Run) -> Any:
+        return await self.awaitable
+
+
+class _Emit(_Effect):
+    """Report an answer to the consumer of iter_superprompt()"""
+
+    __slots__ = ("path", "value")
+
+    def __init__(self, path: Optional[str], value: Any) -> None:
+        self.path = path
+        self.value = value
+
+    def perform(self, run: _Run) -> Any:
+        return None
+
+    async def perform_async(self, run: _Run) -> Any:
+        return None
+
+
+def _drive(walker: _Walker, run: _Run) -> Any:
+    """Run walker to completion, performing its effects synchronously"""
+    value = error = None
+    while True:
+        try:
+            effect = walker.send(value) if error is None else walker.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        value = error = None
+        try:
+            value = effect.perform(run)
+        except BaseException as exception:  # pylint: disable=broad-except
+            # e.g. KeyboardInterrupt, which the walker handles
+            error = exception
+
+
+def _drive_iter(
+    walker: _Walker, run: _Run
+) -> Generator[Tuple[Optional[str], Any], None, Any]:
+    """Run walker to completion like _drive() but yield the events it emits"""
+    value = error = None
+    while True:
+        try:
+            effect = walker.send(value) if error is None else walker.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        value = error = None
+        if isinstance(effect, _Emit):
+            if run.prints is not None:
+                run.prints.flush()
+            yield effect.path, effect.value
             continue
+        try:
+            value = effect.perform(run)
+        except BaseException as exception:  # pylint: disable=broad-except
+            error = exception
 
-        # handle 'print' type
-        if _type == "print":
-            try:
-                message = question_config.pop("message")
-            except KeyError as exception:
-                raise PromptParameterException("message") from exception
-
-            # questions can take 'input' arg but print_formatted_text does not
-            # Remove 'input', if present, to avoid breaking during tests
-            for key in ["input", "name", "type"]:
-                question_config.pop(key, None)
-            print_formatted_text(message, **question_config)
-            if name:
-                answers[name] = None
+
+async def _drive_async(walker: _Walker, run: _Run) -> Any:
+    """Run walker to completion, performing its effects on the running event loop"""
+    value = error = None
+    while True:
+        try:
+            effect = walker.send(value) if error is None else walker.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        value = error = None
+        try:
+            value = await effect.perform_async(run)
+        except BaseException as exception:  # pylint: disable=broad-except
+            error = exception
+
+
+def _call(func: Callable[..., Any], *args: Any) -> _Walker:
+    """Call func, awaiting the result if it is awaitable; use with yield from"""
+    result = func(*args)
+    if isinstance(result, AwaitableABC):
+        result = yield _Await(result)
+    return result
+
+
+def _evaluate(
+    run: _Run,
+    kind: str,
+    path: str,
+    func: Callable[..., Any],
+    arg: Any,
+) -> _Walker:
+    """Call a "when", "filter" or "if" callable with arg, an AnswerStore or an answer
+
+    If the run has a history, the result is reused when the callable was called for path
+    in an earlier walk and the answers it read, or the answer it was passed, are unchanged.
+    """
+    history = run.history
+    if history is None:
+        return (yield from _call_timed(run, kind, path, func, arg))
+
+    is_store = isinstance(arg, AnswerStore)
+    cached = history.results.get((kind, path))
+    if cached is not None and cached[0] is func:
+        inputs = cached[1]
+        if is_store:
+            if inputs is not None and all(
+                _same(value, arg.lookup(read)) for read, value in inputs.items()
+            ):
+                return cached[2]
+        elif _same(inputs, arg):
+            return cached[2]
+
+    if is_store:
+        reads = arg.trace()
+        try:
+            result = yield from _call_timed(run, kind, path, func, arg)
+        finally:
+            arg.untrace()
+        # reading every answer in a scope (e.g. iterating) can't be checked cheaply
+        inputs = None if None in reads else reads
+    else:
+        result = yield from _call_timed(run, kind, path, func, arg)
+        inputs = arg
+    history.results[(kind, path)] = (func, inputs, result)
+    return result
+
+
+def _same(a: Any, b: Any) -> bool:
+    """Return True if a and b are the same or equal"""
+    try:
+        return a is b or bool(a == b)
+    except Exception:  # pylint: disable=broad-except
+        return False
+
+
+def _call_timed(
+    run: _Run, kind: str, path: str, func: Callable[..., Any], *args: Any
+) -> _Walker:
+    """Like _call() but send the run's observer an event with the time func took"""
+    if run.on_event is None:
+        return (yield from _call(func, *args))
+    start = time.perf_counter()
+    result = yield from _call(func, *args)
+    end = time.perf_counter()
+    run.on_event(Event(kind, path, end, end - start, result))
+    return result
+
+
+class AnswerStore(MutableMapping):  # type: ignore[type-arg]
+    """The answers given so far in one scope (the top level or a list/dict group) of a run.
+
+    "when", "choices" and "default" callables are passed the AnswerStore of the question's
+    scope. It behaves like the dict of answers they were passed before but, in addition,
+    any answer given so far in the run can be read by its dotted path: the names of its
+    enclosing groups and its own name joined by dots, e.g.
+    ``answers["toppings.extras.allergies"]``; the values of a "multiple" question are
+    numbered, e.g. ``answers["books.0.title"]``. Dotted paths always start at the top level
+    and are looked up in a flat index shared by every scope of the run. The top level
+    scope is available as ``answers.root``.
+
+    Answers are never copied while the questions are asked: each scope writes to its own
+    dict, a group's dict becomes its answer in the enclosing scope and the top level
+    scope reads through to the default answers passed to :func:`superprompt`, only
+    copying them if one of them is deleted. :meth:`to_dict` returns the plain dict of
+    answers once the run is finished.
+    """
+
+    __slots__ = ("_answers", "_defaults", "_index", "_prefix", "_reads", "root")
+
+    def __init__(
+        self,
+        defaults: Optional[Mapping[str, Any]] = None,
+        parent: Optional["AnswerStore"] = None,
+        name: Optional[str] = None,
+    ) -> None:
+        self._answers: Dict[str, Any] = {}
+        self._defaults = defaults or None
+        if parent is None:
+            self._index: Dict[str, Any] = {}
+            self._prefix = ""
+            # path: value of each answer read while tracing (see trace()), shared by
+            # every scope of the run
+            self._reads: List[Optional[Dict[Optional[str], Any]]] = [None]
+            self.root = self
+        else:
+            self._index = parent._index
+            self._prefix = f"{parent._prefix}{name}."
+            self._reads = parent._reads
+            self.root = parent.root
+
+    def child(self, name: str) -> "AnswerStore":
+        """Return a new scope for the answers to group name"""
+        return AnswerStore(parent=self, name=name)
+
+    def path(self, key: str) -> str:
+        """Return the dotted path of key in this scope"""
+        return f"{self._prefix}{key}"
+
+    def add_path(self, key: str, value: Any) -> None:
+        """Index value under key, a path relative to this scope, without storing it
+        as an answer in the scope; e.g. the values of a "multiple" question"""
+        self._index[f"{self._prefix}{key}"] = value
+
+    def snapshot(self) -> "AnswerStore":
+        """Return a copy of the scope that sees the answers given so far in the run but
+        not those given later; it can be read, and traced, from another thread"""
+        copy = AnswerStore.__new__(AnswerStore)
+        copy._answers = dict(self._answers)
+        copy._defaults = self._defaults
+        copy._index = dict(self._index)
+        copy._prefix = self._prefix
+        copy._reads = [None]
+        if self.root is self:
+            copy.root = copy
+        else:
+            root = copy.root = AnswerStore.__new__(AnswerStore)
+            root._answers = dict(self.root._answers)
+            root._defaults = self.root._defaults
+            root._index = copy._index
+            root._prefix = ""
+            root._reads = copy._reads
+            root.root = root
+        return copy
+
+    def trace(self) -> Dict[Optional[str], Any]:
+        """Start recording the answers read from any scope of the run; see untrace()
+
+        Returns:
+            Dict that each answer read is added to, as path: value. Reading every
+            answer in a scope, e.g. by iterating over it, is recorded as a path of None.
+        """
+        reads: Dict[Optional[str], Any] = {}
+        self._reads[0] = reads
+        return reads
+
+    def untrace(self) -> None:
+        """Stop recording the answers read"""
+        self._reads[0] = None
+
+    def lookup(self, path: str) -> Any:
+        """Return the answer at dotted path, from the top level, or _MISSING"""
+        value = self._index.get(path, _MISSING)
+        if value is _MISSING:
+            defaults = self.root._defaults
+            if defaults is not None:
+                value = defaults.get(path, _MISSING)
+        elif type(value) is _Deferred:
+            value = self._index[path] = value.result()
+        return value
+
+    def _get(self, key: str, resolve: bool = True) -> Any:
+        """Return the answer for key or _MISSING
+
+        If resolve is True, waits for the answer's deferred filter, if it has one.
+        """
+        value = self._answers.get(key, _MISSING)
+        if value is _MISSING:
+            if self._defaults is not None and key in self._defaults:
+                value = self._defaults[key]
+            elif isinstance(key, str) and "." in key:
+                value = self._index.get(key, _MISSING)
+        path = None
+        if resolve and type(value) is _Deferred:
+            deferred = value
+            value = deferred.result()
+            if self._answers.get(key) is deferred:
+                self._answers[key] = value
+            path = key if isinstance(key, str) and "." in key else self.path(key)
+            if self._index.get(path) is deferred:
+                self._index[path] = value
+        reads = self._reads[0]
+        if reads is not None:
+            if path is None:
+                path = key if isinstance(key, str) and "." in key else self.path(key)
+            reads[path] = value
+        return value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._get(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return self._get(key) is not _MISSING  # type: ignore[arg-type]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._answers[key] = value
+        self._index[f"{self._prefix}{key}"] = value
+
+    def __delitem__(self, key: str) -> None:
+        if self._defaults is not None and key in self._defaults:
+            # copy on write; the caller's defaults are never modified
+            self._defaults = dict(self._defaults)
+            del self._defaults[key]
+            self._answers.pop(key, None)
+        else:
+            del self._answers[key]
+        self._index.pop(f"{self._prefix}{key}", None)
+
+    def __iter__(self) -> Iterator[str]:
+        if self._reads[0] is not None:
+            self._reads[0][None] = None
+        if self._defaults is None:
+            return iter(self._answers)
+        return itertools.chain(
+            self._defaults, (key for key in self._answers if key not in self._defaults)
+        )
+
+    def __len__(self) -> int:
+        if self._reads[0] is not None:
+            self._reads[0][None] = None
+        if self._defaults is None:
+            return len(self._answers)
+        return len(self._defaults) + sum(
+            key not in self._defaults for key in self._answers
+        )
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def clear(self) -> None:
+        """Remove every answer in the scope, including its entries in the path index"""
+        self._answers.clear()
+        self._defaults = None
+        for path in [path for path in self._index if path.startswith(self._prefix)]:
+            del self._index[path]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the answers in the scope as a plain dict"""
+        if self._defaults is None:
+            return self._answers
+        answers = dict(self._defaults)
+        answers.update(self._answers)
+        return answers
+
+
+class _SequenceFrame:
+    """Work stack frame that asks the questions in a plan, one after the other"""
+
+    __slots__ = (
+        "plan",
+        "nodes",
+        "answers",
+        "responses",
+        "parent",
+        "group",
+        "key",
+        "include",
+    )
+
+    def __init__(
+        self,
+        plan: Union[QuestionPlan, _LazyPlan],
+        answers: AnswerStore,
+        responses: Optional["_Responses"],
+        parent: Optional[AnswerStore] = None,
+        group: Optional[_Node] = None,
+        key: Optional[str] = None,
+        include: Optional[str] = None,
+    ) -> None:
+        self.plan = plan
+        self.nodes = iter(plan)
+        self.answers = answers
+        self.responses = responses
+        # for a list/dict group, the answers of the enclosing scope, the group's node
+        # and the group's path in the enclosing scope
+        self.parent = parent
+        self.group = group
+        self.key = key
+        # for the questions of an "include" question, the file's absolute path
+        self.include = include
+
+
+class _MultipleFrame:
+    """Work stack frame that asks a question with the "multiple" option repeatedly"""
+
+    __slots__ = ("node", "answers", "responses", "item_responses", "values", "asked")
+
+    def __init__(
+        self,
+        node: _Node,
+        answers: AnswerStore,
+        responses: Optional["_Responses"],
+        item_responses: List["_Responses"],
+    ) -> None:
+        self.node = node
+        self.answers = answers
+        self.responses = responses
+        # in headless mode, each value is answered from its own single value scope
+        self.item_responses = item_responses
+        self.values: List[Any] = []
+        # number of times the question has been asked
+        self.asked = 0
+
+    def responses_for(self, n: int) -> Optional["_Responses"]:
+        """Return the responses to use for the n-th value or None if not headless"""
+        if self.responses is None:
+            return None
+        if n < len(self.item_responses):
+            return self.item_responses[n]
+        return _Responses({})
+
+
+def _walk_plan(
+    plan: QuestionPlan,
+    defaults: Optional[Mapping[str, Any]],
+    run: _Run,
+    responses: Optional[Mapping[str, Any]],
+) -> _Walker:
+    """Ask every question in plan; returns the answers as a plain dict
+
+    A keyboard interrupt stops the run; like questionary.prompt(), a message is printed
+    and no answers are returned. If the user presses the back key, the last answer
+    given is forgotten and the questions are walked again from the start, using the
+    answers in the run's history, so that question is asked again and the questions
+    after it that were already answered are not.
+    """
+    while True:
+        answers = AnswerStore(defaults)
+        try:
+            result = yield from _walk_stack(
+                plan,
+                answers,
+                run,
+                None if responses is None else _Responses(responses),
+            )
+            if run.deferrals is not None and run.deferrals.count:
+                _resolve_deferred(result)
+            return result
+        except _GoBack:
+            kept = run.history.rewind()
+            if run.journal is not None:
+                run.journal.rewind(kept)
+        except KeyboardInterrupt:
+            print("")
+            print(run.kbi_msg)
+            print("")
+            return {}
+
+
+def _walk_stack(
+    plan: QuestionPlan,
+    answers: AnswerStore,
+    run: _Run,
+    responses: Optional["_Responses"],
+) -> _Walker:
+    """Ask every question in plan, storing the results in answers; returns the answers
+    as a plain dict
+
+    The tree of questions is walked with an explicit stack of frames rather than by
+    recursion so arbitrarily deep trees and large "multiple" values use bounded
+    Python stack space.
+    """
+    stack: List[Union[_SequenceFrame, _MultipleFrame]] = [
+        _SequenceFrame(plan, answers, responses)
+    ]
+    while stack:
+        frame = stack[-1]
+        if isinstance(frame, _MultipleFrame):
+            yield from _step_multiple(frame, run, stack)
+            continue
+
+        node = next(frame.nodes, None)
+        if node is None:
+            stack.pop()
+            if frame.group is not None:
+                # finished a list/dict group
+                group_answers = frame.answers.to_dict()
+                if run.deferrals is not None and run.deferrals.count:
+                    # later questions may read these answers through the group
+                    _resolve_deferred(group_answers)
+                if frame.group.type == "list":
+                    group_answers = list(group_answers.values())
+                frame.parent[frame.group.name] = group_answers
+                if frame.key != frame.group.name:
+                    frame.parent.add_path(frame.key, group_answers)
+                if run.on_event is not None:
+                    run.on_event(
+                        Event(
+                            "group_exit",
+                            frame.parent.path(frame.key),
+                            time.perf_counter(),
+                        )
+                    )
+            continue
+
+        if run.prefetch is not None:
+            run.prefetch.look_ahead(frame, node)
+
+        if run.prints is not None and node.type not in (PRINT_TYPE, INCLUDE_TYPE):
+            # before the node's callables run, which may be slow or print themselves
+            run.prints.flush()
+
+        if node.multiple and node.multiple_batch is None:
+            stack.append(_start_multiple(node, frame.answers, frame.responses))
             continue
 
-        # ordinary question, call prompt
-        # remove keys that prompt doesn't understand
-        question_config.pop("questions", None)
-        answers = prompt(
-            question_config, answers, patch_stdout, true_color, kbi_msg, **kwargs
+        yield from _start_node(
+            node, frame.answers, run, frame.responses, stack, node.name
         )
 
         # handle "if" condition
-        if _if:
-            condition, nested_questions = _if
+        if node.if_questions is not None and node.type not in GROUP_TYPES + (
+            PRINT_TYPE,
+            INCLUDE_TYPE,
+        ):
+            condition = node.if_condition
+            answer = frame.answers.get(node.name)
             try:
                 if callable(condition):
-                    if not condition(answers.get(name)):
+                    path = frame.answers.path(node.name)
+                    if not (yield from _evaluate(run, "if", path, condition, answer)):
+                        if run.prefetch is not None:
+                            run.prefetch.cancel(node.if_questions, frame.answers)
                         continue
-                elif answers.get(name) != condition:
+                elif answer != condition:
+                    if run.prefetch is not None:
+                        run.prefetch.cancel(node.if_questions, frame.answers)
                     continue
             except Exception as exception:
                 raise ValueError(
-                    f"Problem in 'if' check of " f"{name} question: {exception}"
+                    f"Problem in 'if' check of " f"{node.name} question: {exception}"
                 ) from exception
-            answers = superprompt(
-                nested_questions,
-                answers,
-                patch_stdout,
-                true_color,
-                kbi_msg,
-                **kwargs,
+            if_questions = node.if_questions
+            if isinstance(if_questions, _LazyQuestions):
+                if_questions = yield from if_questions.expand(frame.answers)
+            stack.append(_SequenceFrame(if_questions, frame.answers, frame.responses))
+
+    return answers.to_dict()
+
+
+def _start_multiple(
+    node: _Node, answers: AnswerStore, responses: Optional["_Responses"]
+) -> _MultipleFrame:
+    """Return the frame that asks node, which has the "multiple" option"""
+    item_responses: List[_Responses] = []
+    if responses is not None:
+        items = responses.get(node.name, [])
+        if not isinstance(items, (list, tuple)):
+            raise ResponseError(
+                f"Answer to multiple question {node.name} must be a list of values"
+            )
+        if len(items) > abs(node.multiple):
+            raise ResponseError(
+                f"Too many answers to multiple question {node.name}: "
+                f"expected at most {abs(node.multiple)}, got {len(items)}"
+            )
+        item_responses = [_Responses({node.name: item}) for item in items]
+    return _MultipleFrame(node, answers, responses, item_responses)
+
+
+def _step_multiple(
+    frame: _MultipleFrame,
+    run: _Run,
+    stack: List[Union[_SequenceFrame, _MultipleFrame]],
+) -> _Walker:
+    """Collect the last value asked by frame, if any, then ask for the next one"""
+    # handle multiple questions (where question is asked repeatedly)
+    # multiple > 0 == ask for exactly multiple values
+    # multiple < 0 == ask for no more than multiple values
+    node = frame.node
+    multiple = node.multiple
+    name = node.name
+    if frame.asked:
+        value = frame.answers._get(name, resolve=False)
+        if frame.asked == 1 and value is _MISSING:
+            # question was skipped by its 'when' condition
+            stack.pop()
+            return
+        frame.values.append(value)
+
+    n = frame.asked
+    done = n >= abs(multiple)
+    if not done and n and multiple < 0:
+        if frame.responses is not None:
+            done = n >= len(frame.item_responses)
+        else:
+            path = frame.answers.path(f"{name}.{n}")
+            more = run.replay("more", path)
+            if more is _MISSING:
+                more = yield _Ask(
+                    confirm(node.multiple_message, **run.terminal_kwargs), path
+                )
+            run.record("more", path, more)
+            done = not more
+    if done:
+        stack.pop()
+        if run.deferrals is not None and run.deferrals.count:
+            # later questions may read the values through the list
+            _resolve_deferred(frame.values)
+        frame.answers[name] = frame.values
+        return
+
+    frame.asked += 1
+    if run.on_event is not None:
+        run.on_event(
+            Event("multiple", frame.answers.path(name), time.perf_counter(), value=n)
+        )
+    # use multiple_message on subsequent prompts
+    repeat = node if n == 0 else node.repeat or node
+    yield from _start_node(
+        repeat, frame.answers, run, frame.responses_for(n), stack, f"{name}.{n}"
+    )
+
+
+def _start_node(
+    node: _Node,
+    answers: AnswerStore,
+    run: _Run,
+    responses: Optional["_Responses"],
+    stack: List[Union[_SequenceFrame, _MultipleFrame]],
+    key: str,
+) -> _Walker:
+    """Ask a single question or print node, storing the result in answers,
+    or push the frame that asks a group's questions.
+
+    key is the path of the result in answers' scope: the node's name or, for a value of
+    a "multiple" question, the name and the value's number.
+    """
+    if node.type in GROUP_TYPES:
+        questions = node.questions
+        if isinstance(questions, _LazyQuestions):
+            questions = yield from questions.expand(answers)
+        if responses is not None:
+            responses = _Responses(responses.get(node.name, {}))
+        elif node.layout == FORM_LAYOUT:
+            # the answers from the form are used as the group's responses, so they are
+            # filtered and stored exactly as if each question had been asked in turn
+            responses = yield from _ask_form(node, questions, answers, run, key)
+        stack.append(
+            _SequenceFrame(
+                questions,
+                answers.child(key),
+                responses,
+                parent=answers,
+                group=node,
+                key=key,
+            )
+        )
+        if run.on_event is not None:
+            run.on_event(Event("group_enter", answers.path(key), time.perf_counter()))
+        return
+
+    # questions from a file are asked in the current scope
+    if node.type == INCLUDE_TYPE:
+        include = os.path.abspath(node.questions.path)
+        # the files whose questions are being asked, outermost first
+        including = [
+            frame.include
+            for frame in stack
+            if type(frame) is _SequenceFrame and frame.include is not None
+        ]
+        if include in including:
+            cycle = " -> ".join(including[including.index(include) :] + [include])
+            raise _question_config_error_class()(
+                [(include, ValueError(f"include cycle: {cycle}"))]
+            )
+        stack.append(
+            _SequenceFrame(node.questions.load(), answers, responses, include=include)
+        )
+        return
+
+    # handle 'print' type
+    if node.type == PRINT_TYPE:
+        # a walk started by the back key doesn't write what it already wrote
+        replaying = run.replaying()
+        if responses is None:
+            if not replaying:
+                message = node.config["message"]
+                if node.template is not None:
+                    message = node.template(answers)
+                # written with any other prints before the next question
+                run.prints.add(message, node.prompt_kwargs)
+        elif node.name:
+            # consume the print's placeholder value when answering a list by position
+            responses.get(node.name)
+        if node.name:
+            answers[node.name] = None
+        if run.stream and not replaying:
+            yield _Emit(answers.path(key) if node.name else None, None)
+        return
+
+    # ordinary question
+    yield from _ask_question(node, answers, run, responses, key)
+
+
+def _ask_form(
+    node: _Node,
+    questions: "_Plan",
+    answers: AnswerStore,
+    run: _Run,
+    key: str,
+) -> _Walker:
+    """Ask every question of group node, which has the "form" layout, in one form;
+    returns the answers given as the responses for the group's questions"""
+    path = answers.path(key)
+    values = run.replay("form", path)
+    resolved: Optional[Dict[str, Dict[str, Any]]] = None
+    if values is _MISSING:
+        scope = answers.child(key)
+        fields = []
+        # the questions are answered from the form's values with these options, so
+        # their choices and default callables aren't called again
+        resolved = {}
+        for field in questions:
+            _kwargs = dict(run.prompt_kwargs)
+            _kwargs.update(field.prompt_kwargs)
+            choices = _kwargs.get("choices")
+            if choices is not None and callable(choices):
+                _kwargs["choices"] = yield from _provide_choices(
+                    run, field.config, choices, scope, scope.path(field.name)
+                )
+            if callable(_kwargs.get("default")):
+                _kwargs["default"] = yield from _call(_kwargs["default"], scope)
+            if field.template is not None:
+                _kwargs["message"] = field.template(scope)
+            fields.append((field.type, _kwargs))
+            resolved[field.name] = _kwargs
+        if run.history is not None:
+            # the user went back to change the form; start from the old answers
+            previous = run.history.previous.get(("form", path), _MISSING)
+            if previous is not _MISSING:
+                fields = [
+                    (_type, dict(_kwargs, default=value))
+                    for (_type, _kwargs), value in zip(fields, previous)
+                ]
+        kwargs = {k: v for k, v in run.prompt_kwargs.items() if k != "message"}
+        message = node.config.get("message") or node.name or ""
+        values = yield _Ask(_form(message, fields, **kwargs), path)
+    secret = any(field.type == "password" for field in questions)
+    run.record("form", path, values, secret)
+    if resolved is None:
+        return _Responses(values)
+    return _FormResponses(values, resolved)
+
+
+def _ask_question(
+    node: _Node,
+    answers: AnswerStore,
+    run: _Run,
+    responses: Optional["_Responses"],
+    key: str,
+) -> _Walker:
+    """Ask an ordinary questionary question; equivalent to questionary.unsafe_prompt()
+    for a single, already validated, question config"""
+    config = node.config
+    kwargs = run.kwargs
+    path = answers.path(key)
+    on_event = run.on_event
+    if on_event is not None:
+        on_event(Event("question_start", path, time.perf_counter(), value=node.type))
+    when = config.get("when") or kwargs.get("when")
+    if when:
+        try:
+            if not (yield from _evaluate(run, "when", path, when, answers)):
+                if on_event is not None:
+                    on_event(Event("question_end", path, time.perf_counter()))
+                return
+        except Exception as exception:
+            raise ValueError(
+                f"Problem in 'when' check of {node.name} question: {exception}"
+            ) from exception
+
+    answer = _MISSING if responses is not None else run.replay("answer", path)
+    # answered in a form, which already called the choices and default callables
+    resolved = None
+    if type(responses) is _FormResponses:
+        resolved = responses.kwargs.get(node.name)
+    if answer is _MISSING and resolved is not None:
+        _kwargs = dict(resolved)
+    elif answer is _MISSING:
+        _kwargs = dict(run.prompt_kwargs)
+        _kwargs.update(node.prompt_kwargs)
+        choices = _kwargs.get("choices")
+        if choices is not None and callable(choices):
+            _kwargs["choices"] = yield from _provide_choices(
+                run, config, choices, answers, path
+            )
+        if callable(_kwargs.get("default")):
+            prefetched = None
+            if run.prefetch is not None:
+                prefetched = run.prefetch.take(
+                    "default", path, _kwargs["default"], answers
+                )
+            if prefetched is None:
+                _kwargs["default"] = yield from _call(_kwargs["default"], answers)
+            else:
+                _kwargs["default"] = prefetched[1]
+        if node.template is not None:
+            _kwargs["message"] = node.template(answers)
+    if answer is _MISSING:
+        if node.multiple_batch is not None:
+            _kwargs["validate"] = _BatchValidation(node, _kwargs.get("validate"))
+            if isinstance(_kwargs.get("default"), (list, tuple)):
+                _kwargs["default"] = node.multiple_batch.join(
+                    map(str, _kwargs["default"])
+                )
+
+        if responses is None:
+            if isinstance(_kwargs.get("validate"), AsyncValidation):
+                _kwargs["validate"] = _kwargs["validate"].validator()
+            if run.history is not None and node.type in BACK_DEFAULT_TYPES:
+                # the user went back to change this answer; start from the old one
+                previous = run.history.previous.get(("answer", path), _MISSING)
+                if previous is not _MISSING:
+                    _kwargs["default"] = previous
+            answer = yield _Ask(prompt_by_name(node.type)(**_kwargs), path)
+        else:
+            answer = _response_answer(node, responses, _kwargs)
+    if responses is None:
+        run.record("answer", path, answer, node.type == "password")
+    if on_event is not None:
+        on_event(Event("answer", path, time.perf_counter(), value=answer))
+
+    if answer is not None:
+        batch = node.multiple_batch is not None
+        if batch:
+            answer = _batch_values(answer, node.multiple_batch)
+        _filter = config.get("filter") or kwargs.get("filter")
+        defer = config.get("defer_filter", kwargs.get("defer_filter"))
+        if _filter and defer:
+            # run on an executor; the answer is only waited for when it is read
+            if batch:
+                _filter = functools.partial(_filter_values, _filter)
+            answer = run.deferrals.submit(defer, _filter, answer, node.name)
+        elif _filter:
+            try:
+                if batch:
+                    values = []
+                    for n, value in enumerate(answer):
+                        values.append(
+                            (
+                                yield from _evaluate(
+                                    run, "filter", f"{path}.{n}", _filter, value
+                                )
+                            )
+                        )
+                    answer = values
+                else:
+                    answer = yield from _evaluate(run, "filter", path, _filter, answer)
+            except Exception as exception:
+                raise ValueError(
+                    f"Problem processing 'filter' of {node.name} question: {exception}"
+                ) from exception
+        answers[node.name] = answer
+        if key != node.name:
+            answers.add_path(key, answer)
+        if batch and type(answer) is list:
+            for n, value in enumerate(answer):
+                answers.add_path(f"{key}.{n}", value)
+    if on_event is not None:
+        on_event(
+            Event(
+                "question_end",
+                path,
+                time.perf_counter(),
+                # a deferred filter's result isn't waited for
+                value=answer.answer if type(answer) is _Deferred else answer,
             )
+        )
+    if run.stream and answer is not None and not run.replaying():
+        if type(answer) is _Deferred:
+            answer = answer.result()
+        yield _Emit(path, answer)
+
+
+def _provide_choices(
+    run: _Run,
+    config: Mapping[str, Any],
+    provider: Callable[..., Any],
+    answers: AnswerStore,
+    path: str,
+) -> _Walker:
+    """Return the choices from provider, using the question's choice cache if it has one
+    and the result of a prefetch if there is one"""
+    cache = config.get("choice_cache", run.kwargs.get("choice_cache"))
+    if cache is True:
+        cache = run.choice_cache
+    if cache:
+        choices = cache.get(provider, answers)
+        if choices is not _MISSING:
+            return choices
+
+    prefetched = None
+    if run.prefetch is not None:
+        prefetched = run.prefetch.take("choices", path, provider, answers)
+    if prefetched is not None:
+        reads, choices = prefetched
+    elif not cache:
+        return (yield from _call(provider, answers))
+    else:
+        reads = answers.trace()
+        try:
+            choices = yield from _call(provider, answers)
+        finally:
+            answers.untrace()
+    if cache:
+        if not isinstance(choices, (list, tuple)):
+            choices = list(choices)
+        cache.put(provider, reads, choices)
+    return choices
+
+
+class _Deferred:
+    """Placeholder for the answer of a question whose filter is running on an executor"""
+
+    __slots__ = ("future", "answer", "name")
+
+    def __init__(self, future: Any, answer: Any, name: Optional[str]) -> None:
+        self.future = future
+        # the answer before filtering
+        self.answer = answer
+        self.name = name
+
+    def result(self) -> Any:
+        """Wait for the filter and return the filtered answer"""
+        try:
+            return self.future.result()
+        except Exception as exception:
+            raise ValueError(
+                f"Problem processing 'filter' of {self.name} question: {exception}"
+            ) from exception
 
-    return answers
+
+class _Deferrals:
+    """Runs the deferred filters of a run"""
+
+    __slots__ = ("executor", "count")
+
+    def __init__(self) -> None:
+        # the run's own executor, created for the first filter deferred to it
+        self.executor: Optional["concurrent.futures.Executor"] = None
+        self.count = 0
+
+    def submit(
+        self,
+        executor: Any,
+        func: Callable[[Any], Any],
+        answer: Any,
+        name: Optional[str],
+    ) -> _Deferred:
+        """Start func(answer) on executor (True for the run's own thread pool)"""
+        if executor is True:
+            if self.executor is None:
+                import concurrent.futures
+
+                self.executor = concurrent.futures.ThreadPoolExecutor(
+                    thread_name_prefix="superprompt-filter"
+                )
+            executor = self.executor
+        self.count += 1
+        return _Deferred(executor.submit(func, answer), answer, name)
+
+    def close(self) -> None:
+        """Stop the run's own thread pool"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+
+def _resolve_deferred(answers: Union[Dict[str, Any], List[Any]]) -> None:
+    """Replace the placeholders for deferred filters in answers, and in the dicts and
+    lists nested in it, with the filtered answers"""
+    stack: List[Any] = [answers]
+    seen = set()
+    while stack:
+        container = stack.pop()
+        if id(container) in seen:
+            continue
+        seen.add(id(container))
+        items = (
+            container.items() if isinstance(container, dict) else enumerate(container)
+        )
+        for key, value in list(items):
+            if type(value) is _Deferred:
+                container[key] = value.result()
+            elif isinstance(value, (dict, list)):
+                stack.append(value)
+
+
+class ChoiceCache:
+    """Cache of the choices returned by "choices" callables (providers).
+
+    Set a question's choice_cache option, or pass choice_cache to :func:`superprompt` for
+    every question, to True to cache its choices for the rest of the run (e.g. while a
+    "multiple" question is asked again) or to a ChoiceCache to share the cache between
+    runs. A provider's choices are cached under the answers it read (see
+    :meth:`AnswerStore.trace`) and reused while those answers are the same; a provider
+    that iterates over the answers is not cached.
+
+    Args:
+        maxsize: most sets of choices kept; the least recently used are evicted first.
+            None for no limit.
+        ttl: seconds that choices are kept for, or None to keep them until evicted.
+    """
+
+    def __init__(
+        self, maxsize: Optional[int] = 128, ttl: Optional[float] = None
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # (provider, paths read, values read): (expiry time, choices)
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[float, Any]]" = OrderedDict()
+        # provider: the distinct tuples of paths it has read
+        self._reads: Dict[Any, List[Tuple[str, ...]]] = {}
+
+    def get(self, provider: Callable[..., Any], answers: AnswerStore) -> Any:
+        """Return the cached choices of provider for answers, or _MISSING"""
+        for paths in self._reads.get(provider, ()):
+            key = (provider, paths, tuple(answers.lookup(path) for path in paths))
+            try:
+                entry = self._entries.get(key)
+            except TypeError:  # unhashable answer
+                continue
+            if entry is None:
+                continue
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                continue
+            self._entries.move_to_end(key)
+            return entry[1]
+        return _MISSING
+
+    def put(
+        self,
+        provider: Callable[..., Any],
+        reads: Mapping[Optional[str], Any],
+        choices: Any,
+    ) -> None:
+        """Cache the choices provider returned after reading reads"""
+        if None in reads:
+            return
+        paths = tuple(reads)
+        key = (provider, paths, tuple(reads.values()))
+        expires = float("inf") if self.ttl is None else time.monotonic() + self.ttl
+        try:
+            self._entries[key] = (expires, choices)
+        except TypeError:  # unhashable answer
+            return
+        self._entries.move_to_end(key)
+        known = self._reads.setdefault(provider, [])
+        if paths not in known:
+            known.append(paths)
+        if self.maxsize is not None:
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every cached set of choices"""
+        self._entries.clear()
+        self._reads.clear()
+
+
+class _Prefetcher:
+    """Calls the "choices" and "default" callables of the questions likely to be asked
+    next on a pool of threads, while the current question is being answered.
+
+    Each call is passed a snapshot of the answers (see :meth:`AnswerStore.snapshot`) and
+    its result is only used if the answers it read are unchanged when its question is
+    reached.
+    """
+
+    def __init__(self, workers: int) -> None:
+        import concurrent.futures
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            int(workers), thread_name_prefix="superprompt-prefetch"
+        )
+        # (kind, path): (callable, future of (answers read, result))
+        self._pending: Dict[
+            Tuple[str, str], Tuple[Callable[..., Any], "concurrent.futures.Future"]
+        ] = {}
+
+    def look_ahead(self, frame: _SequenceFrame, node: _Node) -> None:
+        """Start the calls for the questions that follow node in frame and for the
+        questions in node's "if" branch"""
+        import inspect
+        import operator
+
+        upcoming: List[_Node] = []
+        if isinstance(frame.plan, QuestionPlan):
+            nodes = frame.plan._nodes
+            start = len(nodes) - operator.length_hint(frame.nodes)
+            upcoming.extend(nodes[start : start + PREFETCH_LOOKAHEAD])
+        if isinstance(node.if_questions, QuestionPlan):
+            upcoming.extend(node.if_questions._nodes[:PREFETCH_LOOKAHEAD])
+        for upcoming_node in upcoming:
+            if upcoming_node.multiple or upcoming_node.type in _NOT_PREFETCHED_TYPES:
+                continue
+            path = frame.answers.path(upcoming_node.name)
+            for kind in ("choices", "default"):
+                func = upcoming_node.prompt_kwargs.get(kind)
+                if (
+                    not callable(func)
+                    or (kind, path) in self._pending
+                    or inspect.iscoroutinefunction(func)
+                ):
+                    continue
+                future = self._executor.submit(
+                    _prefetch_call, kind, func, frame.answers.snapshot()
+                )
+                self._pending[(kind, path)] = (func, future)
+
+    def take(
+        self, kind: str, path: str, func: Callable[..., Any], answers: AnswerStore
+    ) -> Optional[Tuple[Dict[Optional[str], Any], Any]]:
+        """Return the answers read by, and the result of, the prefetched call of func for
+        the question at path, or None if there is no usable result"""
+        entry = self._pending.pop((kind, path), None)
+        if entry is None or entry[0] is not func:
+            return None
+        try:
+            reads, result = entry[1].result()
+        except Exception:  # pylint: disable=broad-except
+            # call it again when the question is asked, to raise the error there
+            return None
+        if None in reads or not all(
+            _same(value, answers.lookup(read)) for read, value in reads.items()
+        ):
+            return None
+        return reads, result
+
+    def cancel(self, plan: Any, answers: AnswerStore) -> None:
+        """Cancel the calls for the questions in plan, e.g. an "if" branch not taken"""
+        if not isinstance(plan, QuestionPlan):
+            return
+        for node in plan:
+            for kind in ("choices", "default"):
+                entry = self._pending.pop((kind, answers.path(node.name)), None)
+                if entry is not None:
+                    entry[1].cancel()
+
+    def close(self) -> None:
+        """Cancel the calls that haven't started and stop the threads"""
+        for _, future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self._executor.shutdown(wait=False)
+
+
+# number of upcoming questions in a group, and in an "if" branch, that are prefetched
+PREFETCH_LOOKAHEAD = 3
+
+_NOT_PREFETCHED_TYPES = GROUP_TYPES + (PRINT_TYPE, INCLUDE_TYPE)
+
+
+def _prefetch_call(
+    kind: str, func: Callable[..., Any], answers: AnswerStore
+) -> Tuple[Dict[Optional[str], Any], Any]:
+    """Call func with answers on a prefetch thread; returns the answers it read and the
+    result"""
+    reads = answers.trace()
+    try:
+        result = func(answers)
+    finally:
+        answers.untrace()
+    if isinstance(result, AwaitableABC):
+        if isinstance(result, CoroutineType):
+            result.close()
+        raise TypeError("awaitable results are not prefetched")
+    if kind == "choices" and not isinstance(result, (list, tuple)):
+        result = list(result)
+    return reads, result
+
+
+class ChoiceIndex:
+    """Search index of the choices of a "search_select" question.
+
+    Build the index once, e.g. with a "choices" callable and the choice_cache option,
+    and pass it as the question's choices; building it takes time proportional to the
+    total length of the choices' titles. Searching finds the choices whose title
+    contains the query, ignoring case, in their original order. The index has a
+    posting list of the choices containing each substring of up to three characters,
+    and a bitmap of the choices containing each trigram found in at least 1 in 32 of
+    them. A query of up to three characters is answered straight from its posting
+    list. For a longer query, the bitmaps of its common trigrams are intersected and
+    only the choices in the intersection, and in the shortest posting list of its rarer
+    trigrams, are checked: at most 1 in 32 choices if it has a rarer trigram, and
+    usually none if no choice contains it. Matches are found lazily, only until enough
+    have been found to fill the visible window, so the time taken by each keystroke
+    grows far more slowly than the number of choices, and not at all for queries of up
+    to three characters.
+
+    Args:
+        choices: strings, {"name": title, "value": value} mappings or questionary
+            Choice objects.
+    """
+
+    def __init__(self, choices: Iterable[Any]) -> None:
+        from array import array
+
+        self.titles: List[str] = []
+        self.values: List[Any] = []
+        for choice in choices:
+            if isinstance(choice, str):
+                title = value = choice
+            elif isinstance(choice, Mapping):
+                title = choice["name"]
+                value = choice.get("value")
+                if value is None:
+                    value = title
+            else:  # questionary Choice
+                title = choice.title
+                if isinstance(title, list):  # formatted text
+                    title = "".join(text for _, text, *_ in title)
+                value = choice.value
+            self.titles.append(str(title))
+            self.values.append(value)
+        self._lower = [title.lower() for title in self.titles]
+        grams: Dict[str, List[int]] = {}
+        for i, text in enumerate(self._lower):
+            substrings = {text[j : j + 3] for j in range(len(text))}
+            substrings.update([gram[:2] for gram in substrings])
+            substrings.update([gram[:1] for gram in substrings])
+            for gram in substrings:
+                ids = grams.get(gram)
+                if ids is None:
+                    grams[gram] = [i]
+                else:
+                    ids.append(i)
+        self._grams = {gram: array("i", ids) for gram, ids in grams.items()}
+        # bitmaps of the trigrams in at least 1 in 32 choices, no larger than their
+        # posting lists, so a longer query's trigrams are intersected quickly
+        self._bitmaps: Dict[str, int] = {}
+        dense = max(len(self.titles) // 32, 1)
+        for gram, ids in grams.items():
+            if len(gram) == 3 and len(ids) >= dense:
+                bits = bytearray((len(self.titles) + 7) // 8)
+                for i in ids:
+                    bits[i >> 3] |= 1 << (i & 7)
+                self._bitmaps[gram] = int.from_bytes(bits, "little")
+        self._value_set: Optional[set] = None
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def __contains__(self, value: Any) -> bool:
+        if self._value_set is None:
+            try:
+                self._value_set = set(self.values)
+            except TypeError:  # unhashable values
+                return value in self.values
+        try:
+            return value in self._value_set
+        except TypeError:
+            return value in self.values
+
+    def search(self, query: str) -> Iterator[int]:
+        """Yield the positions of the choices whose title contains query, in order"""
+        query = query.lower()
+        if not query:
+            yield from range(len(self.titles))
+            return
+        if len(query) <= 3:
+            yield from self._grams.get(query, ())
+            return
+        postings = {}
+        for j in range(len(query) - 2):
+            gram = query[j : j + 3]
+            ids = self._grams.get(gram)
+            if ids is None:
+                return
+            postings[gram] = ids
+        lower = self._lower
+        # the choices containing every trigram with a bitmap, as bytes
+        mask = None
+        for gram in postings:
+            bitmap = self._bitmaps.get(gram)
+            if bitmap is not None:
+                mask = bitmap if mask is None else mask & bitmap
+        if mask is not None:
+            if not mask:
+                return
+            mask = mask.to_bytes((len(lower) + 7) // 8, "little")
+        sparse = [ids for gram, ids in postings.items() if gram not in self._bitmaps]
+        if sparse:
+            for i in min(sparse, key=len):
+                if (mask is None or mask[i >> 3] >> (i & 7) & 1) and query in lower[i]:
+                    yield i
+            return
+
+        import re
+
+        for match in re.finditer(b"[^\\x00]", mask):
+            byte = match.start()
+            bits = mask[byte]
+            for bit in range(8):
+                if bits >> bit & 1 and query in lower[byte * 8 + bit]:
+                    yield byte * 8 + bit
+
+
+class _SearchState:
+    """The query, matches, pointer and selection of a search_select prompt"""
+
+    def __init__(
+        self, index: ChoiceIndex, page_size: int, multiselect: bool, default: Any
+    ) -> None:
+        self.index = index
+        self.page_size = page_size
+        self.multiselect = multiselect
+        self.selected: set = set()
+        self.is_answered = False
+        self.set_query("")
+        if multiselect and default is not None:
+            defaults = list(default)
+            self.selected = {
+                i for i, value in enumerate(index.values) if value in defaults
+            }
+        elif default is not None:
+            for position, i in enumerate(self._more_matches()):
+                if index.values[i] == default:
+                    self.move(position)
+                    break
+
+    def set_query(self, query: str) -> None:
+        """Search for query, showing the first page of matches"""
+        self.query = query
+        self.matches: List[int] = []
+        self._more: Optional[Iterator[int]] = self.index.search(query)
+        self.pointer = self.top = 0
+        self._fill(self.page_size)
+
+    def _fill(self, count: int) -> None:
+        """Find matches until there are count of them or there are no more"""
+        more = self._more
+        if more is None:
+            return
+        matches = self.matches
+        for i in more:
+            matches.append(i)
+            if len(matches) >= count:
+                return
+        self._more = None
+
+    def _more_matches(self) -> Iterator[int]:
+        """Yield every match, finding more as needed"""
+        position = 0
+        while True:
+            self._fill(position + 1)
+            if position >= len(self.matches):
+                return
+            yield self.matches[position]
+            position += 1
+
+    def move(self, delta: int) -> None:
+        """Move the pointer by delta matches, scrolling the visible window"""
+        self._fill(self.pointer + delta + 1)
+        self.pointer = max(0, min(self.pointer + delta, len(self.matches) - 1))
+        if self.pointer < self.top:
+            self.top = self.pointer
+        elif self.pointer >= self.top + self.page_size:
+            self.top = self.pointer - self.page_size + 1
+
+    def toggle(self) -> None:
+        """Select or deselect the choice at the pointer"""
+        if self.matches:
+            self.selected ^= {self.matches[self.pointer]}
+
+    def result(self) -> Any:
+        """Return the value, or the values, chosen"""
+        values = self.index.values
+        if self.multiselect:
+            return [values[i] for i in sorted(self.selected)]
+        return values[self.matches[self.pointer]] if self.matches else None
+
+    def window(self, pointer: str) -> List[Tuple[str, str]]:
+        """Return the formatted text of the visible matches"""
+        self._fill(self.top + self.page_size)
+        titles = self.index.titles
+        tokens: List[Tuple[str, str]] = []
+        if not self.matches:
+            tokens.append(("class:instruction", "  No matches"))
+        for position in range(
+            self.top, min(self.top + self.page_size, len(self.matches))
+        ):
+            i = self.matches[position]
+            pointed = position == self.pointer
+            if pointed:
+                tokens.append(("class:pointer", pointer))
+            else:
+                tokens.append(("", " " * len(pointer)))
+            if self.multiselect:
+                mark = "● " if i in self.selected else "○ "
+                tokens.append(("class:selected" if i in self.selected else "", mark))
+            tokens.append(("class:highlighted" if pointed else "", f" {titles[i]}"))
+            tokens.append(("", "\n"))
+        if tokens and tokens[-1] == ("", "\n"):
+            tokens.pop()
+        return tokens
+
+
+def search_select(
+    message: str,
+    choices: Union[ChoiceIndex, Sequence[Any]],
+    default: Any = None,
+    multiselect: bool = False,
+    page_size: int = 10,
+    qmark: str = "?",
+    pointer: str = "»",
+    style: Any = None,
+    instruction: Optional[str] = None,
+    **kwargs: Any,
+) -> "Question":
+    """Ask the user to choose from a long list of choices by typing to search it.
+
+    Only the matches in the visible window are found and rendered, so a list of any
+    size stays responsive. Typing filters the choices to those whose title contains
+    the text typed, ignoring case; up/down and page up/down move the pointer and enter
+    accepts. With multiselect, space selects or deselects the choice at the pointer
+    and the answer is the list of the values selected.
+
+    Args:
+        message: Question text.
+        choices: A :class:`ChoiceIndex` or the choices to index, as for "select".
+        default: Value of the choice the pointer starts at or, with multiselect, the
+            values initially selected.
+        multiselect: Allow more than one choice to be selected.
+        page_size: Number of matches shown at a time.
+        qmark, pointer, style, instruction: As for questionary.select().
+        kwargs: Additional arguments passed to the prompt_toolkit Application.
+
+    Returns:
+        Question instance, ready to be prompted (using ``.ask()``).
+    """
+    from prompt_toolkit.application import Application
+    from prompt_toolkit.filters import Condition
+    from prompt_toolkit.key_binding import KeyBindings
+    from prompt_toolkit.keys import Keys
+    from prompt_toolkit.layout import ConditionalContainer, HSplit, Layout, Window
+    from prompt_toolkit.layout.controls import FormattedTextControl
+    from prompt_toolkit.layout.dimension import Dimension
+    from prompt_toolkit.styles import merge_styles
+    from questionary import utils
+    from questionary.constants import DEFAULT_STYLE
+    from questionary.question import Question
+
+    index = choices if isinstance(choices, ChoiceIndex) else ChoiceIndex(choices)
+    state = _SearchState(index, page_size, multiselect, default)
+    if instruction is None:
+        instruction = (
+            "(Type to search, space to select, enter to accept)"
+            if multiselect
+            else "(Type to search, enter to accept)"
+        )
+
+    def get_prompt_tokens() -> List[Tuple[str, str]]:
+        tokens = [("class:qmark", qmark), ("class:question", f" {message} ")]
+        if state.is_answered:
+            if multiselect:
+                count = len(state.selected)
+                answer = f"done ({count} selection{'' if count == 1 else 's'})"
+            else:
+                answer = index.titles[state.matches[state.pointer]]
+            tokens.append(("class:answer", answer))
+        elif state.query:
+            tokens.append(("class:answer", state.query))
+        else:
+            tokens.append(("class:instruction", instruction))
+        return tokens
+
+    not_done = Condition(lambda: not state.is_answered)
+    layout = Layout(
+        HSplit(
+            [
+                Window(
+                    FormattedTextControl(get_prompt_tokens),
+                    height=Dimension.exact(1),
+                    wrap_lines=False,
+                ),
+                ConditionalContainer(
+                    Window(
+                        FormattedTextControl(lambda: state.window(pointer)),
+                        height=Dimension(max=page_size),
+                        wrap_lines=False,
+                    ),
+                    filter=not_done,
+                ),
+            ]
+        )
+    )
+
+    bindings = KeyBindings()
+
+    @bindings.add(Keys.ControlQ, eager=True)
+    @bindings.add(Keys.ControlC, eager=True)
+    def _abort(event: Any) -> None:
+        event.app.exit(exception=KeyboardInterrupt, style="class:aborting")
+
+    bindings.add(Keys.Down, eager=True)(lambda event: state.move(1))
+    bindings.add(Keys.Up, eager=True)(lambda event: state.move(-1))
+    bindings.add(Keys.PageDown, eager=True)(lambda event: state.move(page_size))
+    bindings.add(Keys.PageUp, eager=True)(lambda event: state.move(-page_size))
+
+    @bindings.add(Keys.ControlM, eager=True)
+    def _accept(event: Any) -> None:
+        if not multiselect and not state.matches:
+            return
+        state.is_answered = True
+        event.app.exit(result=state.result())
+
+    @bindings.add(Keys.Backspace, eager=True)
+    def _delete(event: Any) -> None:
+        if state.query:
+            state.set_query(state.query[:-1])
+
+    @bindings.add(Keys.ControlU, eager=True)
+    def _clear(event: Any) -> None:
+        state.set_query("")
+
+    @bindings.add(" ", eager=True)
+    def _space(event: Any) -> None:
+        if multiselect:
+            state.toggle()
+        else:
+            state.set_query(state.query + " ")
+
+    @bindings.add(Keys.Any)
+    @bindings.add(Keys.BracketedPaste)
+    def _type(event: Any) -> None:
+        text = "".join(char for char in event.data if char.isprintable())
+        if text:
+            state.set_query(state.query + text)
+
+    return Question(
+        Application(
+            layout=layout,
+            key_bindings=bindings,
+            style=merge_styles([DEFAULT_STYLE, style]),
+            **utils.used_kwargs(kwargs, Application.__init__),
+        )
+    )
+
+
+class _FormField:
+    """A field of a form: one question of a group with the "form" layout"""
+
+    __slots__ = ("type", "message", "validate", "buffer", "choices", "value", "error")
+
+    def __init__(self, _type: str, kwargs: Mapping[str, Any]) -> None:
+        from prompt_toolkit.buffer import Buffer
+        from prompt_toolkit.document import Document
+
+        self.type = _type
+        self.message = kwargs.get("message", "")
+        self.validate = kwargs.get("validate")
+        self.error: Optional[str] = None
+        self.buffer = None
+        self.choices = None
+        default = kwargs.get("default")
+        if _type in ("text", "password"):
+            text = "" if default is None else str(default)
+            self.buffer = Buffer(document=Document(text, len(text)), multiline=False)
+            self.value: Any = None
+        elif _type == "confirm":
+            self.value = True if default is None else bool(default)
+        else:
+            self.choices = ChoiceIndex(kwargs["choices"])
+            values = self.choices.values
+            self.value = values.index(default) if default in values else 0
+
+    def result(self) -> Any:
+        """Return the field's answer"""
+        if self.buffer is not None:
+            return self.buffer.text
+        if self.choices is not None:
+            return self.choices.values[self.value]
+        return self.value
+
+    def check(self) -> bool:
+        """Validate the field's answer, setting or clearing its error"""
+        self.error = None
+        if self.validate and self.buffer is not None:
+            verdict = _verdict(self.validate, self.buffer.text)
+            if verdict is not True:
+                self.error = str(verdict)
+        return self.error is None
+
+    def move(self, step: int) -> None:
+        """Change the answer of a confirm or select field"""
+        if self.choices is None:
+            self.value = not self.value
+        elif self.choices.values:
+            self.value = (self.value + step) % len(self.choices.values)
+
+    def key_bindings(self) -> Any:
+        """Return the key bindings that change the answer of a confirm or select field"""
+        from prompt_toolkit.key_binding import KeyBindings
+        from prompt_toolkit.keys import Keys
+
+        bindings = KeyBindings()
+        bindings.add(Keys.Left)(lambda event: self.move(-1))
+        bindings.add(Keys.Right)(lambda event: self.move(1))
+        bindings.add(" ")(lambda event: self.move(1))
+        if self.type == "confirm":
+            bindings.add("y")(lambda event: setattr(self, "value", True))
+            bindings.add("Y")(lambda event: setattr(self, "value", True))
+            bindings.add("n")(lambda event: setattr(self, "value", False))
+            bindings.add("N")(lambda event: setattr(self, "value", False))
+        return bindings
+
+    def tokens(self) -> List[Tuple[str, str]]:
+        """Formatted text of the answer of a confirm or select field"""
+        if self.choices is None:
+            return [
+                ("class:answer" if self.value else "class:text", "Yes"),
+                ("class:text", " / "),
+                ("class:text" if self.value else "class:answer", "No"),
+            ]
+        title = self.choices.titles[self.value] if self.choices.titles else ""
+        return [("class:text", "< "), ("class:answer", title), ("class:text", " >")]
+
+
+def _form(
+    message: str,
+    fields: Sequence[Tuple[str, Mapping[str, Any]]],
+    qmark: str = "?",
+    pointer: str = "»",
+    style: Any = None,
+    instruction: Optional[str] = None,
+    **kwargs: Any,
+) -> "Question":
+    """Return a Question that asks every field of a form in one application.
+
+    Tab and shift+tab or the arrow keys move between fields; left/right or space change
+    a confirm or select field. Enter moves to the next field, or submits the form on
+    the last one; a text field whose answer is invalid shows the error and keeps the
+    focus. The form is only submitted once every field is valid.
+
+    Args:
+        message: Title of the form.
+        fields: (type, prompt arguments) of each field, with any callable "choices"
+            and "default" already called.
+        qmark, pointer, style, instruction: As for questionary.select().
+        kwargs: Additional arguments passed to the prompt_toolkit Application.
+
+    Returns:
+        Question whose answer is the list of the fields' answers, in order.
+    """
+    from prompt_toolkit.application import Application
+    from prompt_toolkit.key_binding import KeyBindings
+    from prompt_toolkit.keys import Keys
+    from prompt_toolkit.layout import HSplit, Layout, VSplit, Window
+    from prompt_toolkit.layout.controls import BufferControl, FormattedTextControl
+    from prompt_toolkit.layout.dimension import Dimension
+    from prompt_toolkit.layout.processors import PasswordProcessor
+    from prompt_toolkit.styles import merge_styles
+    from questionary import utils
+    from questionary.constants import DEFAULT_STYLE
+    from questionary.question import Question
+
+    form_fields = [_FormField(_type, field_kwargs) for _type, field_kwargs in fields]
+    if instruction is None:
+        instruction = "(Tab or arrows to move, enter on the last field to submit)"
+    done = [False]
+    label_width = max((len(str(field.message)) for field in form_fields), default=0)
+    label_width += len(pointer) + 2
+
+    def header() -> List[Tuple[str, str]]:
+        tokens = [("class:qmark", qmark), ("class:question", f" {message} ")]
+        if done[0]:
+            tokens.append(("class:answer", "done"))
+        else:
+            tokens.append(("class:instruction", instruction))
+        return tokens
+
+    windows = []
+    rows = [Window(FormattedTextControl(header), height=1, wrap_lines=False)]
+    for field in form_fields:
+        if field.buffer is not None:
+            control: Any = BufferControl(
+                field.buffer,
+                input_processors=(
+                    [PasswordProcessor()] if field.type == "password" else None
+                ),
+            )
+        else:
+            control = FormattedTextControl(
+                field.tokens, focusable=True, key_bindings=field.key_bindings()
+            )
+        window = Window(control, height=1, dont_extend_height=True)
+        windows.append(window)
+
+        def label(field: _FormField = field, window: Window = window) -> Any:
+            focused = not done[0] and layout.has_focus(window)
+            return [
+                (
+                    "class:pointer",
+                    f"{pointer} " if focused else " " * (len(pointer) + 1),
+                ),
+                ("class:question", f"{field.message} "),
+            ]
+
+        def error(field: _FormField = field) -> Any:
+            return (
+                [("class:validation-toolbar", f" {field.error}")] if field.error else []
+            )
+
+        rows.append(
+            VSplit(
+                [
+                    Window(
+                        FormattedTextControl(label),
+                        width=Dimension.exact(label_width),
+                    ),
+                    window,
+                    Window(FormattedTextControl(error), height=1),
+                ]
+            )
+        )
+    layout = Layout(HSplit(rows), focused_element=windows[0] if windows else None)
+
+    def current() -> int:
+        for i, window in enumerate(windows):
+            if layout.has_focus(window):
+                return i
+        return 0
+
+    def focus(i: int) -> None:
+        if windows:
+            layout.focus(windows[i % len(windows)])
+
+    bindings = KeyBindings()
+
+    @bindings.add(Keys.ControlQ, eager=True)
+    @bindings.add(Keys.ControlC, eager=True)
+    def _abort(event: Any) -> None:
+        event.app.exit(exception=KeyboardInterrupt, style="class:aborting")
+
+    @bindings.add(Keys.Tab)
+    @bindings.add(Keys.Down)
+    def _next(event: Any) -> None:
+        i = current()
+        form_fields[i].check()
+        focus(i + 1)
+
+    @bindings.add(Keys.BackTab)
+    @bindings.add(Keys.Up)
+    def _previous(event: Any) -> None:
+        i = current()
+        form_fields[i].check()
+        focus(i - 1)
+
+    @bindings.add(Keys.ControlM, eager=True)
+    def _enter(event: Any) -> None:
+        i = current()
+        if not form_fields or not form_fields[i].check():
+            return
+        if i < len(form_fields) - 1:
+            focus(i + 1)
+            return
+        invalid = [n for n, field in enumerate(form_fields) if not field.check()]
+        if invalid:
+            focus(invalid[0])
+            return
+        done[0] = True
+        event.app.exit(result=[field.result() for field in form_fields])
+
+    return Question(
+        Application(
+            layout=layout,
+            key_bindings=bindings,
+            style=merge_styles([DEFAULT_STYLE, style]),
+            **utils.used_kwargs(kwargs, Application.__init__),
+        )
+    )
+
+
+class AsyncValidation:
+    """Validate the answer to a text question without blocking the prompt while the
+    user types.
+
+    Pass an AsyncValidation as a question's "validate" option; a coroutine function
+    passed as "validate" is wrapped in one automatically. Once the user has stopped
+    typing for debounce seconds, func is called with the text: as a coroutine on a
+    background event loop or, if thread is True, on a worker thread. If the text
+    changes before a check finishes, the prompt stops waiting for it but the check
+    runs to completion and its verdict is cached. The verdict for each value is cached,
+    and a check of a value already in progress is shared, so each distinct value is
+    checked at most once. Pressing enter waits for the verdict of the value entered if
+    it isn't known yet.
+
+    The verdicts are kept with the question, so they are reused by later runs of the
+    same plan; set ttl to check values again once their verdict is that old.
+
+    Args:
+        func: called with the text; returns True if it is valid or False or an error
+            message if not. May be a coroutine function.
+        debounce: seconds to wait after each keystroke before checking the text.
+        thread: if True, call func on a worker thread instead of an event loop.
+        maxsize: number of verdicts cached; the least recently used are evicted.
+        ttl: seconds a verdict is cached for; None to keep verdicts until evicted.
+    """
+
+    def __init__(
+        self,
+        func: Callable[[str], Any],
+        debounce: float = 0.3,
+        thread: bool = False,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+    ) -> None:
+        import threading
+
+        self.func = func
+        self.debounce = debounce
+        self.thread = thread
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # text: (True or the error message, time it expires or None)
+        self._verdicts: "OrderedDict[Any, Tuple[Union[bool, str], Optional[float]]]"
+        self._verdicts = OrderedDict()
+        # text: future of the check in progress
+        self._pending: Dict[Any, "concurrent.futures.Future"] = {}
+        # checks finish, and store their verdicts, on other threads
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # verdicts and checks in progress aren't sent to other processes
+        return {
+            "func": self.func,
+            "debounce": self.debounce,
+            "thread": self.thread,
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(**state)  # type: ignore[misc]
+
+    def __call__(self, text: Any) -> Union[bool, str]:
+        """Return the verdict for text, waiting for it if it isn't cached"""
+        verdict = self._cached(text)
+        if verdict is _MISSING:
+            verdict = self._verdict(self._future(text))
+        return verdict
+
+    async def check(
+        self, text: Any, changed: Callable[[], bool]
+    ) -> Union[bool, str, object]:
+        """Return the verdict for text, or _MISSING if changed() became True first"""
+        import asyncio
+
+        verdict = self._cached(text)
+        if verdict is not _MISSING:
+            return verdict
+        await asyncio.sleep(self.debounce)
+        if changed():
+            return _MISSING
+        future = self._future(text)
+        waiter = asyncio.wrap_future(future)
+        while True:
+            done, _ = await asyncio.wait({waiter}, timeout=0.05)
+            if done:
+                return self._verdict(future)
+            if changed():
+                # the check goes on; its verdict is cached when it finishes
+                return _MISSING
+
+    def validator(self) -> Any:
+        """Return a prompt_toolkit Validator that validates with this object"""
+        return _async_validator_class()(self)
+
+    def _future(self, text: Any) -> "concurrent.futures.Future":
+        """Return the future of the check of text in progress, starting it if needed"""
+        with self._lock:
+            try:
+                future = self._pending.get(text)
+            except TypeError:  # unhashable
+                future = None
+        if future is not None:
+            return future
+        if self.thread:
+            future = _validation_executor().submit(self.func, text)
+        else:
+            import concurrent.futures
+
+            try:
+                result = self.func(text)
+            except Exception as exception:  # pylint: disable=broad-except
+                future = concurrent.futures.Future()
+                future.set_exception(exception)
+            else:
+                if isinstance(result, AwaitableABC):
+                    import asyncio
+
+                    future = asyncio.run_coroutine_threadsafe(
+                        _awaited(result), _validation_loop()
+                    )
+                else:
+                    future = concurrent.futures.Future()
+                    future.set_result(result)
+        if not future.done():
+            with self._lock:
+                try:
+                    self._pending[text] = future
+                except TypeError:  # unhashable
+                    pass
+        future.add_done_callback(functools.partial(self._done, text))
+        return future
+
+    def _done(self, text: Any, future: "concurrent.futures.Future") -> None:
+        """Cache the verdict of a finished check"""
+        with self._lock:
+            try:
+                if self._pending.get(text) is future:
+                    del self._pending[text]
+            except TypeError:  # unhashable
+                pass
+        if not future.cancelled() and future.exception() is None:
+            self._store(text, future.result())
+
+    def _verdict(self, future: "concurrent.futures.Future") -> Union[bool, str]:
+        """Wait for a check and return its verdict"""
+        try:
+            result = future.result()
+        except Exception as exception:  # pylint: disable=broad-except
+            return str(exception) or INVALID_INPUT
+        return True if result is True else (result or INVALID_INPUT)
+
+    def _cached(self, text: Any) -> Any:
+        with self._lock:
+            try:
+                verdict, expires = self._verdicts.get(text, (_MISSING, None))
+            except TypeError:  # unhashable
+                return _MISSING
+            if verdict is _MISSING:
+                return verdict
+            if expires is not None and time.monotonic() >= expires:
+                del self._verdicts[text]
+                return _MISSING
+            self._verdicts.move_to_end(text)
+            return verdict
+
+    def _store(self, text: Any, result: Any) -> None:
+        verdict = True if result is True else (result or INVALID_INPUT)
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            try:
+                self._verdicts[text] = (verdict, expires)
+            except TypeError:  # unhashable
+                return
+            while len(self._verdicts) > self.maxsize:
+                self._verdicts.popitem(last=False)
+
+
+async def _awaited(awaitable: Awaitable[Any]) -> Any:
+    """Return the result of awaitable; makes any awaitable a coroutine"""
+    return await awaitable
+
+
+# worker threads for the checks of AsyncValidation with thread=True
+_validation_threads: Optional["concurrent.futures.ThreadPoolExecutor"] = None
+# event loop, run on a daemon thread, for the coroutine checks of AsyncValidation
+_validation_event_loop: Optional["asyncio.AbstractEventLoop"] = None
+
+
+def _validation_executor() -> "concurrent.futures.ThreadPoolExecutor":
+    """Return the worker threads for AsyncValidation, creating them if needed"""
+    global _validation_threads  # pylint: disable=global-statement
+    if _validation_threads is None:
+        import concurrent.futures
+
+        _validation_threads = concurrent.futures.ThreadPoolExecutor(
+            thread_name_prefix="superprompt-validate"
+        )
+    return _validation_threads
+
+
+def _validation_loop() -> "asyncio.AbstractEventLoop":
+    """Return the event loop for coroutine checks of AsyncValidation, starting it if
+    needed; checks run there so they can be waited for from the prompt's own loop"""
+    global _validation_event_loop  # pylint: disable=global-statement
+    if _validation_event_loop is None:
+        import asyncio
+        import threading
+
+        loop = asyncio.new_event_loop()
+        threading.Thread(
+            target=loop.run_forever, name="superprompt-validate-loop", daemon=True
+        ).start()
+        _validation_event_loop = loop
+    return _validation_event_loop
+
+
+# the prompt_toolkit Validator used by AsyncValidation, created on first use
+_async_validator: Optional[type] = None
+
+
+def _async_validator_class() -> type:
+    """Return the prompt_toolkit Validator class for AsyncValidation, creating it if
+    needed"""
+    global _async_validator  # pylint: disable=global-statement
+    if _async_validator is None:
+        from prompt_toolkit.application import get_app
+        from prompt_toolkit.validation import ValidationError, Validator
+
+        def raise_invalid(text: str, verdict: Any) -> None:
+            if verdict is not True:
+                raise ValidationError(message=verdict, cursor_position=len(text))
+
+        class _AsyncValidator(Validator):
+            def __init__(self, validation: AsyncValidation) -> None:
+                self.validation = validation
+
+            def validate(self, document: Any) -> None:
+                raise_invalid(document.text, self.validation(document.text))
+
+            async def validate_async(self, document: Any) -> None:
+                text = document.text
+                buffer = get_app().current_buffer
+                verdict = await self.validation.check(text, lambda: buffer.text != text)
+                # if the text changed, the buffer validates the new text next
+                if verdict is not _MISSING:
+                    raise_invalid(text, verdict)
+
+        _async_validator = _AsyncValidator
+    return _async_validator
+
+
+def _is_coroutine_function(func: Any) -> bool:
+    """Return True if func is a coroutine function, without importing inspect"""
+    code = getattr(func, "__code__", None)
+    return code is not None and bool(code.co_flags & 0x80)  # CO_COROUTINE
+
+
+class ResponseError(ValueError):
+    """Raised by :func:`superprompt` in headless mode when an answer is missing or invalid"""
+
+
+class _Responses:
+    """The answers for one scope (top level, group or multiple value) of a headless run.
+
+    Answers may be a mapping of question name to answer or, for a "list" group,
+    a sequence of answers which are used in the order the questions are asked.
+    """
+
+    __slots__ = ("_values", "_position")
+
+    def __init__(self, values: Union[Mapping[str, Any], Sequence[Any]]) -> None:
+        if isinstance(values, Mapping):
+            self._position = None
+        elif isinstance(values, (list, tuple)):
+            self._position = 0
+        else:
+            raise ResponseError(
+                f"Answers must be a mapping or a list, not {type(values).__name__}"
+            )
+        self._values = values
+
+    def get(self, name: Optional[str], default: Any = _MISSING) -> Any:
+        """Return the answer for question name or default if there is none"""
+        if self._position is None:
+            return self._values.get(name, default)
+        if self._position >= len(self._values):
+            return default
+        value = self._values[self._position]
+        self._position += 1
+        return value
+
+
+class _FormResponses(_Responses):
+    """The answers given in a form, with the options each question was asked with"""
+
+    __slots__ = ("kwargs",)
+
+    def __init__(
+        self, values: Sequence[Any], kwargs: Mapping[str, Mapping[str, Any]]
+    ) -> None:
+        super().__init__(values)
+        # name: prompt options, with the choices and default callables already called
+        self.kwargs = kwargs
+
+
+def _response_answer(
+    node: _Node, responses: _Responses, kwargs: Mapping[str, Any]
+) -> Any:
+    """Return the validated answer to question node from responses"""
+    answer = responses.get(node.name)
+    if answer is _MISSING and node.multiple_batch is not None:
+        # as for a "multiple" question asked value by value, no values were given
+        answer = kwargs.get("default", [])
+    if answer is _MISSING:
+        if "default" not in kwargs:
+            raise ResponseError(f"No answer for {node.name} question")
+        answer = kwargs["default"]
+
+    if node.type in CHOICE_TYPES or node.type == SEARCH_SELECT_TYPE:
+        many = node.type == "checkbox" or (
+            node.type == SEARCH_SELECT_TYPE and kwargs.get("multiselect")
+        )
+        if many and not isinstance(answer, (list, tuple)):
+            raise ResponseError(
+                f"Answer to {node.type} question {node.name} must be a list of values"
+            )
+        choices = kwargs["choices"]
+        values = (
+            choices if isinstance(choices, ChoiceIndex) else _choice_values(choices)
+        )
+        selected = answer if many else [answer]
+        for value in selected:
+            if value not in values:
+                raise ResponseError(
+                    f"Invalid answer for {node.name} question: "
+                    f"{value!r} is not one of the choices"
+                )
+
+    validate = kwargs.get("validate")
+    if validate:
+        verdict = _verdict(validate, answer)
+        if verdict is not True:
+            raise ResponseError(f"Invalid answer for {node.name} question: {verdict}")
+    return answer
+
+
+def _verdict(validate: Any, value: Any) -> Union[bool, str]:
+    """Return True if a question's validate option accepts value, otherwise the error
+    message"""
+    # a prompt_toolkit Validator can only have been created if prompt_toolkit's
+    # validation module has been imported
+    validation = sys.modules.get("prompt_toolkit.validation")
+    if (
+        validation is not None
+        and isinstance(validate, type)
+        and issubclass(validate, validation.Validator)
+    ):
+        validate = validate()
+    if validation is not None and isinstance(validate, validation.Validator):
+        from prompt_toolkit.document import Document
+
+        try:
+            validate.validate(Document(str(value)))
+        except validation.ValidationError as exception:
+            return exception.message
+        return True
+    verdict = validate(value)
+    if verdict is not True:
+        return INVALID_INPUT if verdict is False else verdict
+    return True
+
+
+def _batch_values(answer: Any, separator: str) -> List[Any]:
+    """Return the values of a "multiple" question entered in one batch; answer is the
+    text entered or, in headless mode, a list of values"""
+    if isinstance(answer, (list, tuple)):
+        return list(answer)
+    return [value.strip() for value in str(answer).split(separator) if value.strip()]
+
+
+def _filter_values(func: Callable[[Any], Any], values: List[Any]) -> List[Any]:
+    """Return func applied to each of values"""
+    return [func(value) for value in values]
+
+
+class _BatchValidation:
+    """Validate option for a "multiple" question whose values are entered in one batch;
+    checks the number of values and each value with the question's own validate"""
+
+    __slots__ = ("node", "validate")
+
+    def __init__(self, node: _Node, validate: Any) -> None:
+        self.node = node
+        self.validate = validate
+
+    def __call__(self, answer: Any) -> Union[bool, str]:
+        values = _batch_values(answer, self.node.multiple_batch)
+        multiple = self.node.multiple
+        if multiple > 0 and len(values) != multiple:
+            return f"Expected exactly {multiple} values, got {len(values)}"
+        if multiple < 0 and len(values) > -multiple:
+            return f"Expected at most {-multiple} values, got {len(values)}"
+        if self.validate:
+            for n, value in enumerate(values, 1):
+                verdict = _verdict(self.validate, value)
+                if verdict is not True:
+                    return f"Value {n} ({value}): {verdict}"
+        return True
+
+
+def _choice_values(choices: Iterable[Any]) -> List[Any]:
+    """Return the values of choices, as questionary's Choice.build() would"""
+    # Choice and Separator objects can only exist if questionary has been imported
+    common = sys.modules.get("questionary.prompts.common")
+    values = []
+    for choice in choices:
+        if isinstance(choice, str):
+            values.append(choice)
+        elif isinstance(choice, Mapping):
+            value = choice.get("value")
+            values.append(choice.get("name") if value is None else value)
+        elif common is not None and not isinstance(choice, common.Separator):
+            values.append(common.Choice.build(choice).value)
+    return values
+
+
+def load_responses(path: Union[str, "os.PathLike[str]"]) -> Dict[str, Any]:
+    """Load answers for a headless run of :func:`superprompt` from a JSON, TOML or YAML
+    file.
+
+    Args:
+        path: path to the file; files with a ".toml" suffix are read as TOML, files with
+            a ".yaml" or ".yml" suffix as YAML (which requires PyYAML), all others as
+            JSON.
+
+    Returns:
+        Dictionary of answers.
+    """
+    with open(path, "rb") as fp:
+        return _parse_document(path, fp.read())
+
+
+def _parse_document(path: Union[str, "os.PathLike[str]"], content: bytes) -> Any:
+    """Parse the content of the file at path as JSON, TOML or YAML, by its suffix"""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == ".toml":
+        try:
+            import tomllib
+        except ImportError:  # pragma: no cover
+            try:
+                import tomli as tomllib
+            except ImportError as exception:
+                raise ImportError(
+                    "Reading TOML requires Python 3.11+ or the tomli package"
+                ) from exception
+        return tomllib.loads(content.decode("utf-8"))
+    if suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as exception:
+            raise ImportError("Reading YAML requires the PyYAML package") from exception
+        return yaml.safe_load(content)
+    import json
+
+    return json.loads(content.decode("utf-8"))
+
+
+class Journal:
+    """Append-only journal of the answers given at the prompts of a run of superprompt().
+
+    Each answer is written as a line of JSON, with the dotted path of the question (see
+    :class:`AnswerStore`), as soon as it is given and is flushed to the operating system,
+    so it survives the process being killed or the terminal disconnecting. To keep writes
+    cheap the file is only fsync()ed after every ``sync_records`` answers or
+    ``sync_seconds`` seconds, whichever comes first, and when the run ends.
+
+    With ``resume=True``, the answers already in the journal are replayed in place of
+    asking the questions, until a question is reached that has no answer in the journal
+    or that doesn't match the next answer (e.g. because the questions changed); any
+    remaining answers are discarded and the run continues by prompting the user. A line
+    left incomplete by a crash is ignored. If the user goes back to change an answer
+    (see the back_key option), the journal is truncated to the answers before it and
+    the answers that follow are recorded again. Answers must be JSON serializable.
+
+    The answers to "password" questions, and to forms with a "password" field, are not
+    written: the journal only notes that the question was answered, and it is asked
+    again when the run is resumed. The file is created readable and writable only by its
+    owner.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, "os.PathLike[str]"],
+        resume: bool = False,
+        sync_records: int = 16,
+        sync_seconds: float = 1.0,
+    ) -> None:
+        self.path = path
+        self.sync_records = sync_records
+        self.sync_seconds = sync_seconds
+        # (kind, path, answer) of each answer still to be replayed
+        self._replay: Deque[Tuple[str, str, Any]] = deque()
+        # offset in the file of each answer in the journal
+        self._offsets: List[int] = []
+        # number of answers recorded by the current walk of the questions
+        self._position = 0
+        self._size = 0
+        if resume and os.path.exists(path):
+            self._load()
+        # created with mode 0o600; the answers may be private
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._file = os.fdopen(fd, "r+b")
+        self._file.truncate(self._size)
+        self._file.seek(self._size)
+        self._pending = 0
+        self._synced = time.monotonic()
+
+    def _load(self) -> None:
+        """Load the answers to replay from the journal's complete lines"""
+        import json
+
+        with open(self.path, "rb") as file:
+            for line in file:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete line")
+                    record = json.loads(line)
+                    kind = next(
+                        (kind for kind in ("more", "form") if kind in record), "answer"
+                    )
+                    # a password's answer isn't written, so it is asked again
+                    answer = _MISSING if record.get("secret") else record[kind]
+                    self._replay.append((kind, record["path"], answer))
+                except (ValueError, KeyError, TypeError):
+                    break
+                self._offsets.append(self._size)
+                self._size += len(line)
+
+    def replay(self, kind: str, path: str) -> Any:
+        """Return the next answer to replay if it is for path, otherwise _MISSING"""
+        if not self._replay:
+            return _MISSING
+        replay_kind, replay_path, answer = self._replay[0]
+        if (replay_kind, replay_path) != (kind, path):
+            # the run has diverged from the journal; ask from here on
+            self._truncate(self._position)
+            return _MISSING
+        self._replay.popleft()
+        return answer
+
+    def rewind(self, keep: int) -> None:
+        """Keep only the first keep answers and start recording a new walk of the
+        questions, which will begin by answering them again"""
+        self._truncate(keep)
+        self._position = 0
+
+    def _truncate(self, keep: int) -> None:
+        """Discard all but the first keep answers, including any still to be replayed"""
+        self._replay.clear()
+        if keep < len(self._offsets):
+            self._size = self._offsets[keep]
+            del self._offsets[keep:]
+            self._file.truncate(self._size)
+            self._file.seek(self._size)
+
+    def record(self, kind: str, path: str, answer: Any, secret: bool = False) -> None:
+        """Append answer to the journal, unless it is already there (e.g. it was replayed);
+        if secret is True, only note that the question was answered"""
+        import json
+
+        self._position += 1
+        if self._position <= len(self._offsets):
+            return
+        record = (
+            {"path": path, kind: None, "secret": True}
+            if secret
+            else {"path": path, kind: answer}
+        )
+        line = json.dumps(record).encode() + b"\n"
+        self._file.write(line)
+        self._file.flush()
+        self._offsets.append(self._size)
+        self._size += len(line)
+        self._pending += 1
+        if (
+            self._pending >= self.sync_records
+            or time.monotonic() - self._synced >= self.sync_seconds
+        ):
+            self.sync()
+
+    def sync(self) -> None:
+        """Write the journal to disk"""
+        if self._pending:
+            os.fsync(self._file.fileno())
+            self._pending = 0
+        self._synced = time.monotonic()
+
+    def close(self) -> None:
+        """Write the journal to disk and close it"""
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+
+class MemoryProfile:
+    """Measure the memory allocated while each question and group is asked, with tracemalloc.
+
+    Pass a MemoryProfile as the on_event option of :func:`superprompt`. Tracing starts
+    when the profile is entered as a context manager (or on the first event) and stops
+    when it is exited::
+
+        with MemoryProfile() as profile:
+            superprompt(questions, on_event=profile)
+        profile.write("memory.json")
+
+    For each question path and each list/dict group path (see :class:`AnswerStore`) the
+    report has the number of times it was asked and, summed over those times:
+
+    * retained_bytes - traced memory still allocated when it finished
+    * peak_bytes - the most traced memory allocated at once while it was asked
+    * blocks - memory blocks still allocated when it finished (sys.getallocatedblocks())
+
+    A group's figures include its questions. If snapshots is True, a tracemalloc snapshot
+    is also taken around each question and group and the report includes the source
+    lines that retained the most memory ("top"); snapshots are much slower.
+    The report is written as sorted, indented JSON so reports from two releases can be
+    compared with diff.
+    """
+
+    def __init__(self, snapshots: bool = False, top: int = 5) -> None:
+        self.snapshots = snapshots
+        self.top = top
+        self.paths: Dict[str, Dict[str, Any]] = {}
+        # [path, kind, start bytes, peak bytes, start blocks, snapshot] for each question
+        # or group currently being asked, innermost last
+        self._open: List[List[Any]] = []
+        self._started = False
+
+    def __enter__(self) -> "MemoryProfile":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """Start tracing memory allocations, if not already tracing"""
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+
+    def stop(self) -> None:
+        """Stop tracing memory allocations, if tracing was started by the profile"""
+        import tracemalloc
+
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def __call__(self, event: Event) -> None:
+        if event.kind in ("question_start", "group_enter"):
+            self._begin(
+                event.path, "group" if event.kind == "group_enter" else "question"
+            )
+        elif event.kind in ("question_end", "group_exit"):
+            self._end(event.path)
+
+    def _peak(self) -> int:
+        """Fold the traced peak since the last call into every open measurement"""
+        import tracemalloc
+
+        current, peak = tracemalloc.get_traced_memory()
+        for measurement in self._open:
+            measurement[3] = max(measurement[3], peak)
+        if hasattr(tracemalloc, "reset_peak"):  # Python >= 3.9
+            tracemalloc.reset_peak()
+        return current
+
+    def _begin(self, path: Optional[str], kind: str) -> None:
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            self.start()
+        measurement = [path, kind, 0, 0, 0, None]
+        self._open.append(measurement)
+        if self.snapshots:
+            measurement[5] = tracemalloc.take_snapshot()
+        measurement[4] = sys.getallocatedblocks()
+        measurement[2] = measurement[3] = self._peak()
+
+    def _end(self, path: Optional[str]) -> None:
+        blocks = sys.getallocatedblocks()
+        current = self._peak()
+        while self._open:
+            start_path, kind, start, peak, start_blocks, snapshot = self._open.pop()
+            if start_path == path:
+                break
+        else:
+            return
+        stats = self.paths.setdefault(
+            str(path),
+            {
+                "kind": kind,
+                "count": 0,
+                "retained_bytes": 0,
+                "peak_bytes": 0,
+                "blocks": 0,
+            },
+        )
+        stats["count"] += 1
+        stats["retained_bytes"] += current - start
+        stats["peak_bytes"] += peak - start
+        stats["blocks"] += blocks - start_blocks
+        if snapshot is not None:
+            import tracemalloc
+
+            differences = tracemalloc.take_snapshot().compare_to(snapshot, "lineno")
+            top = stats.setdefault("top", {})
+            for difference in differences[: self.top]:
+                frame = difference.traceback[0]
+                line = f"{os.path.basename(frame.filename)}:{frame.lineno}"
+                top[line] = top.get(line, 0) + difference.size_diff
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Return the measurements for each path"""
+        return self.paths
+
+    def write(self, path: Union[str, "os.PathLike[str]"]) -> None:
+        """Write the report to path as JSON"""
+        import json
+
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.paths, file, indent=2, sort_keys=True)
+            file.write("\n")
+
+
+class BatchResult(NamedTuple):
+    """The outcome of answering one set of responses with :func:`superprompt_batch`
+
+    Attributes:
+        index: position of the responses in the answer_sets iterable
+        answers: the answers, or None if error is set
+        error: the exception raised while answering the responses, if any
+    """
+
+    index: int
+    answers: Optional[Dict[str, Any]]
+    error: Optional[BaseException] = None
+
+
+def superprompt_batch(
+    questions: Union[Dict[str, Any], Iterable[Mapping[str, Any]], QuestionPlan],
+    answer_sets: Iterable[Union[Mapping[str, Any], str, "os.PathLike[str]"]],
+    workers: Optional[int] = None,
+    chunksize: int = 64,
+    answers: Optional[Mapping[str, Any]] = None,
+    **kwargs: Any,
+) -> Iterator[BatchResult]:
+    """Answer the questions headlessly for many sets of responses using a process pool.
+
+    Each set of responses is answered exactly as ``superprompt(questions, answers,
+    responses=responses, **kwargs)`` would. answer_sets is consumed lazily so it may be
+    a generator of any length.
+
+    Args:
+        questions: question configs or a QuestionPlan as for :func:`superprompt`.
+        answer_sets: iterable of responses, each a mapping or the path to a JSON or TOML file.
+        workers: number of worker processes; defaults to the number of CPUs.
+            If 1 or less, the responses are answered in the current process.
+        chunksize: number of responses sent to a worker at a time.
+        answers: Default answers used for every set of responses.
+        kwargs: Additional options passed to every question.
+
+    Returns:
+        Iterator of BatchResult, one per set of responses, in the same order as answer_sets.
+        A set of responses that fails produces a BatchResult with error set; the remaining
+        responses are still answered.
+
+    Raises:
+        QuestionConfigError: if questions is not a QuestionPlan and any question config is invalid.
+
+    Note:
+        Where available, worker processes are started with the "fork" method so questions
+        may contain lambdas and other callables that cannot be pickled. On platforms without
+        "fork", the questions, answers and kwargs must be picklable.
+    """
+    if not isinstance(questions, QuestionPlan):
+        questions = compile_questions(questions, **kwargs)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    rows = enumerate(answer_sets)
+    if workers <= 1:
+        for index, responses in rows:
+            yield _batch_row(questions, answers, kwargs, index, responses)
+        return
+
+    import concurrent.futures
+    import multiprocessing
+
+    mp_context = (
+        multiprocessing.get_context("fork")
+        if "fork" in multiprocessing.get_all_start_methods()
+        else None
+    )
+    chunks = iter(lambda: list(itertools.islice(rows, chunksize)), [])
+    with concurrent.futures.ProcessPoolExecutor(
+        workers,
+        mp_context=mp_context,
+        initializer=_init_batch_worker,
+        initargs=(questions, answers, kwargs),
+    ) as executor:
+        # keep a bounded number of chunks in flight so results stream back in order
+        # without reading all of answer_sets up front
+        pending: Deque[Tuple[List[int], concurrent.futures.Future]] = deque()
+
+        def submit(chunk: List[Tuple[int, Any]]) -> None:
+            future = executor.submit(_run_batch_chunk, chunk)
+            pending.append(([index for index, _ in chunk], future))
+
+        for chunk in itertools.islice(chunks, workers * 2):
+            submit(chunk)
+        while pending:
+            indexes, future = pending.popleft()
+            try:
+                results = future.result()
+            except Exception as exception:  # pylint: disable=broad-except
+                # e.g. an answer that could not be pickled to send back from the worker
+                results = [BatchResult(index, None, exception) for index in indexes]
+            for chunk in itertools.islice(chunks, 1):
+                submit(chunk)
+            yield from results
+
+
+# questions, answers and kwargs for the current batch worker process
+_batch_worker_args: Optional[
+    Tuple[QuestionPlan, Optional[Mapping[str, Any]], Mapping[str, Any]]
+] = None
+
+
+def _init_batch_worker(
+    plan: QuestionPlan,
+    answers: Optional[Mapping[str, Any]],
+    kwargs: Mapping[str, Any],
+) -> None:
+    """Initialize a superprompt_batch() worker process"""
+    global _batch_worker_args  # pylint: disable=global-statement
+    _batch_worker_args = (plan, answers, kwargs)
+
+
+def _run_batch_chunk(chunk: List[Tuple[int, Any]]) -> List[BatchResult]:
+    """Answer a chunk of (index, responses) in a superprompt_batch() worker process"""
+    plan, answers, kwargs = _batch_worker_args
+    results = []
+    for index, responses in chunk:
+        result = _batch_row(plan, answers, kwargs, index, responses)
+        if result.error is not None:
+            import pickle
+
+            try:
+                pickle.dumps(result.error)
+            except Exception:  # pylint: disable=broad-except
+                result = result._replace(
+                    error=RuntimeError(f"{type(result.error).__name__}: {result.error}")
+                )
+        results.append(result)
+    return results
+
+
+def _batch_row(
+    plan: QuestionPlan,
+    answers: Optional[Mapping[str, Any]],
+    kwargs: Mapping[str, Any],
+    index: int,
+    responses: Union[Mapping[str, Any], str, "os.PathLike[str]"],
+) -> BatchResult:
+    """Answer a single set of responses for superprompt_batch()"""
+    try:
+        return BatchResult(
+            index, superprompt(plan, answers, responses=responses, **kwargs)
+        )
+    except Exception as exception:  # pylint: disable=broad-except
+        return BatchResult(index, None, exception)
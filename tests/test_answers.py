@@ -0,0 +1,97 @@
+"""Test the AnswerStore passed to callables by superprompt"""
+
+import pytest
+
+import superprompt
+from tests.test_comprehensive import QUESTIONS
+from tests.test_headless import RESPONSES
+
+
+def test_dotted_path_lookup():
+    """Test 'when' can read nested answers by dotted path"""
+    seen = {}
+
+    def when(answers):
+        seen["allergies"] = answers["toppings.extras.allergies"]
+        seen["special_requests"] = answers.get("toppings.extras.special_requests")
+        seen["burger"] = answers["burger"]
+        return False
+
+    questions = QUESTIONS + [
+        {"name": "notes", "type": "text", "message": "Notes?", "when": when}
+    ]
+    superprompt.superprompt(questions, responses=RESPONSES)
+    assert seen == {
+        "allergies": ["gluten", "dairy"],
+        "special_requests": "MUSTARD ON THE SIDE",
+        "burger": True,
+    }
+
+
+def test_group_scope():
+    """Test a group's callables see the group's answers and the top level as root"""
+    seen = {}
+
+    def when(answers):
+        seen["keys"] = list(answers)
+        seen["first"] = answers["first"]
+        seen["title"] = answers.root["title"]
+        seen["in"] = ("title" in answers, "author.first" in answers)
+        return True
+
+    questions = [
+        {"name": "title", "type": "text", "message": "Title?"},
+        {
+            "name": "author",
+            "type": "list",
+            "questions": [
+                {"name": "first", "type": "text", "message": "First?"},
+                {"name": "last", "type": "text", "message": "Last?", "when": when},
+            ],
+        },
+    ]
+    responses = {"title": "Dune", "author": {"first": "Frank", "last": "Herbert"}}
+    assert superprompt.superprompt(questions, responses=responses) == {
+        "title": "Dune",
+        "author": ["Frank", "Herbert"],
+    }
+    assert seen == {
+        "keys": ["first"],
+        "first": "Frank",
+        "title": "Dune",
+        "in": (False, True),
+    }
+
+
+def test_default_answers_not_copied():
+    """Test default answers are read through, included and never modified"""
+    defaults = {"title": "Dune", "year": 1965}
+    question = {"name": "title", "type": "text", "message": "Title?"}
+    result = superprompt.superprompt(
+        question, answers=defaults, responses={"title": "Hyperion"}
+    )
+    assert result == {"title": "Hyperion", "year": 1965}
+    assert defaults == {"title": "Dune", "year": 1965}
+
+
+def test_answer_store_mapping():
+    """Test AnswerStore behaves like a dict layered over its defaults"""
+    defaults = {"a": 1, "b": 2}
+    store = superprompt.AnswerStore(defaults)
+    store["b"] = 3
+    store["c"] = 4
+    group = store.child("g")
+    group["d"] = 5
+    assert dict(store) == {"a": 1, "b": 3, "c": 4}
+    assert len(store) == 3
+    assert store["g.d"] == 5 and "g.d" in group
+    assert "d" not in store
+
+    del store["a"]
+    assert store.to_dict() == {"b": 3, "c": 4}
+    assert defaults == {"a": 1, "b": 2}
+
+    group.clear()
+    assert "g.d" not in store
+    with pytest.raises(KeyError):
+        store["g.d"]  # pylint: disable=pointless-statement
@@ -0,0 +1,93 @@
+"""Test superprompt_async"""
+
+import asyncio
+
+import pytest
+from prompt_toolkit.output import DummyOutput
+
+import superprompt
+from tests.test_comprehensive import ANSWERS, QUESTIONS, RESPONSE
+from tests.utils import KeyInputs, execute_with_input_pipe, mock_confirm
+
+
+def patched_prompt_async(questions, text, **kwargs):
+    """Run superprompt_async with predefined input and output"""
+
+    def run(inp):
+        inp.send_text(text)
+        return asyncio.run(
+            superprompt.superprompt_async(
+                questions, input=inp, output=DummyOutput(), **kwargs
+            )
+        )
+
+    return execute_with_input_pipe(run)
+
+
+def test_async_comprehensive(monkeypatch):
+    """Test superprompt_async gives same result as superprompt"""
+
+    class MockConfirm(mock_confirm(["y", "n"])):
+        async def unsafe_ask_async(self, patch_stdout=False):
+            return self.unsafe_ask()
+
+    monkeypatch.setattr(superprompt, "confirm", MockConfirm)
+    assert patched_prompt_async(QUESTIONS, ANSWERS) == RESPONSE
+
+
+def test_async_callables():
+    """Test async when, filter and if callables are awaited"""
+
+    async def when(answers):
+        await asyncio.sleep(0)
+        return answers["ask"]
+
+    async def upper(value):
+        await asyncio.sleep(0)
+        return value.upper()
+
+    async def is_true(value):
+        return value is True
+
+    questions = [
+        {
+            "name": "ask",
+            "type": "confirm",
+            "message": "Ask?",
+            "if": [
+                is_true,
+                {"name": "more", "type": "text", "message": "More?", "filter": upper},
+            ],
+        },
+        {"name": "title", "type": "text", "message": "Title?", "when": when},
+    ]
+    answers = "y" + "foo" + KeyInputs.ENTER + "bar" + KeyInputs.ENTER
+    assert patched_prompt_async(questions, answers) == {
+        "ask": True,
+        "more": "FOO",
+        "title": "bar",
+    }
+
+
+def test_async_headless():
+    """Test superprompt_async in headless mode"""
+
+    async def upper(value):
+        return value.upper()
+
+    question = {"name": "title", "type": "text", "message": "Title?", "filter": upper}
+    result = asyncio.run(
+        superprompt.superprompt_async(question, responses={"title": "dune"})
+    )
+    assert result == {"title": "DUNE"}
+
+
+def test_sync_async_callable():
+    """Test superprompt rejects async callables"""
+
+    async def upper(value):
+        return value.upper()
+
+    question = {"name": "title", "type": "text", "message": "Title?", "filter": upper}
+    with pytest.raises(ValueError, match="superprompt_async"):
+        superprompt.superprompt(question, responses={"title": "dune"})
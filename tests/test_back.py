@@ -0,0 +1,144 @@
+"""Test going back to change an earlier answer"""
+
+from prompt_toolkit.output import DummyOutput
+
+import superprompt
+from tests.test_iter import collect
+from tests.utils import KeyInputs, execute_with_input_pipe, patched_prompt
+
+SHIFT_TAB = "\x1b[Z"
+
+
+def test_back():
+    """Test going back re-asks the previous question with the old answer as default"""
+    questions = [
+        {"name": "title", "type": "text", "message": "Title?"},
+        {"name": "author", "type": "text", "message": "Author?"},
+        {"name": "year", "type": "text", "message": "Year?"},
+    ]
+    text = "Dune" + KeyInputs.ENTER + "Frank" + KeyInputs.ENTER + SHIFT_TAB
+    text += " Herbert" + KeyInputs.ENTER + "1965" + KeyInputs.ENTER
+    assert patched_prompt(questions, text, back_key="s-tab") == {
+        "title": "Dune",
+        "author": "Frank Herbert",
+        "year": "1965",
+    }
+
+
+def test_back_keeps_later_answers():
+    """Test answers after a changed answer are kept and only new questions are asked"""
+    calls = []
+
+    def when_fries(answers):
+        calls.append("fries")
+        return answers["burger"]
+
+    def when_drink(answers):
+        calls.append("drink")
+        return True
+
+    questions = [
+        {"name": "burger", "type": "confirm", "message": "Burger?"},
+        {"name": "fries", "type": "confirm", "message": "Fries?", "when": when_fries},
+        {"name": "drink", "type": "text", "message": "Drink?", "when": when_drink},
+        {"name": "size", "type": "text", "message": "Size?"},
+    ]
+    # answer burger=No and drink, then go back from size, past drink, to change burger;
+    # fries is newly reached so is asked, drink keeps its answer and is not asked again
+    text = "n" + "cola" + KeyInputs.ENTER + SHIFT_TAB + SHIFT_TAB
+    text += "y" + "y" + "large" + KeyInputs.ENTER
+    assert patched_prompt(questions, text, back_key="s-tab") == {
+        "burger": True,
+        "fries": True,
+        "drink": "cola",
+        "size": "large",
+    }
+    # when_fries reads burger so is called again when burger changes,
+    # when_drink reads nothing so is only called once
+    assert calls.count("drink") == 1
+    assert calls.count("fries") == 2
+
+
+def test_back_multiple():
+    """Test going back into the values of a multiple question"""
+    questions = [
+        {
+            "name": "books",
+            "type": "text",
+            "message": "Book?",
+            "multiple": -3,
+            "multiple_message": "Another?",
+        },
+        {"name": "done", "type": "confirm", "message": "Done?"},
+    ]
+    # go back from the third "Another?" past Emma to the second "Another?";
+    # Emma is kept, so the third "Another?" is asked next
+    text = "Dune" + KeyInputs.ENTER + "y" + "Emma" + KeyInputs.ENTER + SHIFT_TAB
+    text += SHIFT_TAB + "y" + "y" + "Hyperion" + KeyInputs.ENTER + "y"
+    result = patched_prompt(questions, text, back_key="s-tab")
+    assert result == {"books": ["Dune", "Emma", "Hyperion"], "done": True}
+
+
+def test_back_replays_stepped_over_answers():
+    """Test going back over many answers to change one only asks that question again"""
+    asked = []
+
+    def ask(name):
+        def when(answers):
+            asked.append(name)
+            return True
+
+        return {"name": name, "type": "text", "message": f"{name}?", "when": when}
+
+    names = [f"q{i}" for i in range(6)]
+    questions = [ask(name) for name in names]
+    # answer q0..q4, go back from q5 to q1, change it, then answer q5
+    text = "".join(f"a{i}" + KeyInputs.ENTER for i in range(5))
+    text += SHIFT_TAB * 4 + KeyInputs.BACK * 2 + "b1" + KeyInputs.ENTER
+    text += "a5" + KeyInputs.ENTER
+    result = patched_prompt(questions, text, back_key="s-tab")
+    assert result == dict({name: f"a{i}" for i, name in enumerate(names)}, q1="b1")
+    # "when" reads nothing, so it is only called once per question
+    assert asked == names
+
+
+def test_back_streams_changed_answers():
+    """Test going back doesn't stream the answers before the changed answer again"""
+    questions = [
+        {"name": name, "type": "text", "message": f"{name}?"} for name in "abc"
+    ]
+
+    def run(inp):
+        text = "1" + KeyInputs.ENTER + "2" + KeyInputs.ENTER + SHIFT_TAB
+        inp.send_text(text + KeyInputs.BACK + "3" + KeyInputs.ENTER)
+        inp.send_text("4" + KeyInputs.ENTER)
+        return collect(
+            superprompt.iter_superprompt(
+                questions, input=inp, output=DummyOutput(), back_key="s-tab"
+            )
+        )
+
+    assert execute_with_input_pipe(run) == (
+        [("a", "1"), ("b", "2"), ("b", "3"), ("c", "4")],
+        {"a": "1", "b": "3", "c": "4"},
+    )
+
+
+def test_back_journal(tmp_path):
+    """Test the journal records changed answers so a resumed run uses them"""
+    path = tmp_path / "journal.jsonl"
+    questions = [
+        {"name": "title", "type": "text", "message": "Title?"},
+        {"name": "author", "type": "text", "message": "Author?"},
+        {"name": "year", "type": "text", "message": "Year?"},
+    ]
+    text = "Dune" + KeyInputs.ENTER + "X" + KeyInputs.ENTER + SHIFT_TAB
+    text += KeyInputs.BACK + "Frank Herbert" + KeyInputs.ENTER + KeyInputs.CONTROLC
+    assert patched_prompt(questions, text, back_key="s-tab", journal=path) == {}
+
+    text = "1965" + KeyInputs.ENTER
+    assert patched_prompt(questions, text, journal=path, resume=True) == {
+        "title": "Dune",
+        "author": "Frank Herbert",
+        "year": "1965",
+    }
@@ -0,0 +1,80 @@
+"""Test superprompt_batch"""
+
+import superprompt
+from tests.test_comprehensive import QUESTIONS, RESPONSE
+from tests.test_headless import RESPONSES
+
+QUESTION = {
+    "name": "books",
+    "type": "text",
+    "message": "Book?",
+    "multiple": -3,
+    "filter": lambda x: x.upper(),
+}
+
+
+def test_batch():
+    """Test results are returned in order for each set of responses"""
+    answer_sets = ({"books": [f"book{i}"] * (i % 3 + 1)} for i in range(200))
+    results = list(
+        superprompt.superprompt_batch(QUESTION, answer_sets, workers=2, chunksize=7)
+    )
+    assert [result.index for result in results] == list(range(200))
+    for i, result in enumerate(results):
+        assert result.error is None
+        assert result.answers == {"books": [f"BOOK{i}"] * (i % 3 + 1)}
+
+
+def test_batch_comprehensive():
+    """Test batch gives the same answers as superprompt"""
+    results = list(
+        superprompt.superprompt_batch(QUESTIONS, [RESPONSES] * 10, workers=2)
+    )
+    assert [result.answers for result in results] == [RESPONSE] * 10
+
+
+def test_batch_errors():
+    """Test failures are reported per set of responses"""
+    answer_sets = [{"books": ["a"]}, {"books": ["a", "b", "c", "d"]}, {"books": [1]}]
+    for workers in [1, 2]:
+        results = list(
+            superprompt.superprompt_batch(QUESTION, answer_sets, workers=workers)
+        )
+        assert results[0] == superprompt.BatchResult(0, {"books": ["A"]})
+        assert isinstance(results[1].error, superprompt.ResponseError)
+        assert results[1].answers is None
+        assert isinstance(results[2].error, ValueError)
+
+
+def test_batch_spawn(monkeypatch):
+    """Test a plan is sent to worker processes started without fork"""
+    import multiprocessing
+
+    monkeypatch.setattr(multiprocessing, "get_all_start_methods", lambda: ["spawn"])
+    method = multiprocessing.get_start_method(allow_none=True)
+    multiprocessing.set_start_method("spawn", force=True)
+    try:
+        question = {
+            "name": "title",
+            "type": "text",
+            "message": "?",
+            "filter": str.upper,
+        }
+        results = list(
+            superprompt.superprompt_batch(
+                question, [{"title": "a"}, {"title": "b"}], workers=2
+            )
+        )
+    finally:
+        multiprocessing.set_start_method(method, force=True)
+    assert [result.answers for result in results] == [{"title": "A"}, {"title": "B"}]
+
+
+def test_plan_pickle():
+    """Test a compiled plan, including its expressions, can be pickled"""
+    import pickle
+
+    plan = superprompt.compile_questions(dict(QUESTION, filter="value.upper()"))
+    copy = pickle.loads(pickle.dumps(plan))
+    result = superprompt.superprompt(copy, responses={"books": ["a"]})
+    assert result == {"books": ["A"]}
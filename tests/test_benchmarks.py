@@ -0,0 +1,42 @@
+"""Test the benchmark suite's tree generators and regression check"""
+
+import json
+
+from benchmarks.bench_suite import main, regressions
+from benchmarks.trees import answer_tree, make_tree
+from tests.utils import patched_prompt
+
+
+def test_make_tree():
+    """Test generated trees can be answered the same way stubbed and through pipe input"""
+    questions = make_tree(depth=3, width=3, multiple=-2, if_density=0.5, seed=1)
+    answers, asked, keystrokes = answer_tree(questions)
+    assert set(answers) >= {"q0_0", "q0_1", "q0_2", "group0"}
+    assert "group1" in answers["group0"]
+    assert "confirm" in asked
+    assert patched_prompt(questions, keystrokes) == answers
+
+
+def test_regressions():
+    """Test only measurements slower than the threshold are reported"""
+    baseline = {"cases": {"flat": {"questions": 10, "traversal": 10.0}}}
+    results = {"cases": {"flat": {"questions": 10, "traversal": 11.0}}}
+    assert not regressions(results, baseline, 0.25)
+    results["cases"]["flat"]["traversal"] = 13.0
+    assert regressions(results, baseline, 0.25) == [
+        "flat.traversal: 13.0 us/question, was 10.0 (+30%)"
+    ]
+
+
+def test_suite_output(tmp_path):
+    """Test the suite writes JSON results and fails against a much faster baseline"""
+    output = tmp_path / "results.json"
+    args = ["--case", "flat", "--repeat", "1", "--end-to-end-limit", "0"]
+    assert main(args + ["--output", str(output)]) == 0
+    results = json.loads(output.read_text())
+    assert results["cases"]["flat"]["questions"] == 200
+
+    results["cases"]["flat"]["traversal"] /= 1000
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(results))
+    assert main(args + ["--baseline", str(baseline)]) == 1
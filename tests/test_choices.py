@@ -0,0 +1,113 @@
+"""Test cached choice providers for superprompt"""
+
+import time
+
+import pytest
+
+import superprompt
+
+
+def make_provider(calls):
+    """Return a choices provider that records the remote it was called for"""
+
+    def branches(answers):
+        calls.append(answers.get("remote"))
+        return ["main", "dev"]
+
+    return branches
+
+
+def branch_question(provider, **options):
+    return dict(
+        {
+            "name": "branch",
+            "type": "select",
+            "message": "Branch?",
+            "choices": provider,
+            "multiple": 3,
+        },
+        **options,
+    )
+
+
+def test_choices_not_cached_by_default():
+    """Test the provider is called for every prompt without a choice cache"""
+    calls = []
+    question = branch_question(make_provider(calls))
+    superprompt.superprompt(question, responses={"branch": ["main", "dev", "main"]})
+    assert len(calls) == 3
+
+
+def test_choices_cached_for_run():
+    """Test choice_cache=True calls the provider once per run"""
+    calls = []
+    question = branch_question(make_provider(calls), choice_cache=True)
+    for _ in range(2):
+        result = superprompt.superprompt(
+            question, responses={"branch": ["main", "dev", "main"]}
+        )
+        assert result == {"branch": ["main", "dev", "main"]}
+    assert calls == [None, None]
+
+
+def test_choice_cache_option_for_every_question():
+    """Test choice_cache passed to superprompt applies to every question"""
+    calls = []
+    question = branch_question(make_provider(calls))
+    superprompt.superprompt(
+        question, responses={"branch": ["main"] * 3}, choice_cache=True
+    )
+    assert len(calls) == 1
+
+
+def test_choice_cache_keyed_by_answers_read():
+    """Test a shared cache reuses choices only while the answers read are the same"""
+    calls = []
+    cache = superprompt.ChoiceCache()
+    questions = [
+        {"name": "remote", "type": "text", "message": "Remote?"},
+        branch_question(make_provider(calls), choice_cache=cache),
+    ]
+    for remote in ["origin", "origin", "upstream", "origin"]:
+        superprompt.superprompt(
+            questions, responses={"remote": remote, "branch": ["main"] * 3}
+        )
+    assert calls == ["origin", "upstream"]
+
+
+def test_choice_cache_ttl(monkeypatch):
+    """Test cached choices expire after ttl seconds"""
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    calls = []
+    cache = superprompt.ChoiceCache(ttl=60)
+    question = branch_question(make_provider(calls), choice_cache=cache)
+    responses = {"branch": ["main"] * 3}
+    superprompt.superprompt(question, responses=responses)
+    now[0] += 59
+    superprompt.superprompt(question, responses=responses)
+    assert len(calls) == 1
+    now[0] += 2
+    superprompt.superprompt(question, responses=responses)
+    assert len(calls) == 2
+
+
+def test_choice_cache_lru():
+    """Test the least recently used choices are evicted"""
+    cache = superprompt.ChoiceCache(maxsize=2)
+    store = superprompt.AnswerStore()
+    providers = [lambda answers: [1], lambda answers: [2], lambda answers: [3]]
+    for provider in providers[:2]:
+        cache.put(provider, {}, provider(store))
+    assert cache.get(providers[0], store) == [1]
+    cache.put(providers[2], {}, [3])
+    assert cache.get(providers[1], store) is superprompt._MISSING
+    assert cache.get(providers[0], store) == [1]
+    assert cache.get(providers[2], store) == [3]
+
+
+def test_invalid_choice_cache():
+    """Test choice_cache must be a bool or a ChoiceCache"""
+    question = branch_question(make_provider([]), choice_cache="yes")
+    with pytest.raises(superprompt.QuestionConfigError):
+        superprompt.compile_questions(question)
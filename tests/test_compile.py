@@ -0,0 +1,117 @@
+"""Test compile_questions for superprompt"""
+
+import pytest
+from questionary.prompt import PromptParameterException
+
+import superprompt
+from tests.utils import KeyInputs, patched_prompt
+
+QUESTIONS = [
+    {"name": "title", "type": "text", "message": "What's the title?"},
+    {
+        "name": "more",
+        "type": "confirm",
+        "message": "More?",
+        "if": [
+            True,
+            {
+                "name": "author",
+                "type": "dict",
+                "questions": [
+                    {"name": "first", "type": "text", "message": "First name?"},
+                    {"name": "last", "type": "text", "message": "Last name?"},
+                ],
+            },
+        ],
+    },
+]
+
+
+def test_compile_questions():
+    """Test compile_questions returns a plan that superprompt accepts"""
+    plan = superprompt.compile_questions(QUESTIONS)
+    assert isinstance(plan, superprompt.QuestionPlan)
+    assert len(plan) == 2
+
+    answers = "Dune" + KeyInputs.ENTER + "y" + "Frank" + KeyInputs.ENTER
+    answers += "Herbert" + KeyInputs.ENTER
+    result = patched_prompt(plan, answers)
+    assert result == {
+        "title": "Dune",
+        "more": True,
+        "author": {"first": "Frank", "last": "Herbert"},
+    }
+
+
+def test_compile_questions_reuse():
+    """Test a plan can be reused for multiple runs"""
+    plan = superprompt.compile_questions(QUESTIONS)
+    for title in ["Dune", "Hyperion"]:
+        result = patched_prompt(plan, title + KeyInputs.ENTER + "n")
+        assert result == {"title": title, "more": False}
+
+
+def test_compile_questions_immutable():
+    """Test plan cannot be modified"""
+    plan = superprompt.compile_questions(QUESTIONS)
+    with pytest.raises(AttributeError):
+        plan._nodes = ()
+    node = next(iter(plan))
+    with pytest.raises(TypeError):
+        node.config["message"] = "changed"
+
+
+def test_compile_questions_all_errors():
+    """Test every error in the tree is reported, including unreached branches"""
+    questions = [
+        {"name": "missing_type", "message": "No type"},
+        {
+            "name": "confirm",
+            "type": "confirm",
+            "message": "Continue?",
+            "if": [
+                False,
+                [
+                    {"type": "text", "message": "No name"},
+                    {"name": "no_questions", "type": "dict"},
+                ],
+            ],
+        },
+    ]
+    with pytest.raises(superprompt.QuestionConfigError) as excinfo:
+        superprompt.compile_questions(questions)
+
+    paths = [path for path, _ in excinfo.value.errors]
+    assert paths == ["[0]", "[1].if[0]", "[1].if[1]"]
+    assert all(
+        isinstance(error, PromptParameterException) for _, error in excinfo.value.errors
+    )
+    assert "[1].if[1]: You must provide a `questions` value" in str(excinfo.value)
+
+
+def test_compile_questions_multiple_not_int():
+    """Test 'multiple' must be an int"""
+    with pytest.raises(ValueError):
+        superprompt.compile_questions(
+            {"name": "books", "type": "text", "message": "Book?", "multiple": "3"}
+        )
+
+
+def test_compile_questions_default_kwargs():
+    """Test default options are used when checking for missing arguments"""
+    question = {"name": "title", "type": "text"}
+    with pytest.raises(PromptParameterException):
+        superprompt.compile_questions(question)
+    assert superprompt.compile_questions(question, message="What's the title?")
+
+
+def test_prompt_required_arguments():
+    """Test the built in table of required arguments matches questionary"""
+    from questionary.prompts import AVAILABLE_PROMPTS
+
+    for _type in AVAILABLE_PROMPTS:
+        if _type in superprompt.GROUP_TYPES:
+            continue
+        expected = superprompt._prompt_required_arguments(_type)
+        if _type in superprompt.PROMPT_REQUIRED_ARGUMENTS:
+            assert superprompt.PROMPT_REQUIRED_ARGUMENTS[_type] == expected
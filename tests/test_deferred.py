@@ -0,0 +1,184 @@
+"""Test deferred filters for superprompt"""
+
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+import superprompt
+
+QUESTIONS = [
+    {"name": "name", "type": "text", "message": "Name?"},
+    {
+        "name": "tags",
+        "type": "text",
+        "message": "Tag?",
+        "multiple": 2,
+        "multiple_message": "Another tag?",
+    },
+    {
+        "name": "books",
+        "type": "list",
+        "multiple": -2,
+        "questions": [{"name": "title", "type": "text", "message": "Title?"}],
+    },
+]
+RESPONSES = {
+    "name": "anne",
+    "tags": ["a", "b"],
+    "books": [{"title": "dune"}, {"title": "emma"}],
+}
+
+
+def test_deferred_filter_result_identical():
+    """Test deferring every filter gives the same answers as running them in turn"""
+    serial = superprompt.superprompt(QUESTIONS, responses=RESPONSES, filter=str.upper)
+    deferred = superprompt.superprompt(
+        QUESTIONS, responses=RESPONSES, filter=str.upper, defer_filter=True
+    )
+    assert (
+        deferred
+        == serial
+        == {
+            "name": "ANNE",
+            "tags": ["A", "B"],
+            "books": [["DUNE"], ["EMMA"]],
+        }
+    )
+
+
+def test_deferred_filter_traversal_continues():
+    """Test the next questions are asked while a deferred filter runs"""
+    asked = threading.Event()
+
+    def slow(answer):
+        assert asked.wait(5)
+        return answer.upper()
+
+    def when(answers):
+        asked.set()
+        return True
+
+    questions = [
+        {"name": "first", "type": "text", "filter": slow, "defer_filter": True},
+        {"name": "second", "type": "text", "when": when},
+    ]
+    result = superprompt.superprompt(
+        questions, responses={"first": "a", "second": "b"}, message="?"
+    )
+    assert result == {"first": "A", "second": "b"}
+
+
+def test_deferred_filter_joined_when_read():
+    """Test reading a deferred answer waits for its filter"""
+    seen = []
+    questions = [
+        {
+            "name": "first",
+            "type": "text",
+            "message": "First?",
+            "filter": lambda answer: time.sleep(0.05) or answer * 2,
+            "defer_filter": True,
+        },
+        {
+            "name": "second",
+            "type": "text",
+            "when": lambda answers: seen.append(answers["first"]) or True,
+            "template": True,
+            "message": "After {first}?",
+        },
+    ]
+    result = superprompt.superprompt(questions, responses={"first": "a", "second": "b"})
+    assert seen == ["aa"]
+    assert result == {"first": "aa", "second": "b"}
+
+
+def test_deferred_filter_read_through_group():
+    """Test a later 'when' reading a deferred answer through its group or list sees
+    the filtered answer, as in a serial run"""
+    questions = [
+        {
+            "name": "t",
+            "type": "dict",
+            "questions": [{"name": "size", "type": "text", "message": "Size?"}],
+        },
+        {
+            "name": "grp",
+            "type": "list",
+            "questions": [{"name": "colour", "type": "text", "message": "Colour?"}],
+        },
+        {"name": "tags", "type": "text", "message": "Tag?", "multiple": 2},
+        {
+            "name": "large",
+            "type": "text",
+            "message": "Large?",
+            "when": lambda answers: answers["t"]["size"] == "L",
+        },
+        {
+            "name": "red",
+            "type": "text",
+            "message": "Red?",
+            "when": lambda answers: answers["grp"][0] == "RED",
+        },
+        {
+            "name": "tagged",
+            "type": "text",
+            "message": "Tagged?",
+            "when": lambda answers: answers["tags"] == ["A", "B"],
+        },
+    ]
+    responses = {
+        "t": {"size": "l"},
+        "grp": ["red"],
+        "tags": ["a", "b"],
+        "large": "yes",
+        "red": "yes",
+        "tagged": "yes",
+    }
+    serial = superprompt.superprompt(questions, responses=responses, filter=str.upper)
+    deferred = superprompt.superprompt(
+        questions, responses=responses, filter=str.upper, defer_filter=True
+    )
+    assert deferred == serial
+    assert deferred["large"] == deferred["red"] == deferred["tagged"] == "YES"
+
+
+def test_deferred_filter_error():
+    """Test an exception in a deferred filter is raised"""
+
+    def fail(answer):
+        raise RuntimeError("boom")
+
+    question = {"name": "first", "type": "text", "message": "?", "filter": fail}
+    with pytest.raises(ValueError, match="'filter' of first question: boom"):
+        superprompt.superprompt(question, responses={"first": "a"}, defer_filter=True)
+
+
+def test_deferred_filter_executor():
+    """Test a deferred filter runs on the given executor"""
+    threads = []
+
+    def record(answer):
+        threads.append(threading.current_thread().name)
+        return answer
+
+    with concurrent.futures.ThreadPoolExecutor(thread_name_prefix="mine") as pool:
+        question = {
+            "name": "first",
+            "type": "text",
+            "message": "?",
+            "filter": record,
+            "defer_filter": pool,
+        }
+        assert superprompt.superprompt(question, responses={"first": "a"}) == {
+            "first": "a"
+        }
+    assert threads[0].startswith("mine")
+
+
+def test_deferred_filter_invalid():
+    """Test defer_filter must be a bool or an executor"""
+    question = {"name": "first", "type": "text", "message": "?", "defer_filter": 2}
+    with pytest.raises(superprompt.QuestionConfigError):
+        superprompt.compile_questions(question)
@@ -0,0 +1,97 @@
+"""Test the on_event observer"""
+
+import time
+
+import superprompt
+from tests.utils import KeyInputs, patched_prompt
+
+QUESTIONS = [
+    {
+        "name": "more",
+        "type": "confirm",
+        "message": "More?",
+        "if": [
+            lambda x: x,
+            {
+                "name": "book",
+                "type": "dict",
+                "questions": [
+                    {
+                        "name": "title",
+                        "type": "text",
+                        "message": "Title?",
+                        "filter": lambda x: time.sleep(0.01) or x.upper(),
+                    },
+                    {
+                        "name": "tags",
+                        "type": "text",
+                        "message": "Tag?",
+                        "multiple": 2,
+                        "when": lambda x: True,
+                    },
+                ],
+            },
+        ],
+    }
+]
+
+
+def test_events():
+    """Test the events of a run and their order"""
+    events = []
+    text = "y" + "dune" + KeyInputs.ENTER + "a" + KeyInputs.ENTER + "b"
+    text += KeyInputs.ENTER
+    result = patched_prompt(QUESTIONS, text, on_event=events.append)
+    assert result == {"more": True, "book": {"title": "DUNE", "tags": ["a", "b"]}}
+
+    assert [(event.kind, event.path) for event in events] == [
+        ("question_start", "more"),
+        ("render", "more"),
+        ("answer", "more"),
+        ("question_end", "more"),
+        ("if", "more"),
+        ("group_enter", "book"),
+        ("question_start", "book.title"),
+        ("render", "book.title"),
+        ("answer", "book.title"),
+        ("filter", "book.title"),
+        ("question_end", "book.title"),
+        ("multiple", "book.tags"),
+        ("question_start", "book.tags.0"),
+        ("when", "book.tags.0"),
+        ("render", "book.tags.0"),
+        ("answer", "book.tags.0"),
+        ("question_end", "book.tags.0"),
+        ("multiple", "book.tags"),
+        ("question_start", "book.tags.1"),
+        ("when", "book.tags.1"),
+        ("render", "book.tags.1"),
+        ("answer", "book.tags.1"),
+        ("question_end", "book.tags.1"),
+        ("group_exit", "book"),
+    ]
+    times = [event.time for event in events]
+    assert times == sorted(times)
+
+    by_kind = {(event.kind, event.path): event for event in events}
+    assert by_kind[("filter", "book.title")].duration >= 0.01
+    assert by_kind[("filter", "book.title")].value == "DUNE"
+    assert by_kind[("answer", "book.title")].value == "dune"
+    assert by_kind[("if", "more")].value is True
+    assert by_kind[("question_start", "more")].value == "confirm"
+
+
+def test_events_headless():
+    """Test events are sent in headless mode, where nothing is rendered"""
+    events = []
+    superprompt.superprompt(
+        QUESTIONS,
+        responses={"more": False},
+        on_event=events.append,
+    )
+    assert [event.kind for event in events] == [
+        "question_start",
+        "answer",
+        "question_end",
+        "if",
+    ]
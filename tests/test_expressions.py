@@ -0,0 +1,177 @@
+"""Test expressions and message templates for superprompt"""
+
+import pickle
+
+import pytest
+
+import superprompt
+from tests.utils import KeyInputs, patched_prompt
+
+QUESTIONS = [
+    {"name": "fries", "type": "confirm", "message": "Fries?"},
+    {"name": "vegan", "type": "confirm", "message": "Vegan?"},
+    {
+        "name": "mayo",
+        "type": "confirm",
+        "message": "Mayo?",
+        "when": "answers.fries and not answers.vegan",
+    },
+    {
+        "name": "name",
+        "type": "text",
+        "message": "Name?",
+        "filter": "value.strip().title()",
+        "if": [
+            {"expr": "len(value) > 3"},
+            [
+                {
+                    "name": "greeting",
+                    "type": "print",
+                    "message": "Hello {name}",
+                    "template": True,
+                }
+            ],
+        ],
+    },
+    {
+        "name": "nickname",
+        "type": "text",
+        "message": "Nickname for {name!r}?",
+        "template": True,
+    },
+]
+
+
+def test_expressions_headless():
+    """Test when, filter and if expressions"""
+    responses = {"fries": True, "vegan": False, "mayo": True, "name": " anne marie "}
+    responses["nickname"] = "Annie"
+    assert superprompt.superprompt(QUESTIONS, responses=responses) == {
+        "fries": True,
+        "vegan": False,
+        "mayo": True,
+        "name": "Anne Marie",
+        "greeting": None,
+        "nickname": "Annie",
+    }
+
+    responses = {"fries": True, "vegan": True, "name": "bo", "nickname": "B"}
+    assert superprompt.superprompt(QUESTIONS, responses=responses) == {
+        "fries": True,
+        "vegan": True,
+        "name": "Bo",
+        "nickname": "B",
+    }
+
+
+def test_templates(monkeypatch):
+    """Test templates are rendered with the answers when asked and printed"""
+    messages = []
+    printed = []
+    monkeypatch.setattr(
+        superprompt,
+        "_write_prints",
+        lambda prints: printed.extend(message for message, _ in prints),
+    )
+    prompt_by_name = superprompt.prompt_by_name
+
+    def recording_prompt_by_name(_type):
+        def prompt(**kwargs):
+            messages.append(kwargs["message"])
+            return prompt_by_name(_type)(**kwargs)
+
+        return prompt
+
+    monkeypatch.setattr(superprompt, "prompt_by_name", recording_prompt_by_name)
+    inputs = "y" + "y" + "anne" + KeyInputs.ENTER + "Annie" + KeyInputs.ENTER
+    result = patched_prompt(QUESTIONS, inputs)
+    assert result["nickname"] == "Annie"
+    assert printed == ["Hello Anne"]
+    assert messages[-1] == "Nickname for 'Anne'?"
+
+
+def test_expression_dotted_path():
+    """Test answers of nested questions are read by their dotted path"""
+    questions = [
+        {
+            "name": "order",
+            "type": "dict",
+            "questions": [{"name": "size", "type": "text", "message": "Size?"}],
+        },
+        {
+            "name": "large",
+            "type": "confirm",
+            "message": "Really large?",
+            "when": "answers.order.size == 'large'",
+        },
+    ]
+    responses = {"order": {"size": "small"}}
+    assert superprompt.superprompt(questions, responses=responses) == responses
+    responses = {"order": {"size": "large"}, "large": True}
+    assert superprompt.superprompt(questions, responses=responses) == responses
+
+
+def test_if_string_is_a_literal():
+    """Test a string 'if' condition is still compared with the answer"""
+    question = {
+        "name": "size",
+        "type": "text",
+        "message": "Size?",
+        "if": ["len(value) > 3", {"name": "x", "type": "text", "message": "X?"}],
+    }
+    assert superprompt.superprompt(question, responses={"size": "large"}) == {
+        "size": "large"
+    }
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "__import__('os')",
+        "value.__class__",
+        "open('file')",
+        "lambda: 1",
+        "[x for x in value]",
+        "value ** 2",
+        "len(**value)",
+        "value +",
+    ],
+)
+def test_unsafe_expressions_rejected(source):
+    """Test expressions outside the safe subset are reported by compile_questions"""
+    question = {"name": "a", "type": "text", "message": "A?", "filter": source}
+    with pytest.raises(superprompt.QuestionConfigError) as excinfo:
+        superprompt.compile_questions(question)
+    assert "Invalid 'filter' expression" in str(excinfo.value)
+
+
+def test_unsafe_attributes_rejected_when_evaluated():
+    """Test attributes of values other than plain values can't be used"""
+    question = {
+        "name": "a",
+        "type": "text",
+        "message": "A?",
+        "filter": "value.upper.name",
+    }
+    with pytest.raises(ValueError, match="can't be used in expressions"):
+        superprompt.superprompt(question, responses={"a": "x"})
+    question["filter"] = "value.format(value)"
+    with pytest.raises(ValueError, match="can't be used in expressions"):
+        superprompt.superprompt(question, responses={"a": "{0.__class__}"})
+
+
+def test_invalid_template():
+    """Test invalid templates are reported by compile_questions"""
+    question = {"name": "a", "type": "text", "message": "A {}?", "template": True}
+    with pytest.raises(superprompt.QuestionConfigError):
+        superprompt.compile_questions(question)
+
+
+def test_expressions_pickle():
+    """Test compiled expressions and templates can be sent to worker processes"""
+    plan = superprompt.compile_questions(QUESTIONS)
+    node = list(plan)[2]
+    expression = pickle.loads(pickle.dumps(node.config["when"]))
+    assert expression(superprompt.AnswerStore({"fries": True})) is True
+    template = pickle.loads(pickle.dumps(list(plan)[4].template))
+    assert template(superprompt.AnswerStore({"name": "Bo"})) == "Nickname for 'Bo'?"
@@ -0,0 +1,134 @@
+"""Test groups with the form layout for superprompt"""
+
+import pytest
+
+import superprompt
+from tests.utils import KeyInputs, patched_prompt
+
+
+def port(value):
+    return value.isdigit() or "Port must be a number"
+
+
+SERVER = {
+    "name": "server",
+    "type": "dict",
+    "layout": "form",
+    "message": "Server",
+    "questions": [
+        {"name": "host", "type": "text", "message": "Host", "filter": str.lower},
+        {"name": "port", "type": "text", "message": "Port", "validate": port},
+        {"name": "tls", "type": "confirm", "message": "TLS", "default": False},
+        {
+            "name": "region",
+            "type": "select",
+            "message": "Region",
+            "choices": ["eu", "us", "ap"],
+        },
+    ],
+}
+
+
+def test_form_answers():
+    """Test a form gives the same answers as asking each question in turn"""
+    inputs = "Example.COM" + KeyInputs.ENTER + "443" + KeyInputs.ENTER
+    inputs += "y" + KeyInputs.ENTER + KeyInputs.RIGHT + KeyInputs.ENTER
+    result = patched_prompt([SERVER], inputs)
+    expected = {
+        "server": {"host": "example.com", "port": "443", "tls": True, "region": "us"}
+    }
+    assert result == expected
+    serial = dict(SERVER)
+    del serial["layout"]
+    inputs = "Example.COM" + KeyInputs.ENTER + "443" + KeyInputs.ENTER + "y"
+    inputs += KeyInputs.DOWN + KeyInputs.ENTER
+    assert patched_prompt([serial], inputs) == expected
+
+
+def test_form_revisit_and_validate():
+    """Test an invalid field keeps the focus and fields can be revisited"""
+    inputs = "a" + KeyInputs.ENTER + "http" + KeyInputs.ENTER
+    # fix the port, then go back up to change the host
+    inputs += KeyInputs.BACK * 4 + "80" + KeyInputs.ENTER
+    inputs += KeyInputs.UP + KeyInputs.UP + "b" + KeyInputs.TAB + KeyInputs.TAB
+    inputs += KeyInputs.TAB + KeyInputs.ENTER
+    result = patched_prompt([SERVER], inputs)
+    assert result == {
+        "server": {"host": "ab", "port": "80", "tls": False, "region": "eu"}
+    }
+
+
+def test_form_providers_called_once():
+    """Test the choices and default callables of a form's questions are only called
+    when the form is shown, not again when its answers are used"""
+    calls = []
+
+    def regions(answers):
+        calls.append("choices")
+        return ["eu", "us", "ap"]
+
+    def host(answers):
+        calls.append("default")
+        return "example.com"
+
+    question = dict(
+        SERVER,
+        questions=[
+            {"name": "host", "type": "text", "message": "Host", "default": host},
+            {
+                "name": "region",
+                "type": "select",
+                "message": "Region",
+                "choices": regions,
+            },
+        ],
+    )
+    inputs = KeyInputs.ENTER + KeyInputs.RIGHT + KeyInputs.ENTER
+    result = patched_prompt([question], inputs)
+    assert result == {"server": {"host": "example.com", "region": "us"}}
+    assert sorted(calls) == ["choices", "default"]
+
+
+def test_form_list_group():
+    """Test a list group's form gives a list of answers"""
+    question = {
+        "name": "names",
+        "type": "list",
+        "layout": "form",
+        "questions": [
+            {"name": "first", "type": "text", "message": "First"},
+            {"name": "last", "type": "text", "message": "Last"},
+        ],
+    }
+    inputs = "Ada" + KeyInputs.ENTER + "Lovelace" + KeyInputs.ENTER
+    assert patched_prompt([question], inputs) == {"names": ["Ada", "Lovelace"]}
+
+
+def test_form_headless():
+    """Test headless answers to a form are given as for any group"""
+    responses = {"server": {"host": "A", "port": "1", "tls": True, "region": "ap"}}
+    result = superprompt.superprompt([SERVER], responses=responses)
+    assert result == {"server": {"host": "a", "port": "1", "tls": True, "region": "ap"}}
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        {"name": "a", "type": "text", "message": "?", "layout": "form"},
+        dict(SERVER, layout="grid"),
+        dict(
+            SERVER,
+            questions=[
+                {"name": "b", "type": "checkbox", "message": "?", "choices": []}
+            ],
+        ),
+        dict(
+            SERVER,
+            questions=[{"name": "b", "type": "text", "message": "?", "multiple": 2}],
+        ),
+    ],
+)
+def test_form_invalid(question):
+    """Test the form layout needs a group of simple questions"""
+    with pytest.raises(superprompt.QuestionConfigError):
+        superprompt.compile_questions(question)
@@ -0,0 +1,157 @@
+"""Test headless (responses) mode for superprompt"""
+
+import json
+import sys
+
+import prompt_toolkit
+import pytest
+
+import superprompt
+from tests.test_comprehensive import QUESTIONS, RESPONSE
+
+RESPONSES = {
+    "burger": True,
+    "fries": True,
+    "chili-fries": False,
+    "toppings": {
+        "condiments": ["mustard", "green chiles"],
+        "extras": {
+            "special_requests": "mustard on the side",
+            "allergies": ["gluten", "dairy"],
+        },
+    },
+    "books": [["Dune", "Frank Herbert"], ["Lord of the Rings", "J.R.R. Tolkien"]],
+}
+
+
+@pytest.fixture(autouse=True)
+def no_prompts(monkeypatch):
+    """Fail if any prompt_toolkit application is created"""
+
+    def fail(*args, **kwargs):
+        raise AssertionError("headless mode must not create prompts")
+
+    monkeypatch.setattr(prompt_toolkit.Application, "__init__", fail)
+    monkeypatch.setattr(superprompt, "_write_prints", fail)
+
+
+def test_headless_comprehensive():
+    """Test headless mode gives same result as prompting"""
+    assert superprompt.superprompt(QUESTIONS, responses=RESPONSES) == RESPONSE
+
+
+def test_headless_plan_reuse():
+    """Test a compiled plan can be answered headless repeatedly"""
+    plan = superprompt.compile_questions(QUESTIONS)
+    for _ in range(3):
+        assert superprompt.superprompt(plan, responses=RESPONSES) == RESPONSE
+
+
+def test_headless_json_file(tmp_path):
+    """Test answers loaded from a JSON file"""
+    path = tmp_path / "answers.json"
+    path.write_text(json.dumps(RESPONSES))
+    assert superprompt.superprompt(QUESTIONS, responses=str(path)) == RESPONSE
+
+
+def test_headless_toml_file(tmp_path):
+    """Test answers loaded from a TOML file"""
+    pytest.importorskip("tomllib" if sys.version_info >= (3, 11) else "tomli")
+    path = tmp_path / "answers.toml"
+    path.write_text('title = "Dune"\n[author]\nfirst = "Frank"\nlast = "Herbert"\n')
+    questions = [
+        {"name": "title", "type": "text", "message": "Title?"},
+        {
+            "name": "author",
+            "type": "list",
+            "questions": [
+                {"name": "first", "type": "text", "message": "First?"},
+                {"name": "last", "type": "text", "message": "Last?"},
+            ],
+        },
+    ]
+    assert superprompt.superprompt(questions, responses=path) == {
+        "title": "Dune",
+        "author": ["Frank", "Herbert"],
+    }
+
+
+def test_headless_when_and_default():
+    """Test 'when' skips questions and missing answers use the default"""
+    questions = [
+        {"name": "fries", "type": "confirm", "message": "Fries?", "default": False},
+        {
+            "name": "chili",
+            "type": "confirm",
+            "message": "Chili?",
+            "when": lambda x: x["fries"],
+        },
+        {
+            "name": "size",
+            "type": "text",
+            "message": "Size?",
+            "default": lambda x: "large" if x["fries"] else "small",
+        },
+    ]
+    assert superprompt.superprompt(questions, responses={}) == {
+        "fries": False,
+        "size": "small",
+    }
+
+
+def test_headless_missing_answer():
+    """Test missing answer with no default raises ResponseError"""
+    with pytest.raises(superprompt.ResponseError):
+        superprompt.superprompt(
+            {"name": "title", "type": "text", "message": "Title?"}, responses={}
+        )
+
+
+def test_headless_validate():
+    """Test validate is applied to answers"""
+    question = {
+        "name": "title",
+        "type": "text",
+        "message": "Title?",
+        "validate": lambda x: len(x) > 3 or "Title too short",
+    }
+    assert superprompt.superprompt(question, responses={"title": "Dune"}) == {
+        "title": "Dune"
+    }
+    with pytest.raises(superprompt.ResponseError, match="Title too short"):
+        superprompt.superprompt(question, responses={"title": "Do"})
+
+
+def test_headless_choices():
+    """Test select answer must be one of the choices"""
+    question = {
+        "name": "color",
+        "type": "select",
+        "message": "Color?",
+        "choices": ["red", {"name": "Green", "value": "green"}],
+    }
+    assert superprompt.superprompt(question, responses={"color": "green"}) == {
+        "color": "green"
+    }
+    with pytest.raises(superprompt.ResponseError):
+        superprompt.superprompt(question, responses={"color": "blue"})
+
+
+def test_headless_multiple():
+    """Test multiple answers are checked against multiple"""
+    question = {
+        "name": "books",
+        "type": "text",
+        "message": "Book?",
+        "multiple": -2,
+        "filter": lambda x: x.upper(),
+    }
+    assert superprompt.superprompt(question, responses={"books": ["dune"]}) == {
+        "books": ["DUNE"]
+    }
+    with pytest.raises(superprompt.ResponseError):
+        superprompt.superprompt(question, responses={"books": ["a", "b", "c"]})
+
+    question["multiple"] = 2
+    with pytest.raises(superprompt.ResponseError):
+        superprompt.superprompt(question, responses={"books": ["dune"]})
@@ -0,0 +1,64 @@
+"""Test that importing superprompt does not import questionary or prompt_toolkit"""
+
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_PACKAGES = ("questionary", "prompt_toolkit")
+
+
+def import_times(statement):
+    """Run statement in a new interpreter with -X importtime
+
+    Returns:
+        dict of module name: cumulative import time in microseconds
+    """
+    # allow bytecode to be cached so compiling superprompt.py isn't measured
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:") :].split("|")
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+def test_import_is_lazy():
+    """Test import superprompt doesn't import questionary or prompt_toolkit"""
+    times = import_times("import superprompt")
+    assert "superprompt" in times
+    assert not [m for m in times if m.split(".")[0] in HEAVY_PACKAGES]
+
+
+def test_import_time():
+    """Test import superprompt is much cheaper than importing questionary"""
+    superprompt_time = min(
+        import_times("import superprompt")["superprompt"] for _ in range(3)
+    )
+    questionary_time = min(
+        import_times("import questionary")["questionary"] for _ in range(3)
+    )
+    assert superprompt_time < questionary_time / 4
+
+
+def test_headless_is_lazy():
+    """Test compiling and answering questions headless doesn't import questionary"""
+    times = import_times(
+        "import superprompt;"
+        "plan = superprompt.compile_questions("
+        "[{'name': 'color', 'type': 'select', 'message': 'Color?',"
+        "'choices': ['red', 'blue'], 'validate': lambda x: x != 'red'}]);"
+        "assert superprompt.superprompt(plan, responses={'color': 'blue'})"
+    )
+    assert not [m for m in times if m.split(".")[0] in HEAVY_PACKAGES]
@@ -0,0 +1,186 @@
+"""Test the include question type for superprompt"""
+
+import json
+import os
+
+import pytest
+
+import superprompt
+
+NETWORK = [
+    {"name": "host", "type": "text", "message": "Host?"},
+    {"name": "port", "type": "text", "message": "Port?"},
+]
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """Replace the module's include cache with an empty one"""
+    include_cache = superprompt.IncludeCache()
+    monkeypatch.setattr(superprompt, "include_cache", include_cache)
+    return include_cache
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return path
+
+
+def test_include_when_reached(tmp_path, cache):
+    """Test an included file is only read when the include is reached"""
+    questions = [
+        {
+            "name": "network",
+            "type": "confirm",
+            "message": "Configure network?",
+            "if": [True, {"type": "include", "path": str(tmp_path / "network.json")}],
+        }
+    ]
+    plan = superprompt.compile_questions(questions)
+    assert superprompt.superprompt(plan, responses={"network": False}) == {
+        "network": False
+    }
+
+    write_json(tmp_path / "network.json", NETWORK)
+    responses = {"network": True, "host": "localhost", "port": "80"}
+    assert superprompt.superprompt(plan, responses=responses) == responses
+
+
+def test_include_nested_relative(tmp_path, cache):
+    """Test relative paths in an included file are relative to that file"""
+    (tmp_path / "sub").mkdir()
+    write_json(tmp_path / "sub" / "network.json", NETWORK)
+    write_json(
+        tmp_path / "sub" / "server.json",
+        {
+            "name": "server",
+            "type": "dict",
+            "questions": [{"type": "include", "path": "network.json"}],
+        },
+    )
+    question = {"type": "include", "path": str(tmp_path / "sub" / "server.json")}
+    responses = {"server": {"host": "example.com", "port": "443"}}
+    assert superprompt.superprompt(question, responses=responses) == responses
+
+
+def test_include_toml(tmp_path, cache):
+    """Test questions can be included from a TOML file"""
+    pytest.importorskip("tomllib")
+    (tmp_path / "network.toml").write_text(
+        '[[questions]]\nname = "host"\ntype = "text"\nmessage = "Host?"\n',
+        encoding="utf-8",
+    )
+    question = {"type": "include", "path": str(tmp_path / "network.toml")}
+    assert superprompt.superprompt(question, responses={"host": "h"}) == {"host": "h"}
+
+
+def test_include_yaml(tmp_path, cache):
+    """Test questions can be included from a YAML file"""
+    pytest.importorskip("yaml")
+    (tmp_path / "network.yaml").write_text(
+        "- name: host\n  type: text\n  message: Host?\n", encoding="utf-8"
+    )
+    question = {"type": "include", "path": str(tmp_path / "network.yaml")}
+    assert superprompt.superprompt(question, responses={"host": "h"}) == {"host": "h"}
+
+
+def test_include_memory_cache(tmp_path, cache):
+    """Test the compiled questions are reused until the file changes"""
+    path = write_json(tmp_path / "network.json", NETWORK)
+    plan = cache.load(path)
+    assert cache.load(path) is plan
+
+    write_json(path, NETWORK[:1])
+    os.utime(path, ns=(0, 0))
+    changed = cache.load(path)
+    assert changed is not plan
+    assert len(changed) == 1
+
+
+def test_include_disk_cache(tmp_path, monkeypatch):
+    """Test parsed files are saved on disk and not parsed again by a new cache"""
+    path = write_json(tmp_path / "network.json", NETWORK)
+    parsed = []
+    parse_document = superprompt._parse_document
+
+    def counting_parse(*args):
+        parsed.append(args[0])
+        return parse_document(*args)
+
+    monkeypatch.setattr(superprompt, "_parse_document", counting_parse)
+    directory = tmp_path / "cache"
+    assert len(superprompt.IncludeCache(directory).load(path)) == 2
+    assert len(parsed) == 1
+    assert len(superprompt.IncludeCache(directory).load(path)) == 2
+    assert len(parsed) == 1
+
+    # touched but unchanged: hashed, not parsed
+    os.utime(path, ns=(0, 0))
+    assert len(superprompt.IncludeCache(directory).load(path)) == 2
+    assert len(parsed) == 1
+
+    write_json(path, NETWORK[:1])
+    assert len(superprompt.IncludeCache(directory).load(path)) == 1
+    assert len(parsed) == 2
+
+
+def test_include_disk_cache_json(tmp_path):
+    """Test the on-disk cache entries are JSON and unreadable ones are ignored"""
+    path = write_json(tmp_path / "network.json", NETWORK)
+    directory = tmp_path / "cache"
+    superprompt.IncludeCache(directory).load(path)
+    (entry,) = directory.iterdir()
+    assert json.loads(entry.read_text())["data"] == NETWORK
+
+    entry.write_bytes(b"\x80\x04not json")
+    assert len(superprompt.IncludeCache(directory).load(path)) == 2
+    assert json.loads(entry.read_text())["data"] == NETWORK
+
+
+def test_include_errors(tmp_path, cache):
+    """Test problems with included files are raised when the include is reached"""
+    with pytest.raises(superprompt.QuestionConfigError):
+        superprompt.compile_questions({"type": "include"})
+
+    question = {"type": "include", "path": str(tmp_path / "missing.json")}
+    plan = superprompt.compile_questions(question)
+    with pytest.raises(superprompt.QuestionConfigError) as excinfo:
+        superprompt.superprompt(plan, responses={})
+    assert isinstance(excinfo.value.errors[0][1], FileNotFoundError)
+
+    path = write_json(tmp_path / "bad.json", [{"name": "no_type", "message": "?"}])
+    question = {"type": "include", "path": str(path)}
+    with pytest.raises(superprompt.QuestionConfigError) as excinfo:
+        superprompt.superprompt(question, responses={})
+    assert [p for p, _ in excinfo.value.errors] == [f"{path}[0]"]
+
+
+def test_include_cycle(tmp_path, cache):
+    """Test a file that includes itself, directly or not, raises an error naming the
+    cycle, while a file may be included more than once one after the other"""
+    path = write_json(
+        tmp_path / "a.json",
+        [
+            {"name": "x", "type": "text", "message": "X?"},
+            {"type": "include", "path": "a.json"},
+        ],
+    )
+    with pytest.raises(superprompt.QuestionConfigError) as excinfo:
+        superprompt.superprompt(
+            {"type": "include", "path": str(path)}, responses={"x": "1"}
+        )
+    assert str(excinfo.value.errors[0][1]) == f"include cycle: {path} -> {path}"
+
+    first = write_json(tmp_path / "b.json", [{"type": "include", "path": "c.json"}])
+    second = write_json(tmp_path / "c.json", [{"type": "include", "path": "b.json"}])
+    with pytest.raises(superprompt.QuestionConfigError) as excinfo:
+        superprompt.superprompt({"type": "include", "path": str(first)}, responses={})
+    cycle = f"{first} -> {second} -> {first}"
+    assert str(excinfo.value.errors[0][1]) == f"include cycle: {cycle}"
+
+    path = write_json(tmp_path / "network.json", NETWORK)
+    question = {"type": "include", "path": str(path)}
+    responses = {"host": "h", "port": "p"}
+    assert (
+        superprompt.superprompt([question, question], responses=responses) == responses
+    )
@@ -0,0 +1,87 @@
+"""Test iter_superprompt"""
+
+from prompt_toolkit.output import DummyOutput
+
+import superprompt
+from tests.test_comprehensive import QUESTIONS, RESPONSE
+from tests.test_headless import RESPONSES
+from tests.utils import KeyInputs, execute_with_input_pipe
+
+
+def collect(events):
+    """Return the events yielded by events and the value it returns"""
+    collected = []
+    while True:
+        try:
+            collected.append(next(events))
+        except StopIteration as stop:
+            return collected, stop.value
+
+
+def test_iter_comprehensive():
+    """Test events for every question, multiple value and print, in order"""
+    events, result = collect(
+        superprompt.iter_superprompt(QUESTIONS, responses=RESPONSES)
+    )
+    assert result == RESPONSE
+    assert events == [
+        ("burger", True),
+        ("fries", True),
+        ("chili-fries", False),
+        ("toppings.print_message", None),
+        ("toppings.condiments", ["mustard", "green chiles"]),
+        ("toppings.extras.special_requests", "MUSTARD ON THE SIDE"),
+        ("toppings.extras.allergies.0", "gluten"),
+        ("toppings.extras.allergies.1", "dairy"),
+        # the confirm and the list share a name, so both are answered by RESPONSES["books"]
+        ("books", RESPONSES["books"]),
+        ("books.0.book-title", "Dune"),
+        ("books.0.book-author", "Frank Herbert"),
+        ("books.1.book-title", "Lord of the Rings"),
+        ("books.1.book-author", "J.R.R. Tolkien"),
+    ]
+
+
+def test_iter_multiple_paths_indexed():
+    """Test values of multiple questions can be read by their numbered path"""
+    seen = []
+    questions = [
+        {"name": "books", "type": "text", "message": "Book?", "multiple": 2},
+        {
+            "name": "done",
+            "type": "confirm",
+            "message": "Done?",
+            "when": lambda x: seen.append((x["books.0"], x["books.1"])),
+        },
+    ]
+    events, result = collect(
+        superprompt.iter_superprompt(questions, responses={"books": ["a", "b"]})
+    )
+    assert events == [("books.0", "a"), ("books.1", "b")]
+    assert result == {"books": ["a", "b"]}
+    assert seen == [("a", "b")]
+
+
+def test_iter_is_lazy():
+    """Test the next question isn't asked until the next event is requested"""
+    questions = [
+        {"type": "print", "message": "Hello"},
+        {"name": "first", "type": "text", "message": "First?"},
+        {"name": "second", "type": "text", "message": "Second?"},
+    ]
+
+    def run(inp):
+        inp.send_text("one" + KeyInputs.ENTER)
+        events = superprompt.iter_superprompt(
+            questions, input=inp, output=DummyOutput()
+        )
+        assert next(events) == (None, None)
+        assert next(events) == ("first", "one")
+        # the second answer is only typed once the first has been consumed
+        inp.send_text("two" + KeyInputs.ENTER)
+        return collect(events)
+
+    assert execute_with_input_pipe(run) == (
+        [("second", "two")],
+        {"first": "one", "second": "two"},
+    )
@@ -0,0 +1,44 @@
+"""Test superprompt handles very deep and very long question trees"""
+
+import sys
+
+import superprompt
+
+DEPTH = sys.getrecursionlimit() + 100
+
+
+def test_deep_if_chain():
+    """Test an 'if' chain deeper than the recursion limit"""
+    questions = None
+    for idx in reversed(range(DEPTH)):
+        question = {"name": f"q{idx}", "type": "confirm", "message": f"Q{idx}?"}
+        if questions:
+            question["if"] = [True, questions]
+        questions = question
+    responses = {f"q{idx}": True for idx in range(DEPTH)}
+
+    plan = superprompt.compile_questions(questions)
+    assert superprompt.superprompt(plan, responses=responses) == responses
+
+
+def test_deep_dict_groups():
+    """Test nested dict groups deeper than the recursion limit"""
+    questions = {"name": "leaf", "type": "text", "message": "Leaf?"}
+    responses = {"leaf": "value"}
+    for _ in range(DEPTH):
+        questions = {"name": "group", "type": "dict", "questions": [questions]}
+        responses = {"group": responses}
+
+    answers = superprompt.superprompt(questions, responses=responses)
+    for _ in range(DEPTH):
+        answers = answers["group"]
+    assert answers == {"leaf": "value"}
+
+
+def test_long_multiple():
+    """Test a multiple question with many values"""
+    question = {"name": "values", "type": "text", "message": "Value?", "multiple": 5000}
+    values = [str(idx) for idx in range(5000)]
+    assert superprompt.superprompt(question, responses={"values": values}) == {
+        "values": values
+    }
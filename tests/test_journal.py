@@ -0,0 +1,122 @@
+"""Test the answer journal and resuming an interrupted run"""
+
+import json
+import os
+import stat
+
+import superprompt
+from tests.utils import KeyInputs, patched_prompt
+
+QUESTIONS = [
+    {"name": "title", "type": "text", "message": "Title?"},
+    {"name": "books", "type": "text", "message": "Book?", "multiple": -3},
+    {"name": "author", "type": "text", "message": "Author?"},
+]
+
+
+def read_journal(path):
+    """Return the records in the journal at path"""
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file]
+
+
+def test_keyboard_interrupt_stops_run(capsys):
+    """Test Ctrl-C stops the run and returns no answers"""
+    text = "Dune" + KeyInputs.ENTER + KeyInputs.CONTROLC
+    assert patched_prompt(QUESTIONS, text, kbi_msg="Stopped") == {}
+    assert "Stopped" in capsys.readouterr().out
+
+
+def test_journal_and_resume(tmp_path):
+    """Test answers are journaled and an interrupted run can be resumed"""
+    path = tmp_path / "journal.jsonl"
+    text = "Guide" + KeyInputs.ENTER + "Dune" + KeyInputs.ENTER + "y"
+    text += "Hyperion" + KeyInputs.ENTER + KeyInputs.CONTROLC
+    assert patched_prompt(QUESTIONS, text, journal=path) == {}
+    assert read_journal(path) == [
+        {"path": "title", "answer": "Guide"},
+        {"path": "books.0", "answer": "Dune"},
+        {"path": "books.1", "more": True},
+        {"path": "books.1", "answer": "Hyperion"},
+    ]
+
+    text = "n" + "Frank Herbert" + KeyInputs.ENTER
+    assert patched_prompt(QUESTIONS, text, journal=path, resume=True) == {
+        "title": "Guide",
+        "books": ["Dune", "Hyperion"],
+        "author": "Frank Herbert",
+    }
+    assert read_journal(path)[-2:] == [
+        {"path": "books.2", "more": False},
+        {"path": "author", "answer": "Frank Herbert"},
+    ]
+
+
+def test_journal_passwords(tmp_path):
+    """Test passwords aren't journaled and are asked again when the run is resumed"""
+    path = tmp_path / "journal.jsonl"
+    questions = [
+        {"name": "user", "type": "text", "message": "User?"},
+        {"name": "pw", "type": "password", "message": "Password?"},
+        {"name": "host", "type": "text", "message": "Host?"},
+    ]
+    text = "anne" + KeyInputs.ENTER + "hunter2" + KeyInputs.ENTER + KeyInputs.CONTROLC
+    assert patched_prompt(questions, text, journal=path) == {}
+    assert "hunter2" not in path.read_text(encoding="utf-8")
+    assert read_journal(path) == [
+        {"path": "user", "answer": "anne"},
+        {"path": "pw", "answer": None, "secret": True},
+    ]
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    text = "hunter3" + KeyInputs.ENTER + "local" + KeyInputs.ENTER
+    assert patched_prompt(questions, text, journal=path, resume=True) == {
+        "user": "anne",
+        "pw": "hunter3",
+        "host": "local",
+    }
+    assert read_journal(path)[-1] == {"path": "host", "answer": "local"}
+
+
+def test_resume_diverged(tmp_path):
+    """Test replay stops at the first answer that doesn't match the questions"""
+    path = tmp_path / "journal.jsonl"
+    path.write_text(
+        '{"path": "title", "answer": "Guide"}\n'
+        '{"path": "subtitle", "answer": "Old"}\n'
+        '{"path": "author", "answer": "Old"}\n'
+    )
+    text = "Dune" + KeyInputs.ENTER + "n" + "Frank Herbert" + KeyInputs.ENTER
+    result = patched_prompt(QUESTIONS, text, journal=path, resume=True)
+    assert result == {"title": "Guide", "books": ["Dune"], "author": "Frank Herbert"}
+    assert [record["path"] for record in read_journal(path)] == [
+        "title",
+        "books.0",
+        "books.1",
+        "author",
+    ]
+
+
+def test_resume_incomplete_line(tmp_path):
+    """Test a line left incomplete by a crash is ignored"""
+    path = tmp_path / "journal.jsonl"
+    path.write_text('{"path": "title", "answer": "Guide"}\n{"path": "books.0", "ans')
+    text = "Dune" + KeyInputs.ENTER + "n" + "Frank Herbert" + KeyInputs.ENTER
+    assert patched_prompt(QUESTIONS, text, journal=path, resume=True)["title"] == (
+        "Guide"
+    )
+    assert len(read_journal(path)) == 4
+
+
+def test_journal_sync_batches(tmp_path, monkeypatch):
+    """Test the journal is fsync()ed once per batch of answers and when closed"""
+    syncs = []
+    monkeypatch.setattr(superprompt.os, "fsync", syncs.append)
+    journal = superprompt.Journal(
+        tmp_path / "journal.jsonl", sync_records=3, sync_seconds=3600
+    )
+    for idx in range(7):
+        journal.record("answer", f"q{idx}", idx)
+    assert len(syncs) == 2
+    journal.close()
+    assert len(syncs) == 3
@@ -0,0 +1,127 @@
+"""Test lazily generated nested questions for superprompt"""
+
+import pytest
+
+import superprompt
+
+
+def test_callable_questions_called_when_reached():
+    """Test a questions callable is only called when its group is reached"""
+    calls = []
+
+    def questions(answers):
+        calls.append(dict(answers.root))
+        return [{"name": "size", "type": "text", "message": "Size?"}]
+
+    plan = superprompt.compile_questions(
+        {
+            "name": "drink",
+            "type": "confirm",
+            "message": "Drink?",
+            "if": [True, {"name": "order", "type": "dict", "questions": questions}],
+        }
+    )
+    assert calls == []
+    assert superprompt.superprompt(plan, responses={"drink": False}) == {"drink": False}
+    assert calls == []
+    result = superprompt.superprompt(
+        plan, responses={"drink": True, "order": {"size": "large"}}
+    )
+    assert result == {"drink": True, "order": {"size": "large"}}
+    assert calls == [{"drink": True}]
+
+
+def test_callable_if_questions():
+    """Test an 'if' branch may be a callable depending on earlier answers"""
+    questions = [
+        {"name": "count", "type": "text", "message": "How many?"},
+        {
+            "name": "more",
+            "type": "confirm",
+            "message": "More?",
+            "if": [
+                True,
+                lambda answers: [
+                    {"name": f"item{i}", "type": "text", "message": "Item?"}
+                    for i in range(int(answers["count"]))
+                ],
+            ],
+        },
+    ]
+    responses = {"count": "2", "more": True, "item0": "a", "item1": "b"}
+    assert superprompt.superprompt(questions, responses=responses) == responses
+
+
+def test_generator_questions_lazy_and_reusable():
+    """Test a generator of questions is consumed as the questions are reached and the
+    plan can be walked again"""
+    generated = []
+
+    def questions():
+        for name in ["first", "second", "third"]:
+            generated.append(name)
+            yield {"name": name, "type": "text", "message": f"{name}?"}
+
+    plan = superprompt.compile_questions(
+        {"name": "names", "type": "list", "questions": questions()}
+    )
+    assert generated == []
+    responses = {"names": ["a", "b", "c"]}
+    assert superprompt.superprompt(plan, responses=responses) == responses
+    assert generated == ["first", "second", "third"]
+    assert superprompt.superprompt(plan, responses=responses) == responses
+    assert generated == ["first", "second", "third"]
+
+
+def test_memoize():
+    """Test memoized questions are reused while the answers read are unchanged"""
+    calls = []
+
+    def questions(answers):
+        calls.append(answers.root["engine"])
+        return [{"name": "port", "type": "text", "message": "Port?"}]
+
+    plan = superprompt.compile_questions(
+        [
+            {"name": "engine", "type": "text", "message": "Engine?"},
+            {
+                "name": "database",
+                "type": "dict",
+                "memoize": True,
+                "questions": questions,
+            },
+        ]
+    )
+    for engine in ["postgres", "postgres", "mysql", "postgres"]:
+        responses = {"engine": engine, "database": {"port": "1"}}
+        assert superprompt.superprompt(plan, responses=responses) == responses
+    assert calls == ["postgres", "mysql"]
+
+
+def test_not_memoized_by_default():
+    """Test a questions callable is called every time its group is reached"""
+    calls = []
+
+    def questions(answers):
+        calls.append(True)
+        return {"name": "port", "type": "text", "message": "Port?"}
+
+    question = {"name": "database", "type": "dict", "questions": questions}
+    for _ in range(2):
+        superprompt.superprompt(question, responses={"database": {"port": "1"}})
+    assert len(calls) == 2
+
+
+def test_lazy_config_error():
+    """Test problems in lazily generated questions are raised when reached"""
+
+    def questions():
+        yield {"name": "ok", "type": "text", "message": "OK?"}
+        yield {"name": "no_type", "message": "No type"}
+
+    plan = superprompt.compile_questions(
+        {"name": "group", "type": "dict", "questions": questions()}
+    )
+    with pytest.raises(superprompt.QuestionConfigError) as excinfo:
+        superprompt.superprompt(plan, responses={"group": {"ok": "x"}})
+    assert [path for path, _ in excinfo.value.errors] == ["[0].questions[1]"]
@@ -0,0 +1,73 @@
+"""Test MemoryProfile"""
+
+import json
+import tracemalloc
+
+import superprompt
+
+QUESTIONS = [
+    {
+        "name": "order",
+        "type": "dict",
+        "questions": [
+            {"name": "small", "type": "text", "message": "Small?"},
+            {
+                "name": "big",
+                "type": "text",
+                "message": "Big?",
+                "multiple": 3,
+                "filter": lambda x: x * 100_000,
+            },
+        ],
+    },
+]
+RESPONSES = {"order": {"small": "a", "big": ["x", "y", "z"]}}
+
+
+def test_memory_profile(tmp_path):
+    """Test memory retained per question and group is reported"""
+    with superprompt.MemoryProfile() as profile:
+        superprompt.superprompt(QUESTIONS, responses=RESPONSES, on_event=profile)
+    assert not tracemalloc.is_tracing()
+
+    report = profile.report()
+    assert set(report) == {
+        "order",
+        "order.small",
+        "order.big.0",
+        "order.big.1",
+        "order.big.2",
+    }
+    assert report["order"]["kind"] == "group"
+    assert report["order.small"]["kind"] == "question"
+    for idx in range(3):
+        big = report[f"order.big.{idx}"]
+        assert big["count"] == 1
+        assert big["retained_bytes"] >= 100_000
+        assert big["peak_bytes"] >= big["retained_bytes"]
+    assert report["order"]["retained_bytes"] >= 300_000
+    assert report["order.small"]["retained_bytes"] < 10_000
+
+    path = tmp_path / "memory.json"
+    profile.write(path)
+    assert json.loads(path.read_text()) == report
+
+
+def test_memory_profile_snapshots():
+    """Test snapshots find the lines that retained memory"""
+    with superprompt.MemoryProfile(snapshots=True) as profile:
+        superprompt.superprompt(QUESTIONS, responses=RESPONSES, on_event=profile)
+    top = profile.report()["order.big.0"]["top"]
+    assert max(top.values()) >= 100_000
+    assert any(line.startswith("test_memory.py:") for line in top)
+
+
+def test_memory_profile_already_tracing():
+    """Test tracing started elsewhere is left running"""
+    tracemalloc.start()
+    try:
+        with superprompt.MemoryProfile() as profile:
+            superprompt.superprompt(QUESTIONS, responses=RESPONSES, on_event=profile)
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,109 @@
+"""Test entering the values of multiple questions in one batch for superprompt"""
+
+import pytest
+
+import superprompt
+from tests.utils import KeyInputs, patched_prompt
+
+
+def is_host(value):
+    return "." in value or f"{value} is not a host name"
+
+
+def test_batch_lines():
+    """Test values entered one per line at a single prompt"""
+    question = {
+        "name": "hosts",
+        "type": "text",
+        "message": "Hosts?",
+        "multiple": -5,
+        "multiple_batch": True,
+        "validate": is_host,
+        "filter": str.upper,
+    }
+    inputs = "a.com" + KeyInputs.ENTER + "b.org" + KeyInputs.ENTER
+    inputs += KeyInputs.ESCAPE + KeyInputs.ENTER
+    assert patched_prompt([question], inputs) == {"hosts": ["A.COM", "B.ORG"]}
+
+
+def test_batch_separator_exact():
+    """Test separated values must number exactly 'multiple', checked at the prompt"""
+    question = {
+        "name": "tags",
+        "type": "text",
+        "message": "Tags?",
+        "multiple": 3,
+        "multiple_batch": ",",
+    }
+    # the first entry is rejected, so the prompt stays open for more typing
+    inputs = "a, b" + KeyInputs.ENTER + ", c" + KeyInputs.ENTER
+    assert patched_prompt([question], inputs) == {"tags": ["a", "b", "c"]}
+
+
+def test_batch_headless():
+    """Test headless answers to a batch question are validated as a whole"""
+    question = {
+        "name": "hosts",
+        "type": "text",
+        "message": "Hosts?",
+        "multiple": -2,
+        "multiple_batch": True,
+        "validate": is_host,
+    }
+    run = superprompt.superprompt
+    assert run(question, responses={"hosts": ["a.com"]}) == {"hosts": ["a.com"]}
+    assert run(question, responses={"hosts": "a.com\nb.org"}) == {
+        "hosts": ["a.com", "b.org"]
+    }
+    assert run(question, responses={}) == {"hosts": []}
+    with pytest.raises(superprompt.ResponseError, match="at most 2 values, got 3"):
+        run(question, responses={"hosts": ["a.com", "b.org", "c.net"]})
+    with pytest.raises(superprompt.ResponseError, match=r"Value 2 \(b\): b is not"):
+        run(question, responses={"hosts": ["a.com", "b"]})
+
+
+def test_batch_values_readable():
+    """Test later questions can read the values, and each value by number"""
+    questions = [
+        {
+            "name": "hosts",
+            "type": "text",
+            "message": "Hosts?",
+            "multiple": -3,
+            "multiple_batch": ",",
+        },
+        {
+            "name": "primary",
+            "type": "text",
+            "message": "Primary?",
+            "default": lambda answers: answers["hosts.1"],
+        },
+    ]
+    result = superprompt.superprompt(questions, responses={"hosts": "a, b"})
+    assert result == {"hosts": ["a", "b"], "primary": "b"}
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        {"name": "a", "type": "text", "message": "?", "multiple_batch": True},
+        {
+            "name": "a",
+            "type": "confirm",
+            "message": "?",
+            "multiple": 2,
+            "multiple_batch": True,
+        },
+        {
+            "name": "a",
+            "type": "text",
+            "message": "?",
+            "multiple": 2,
+            "multiple_batch": 1,
+        },
+    ],
+)
+def test_batch_invalid(question):
+    """Test multiple_batch needs multiple, a text question and a separator"""
+    with pytest.raises(superprompt.QuestionConfigError):
+        superprompt.compile_questions(question)
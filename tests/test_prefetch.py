@@ -0,0 +1,123 @@
+"""Test background prefetch of choices and defaults for superprompt"""
+
+import threading
+
+import superprompt
+from tests.utils import KeyInputs, patched_prompt
+
+
+def recording(calls, result):
+    """Return a provider that records the thread it was called on"""
+
+    def provider(answers):
+        calls.append(threading.current_thread().name)
+        return result(answers) if callable(result) else result
+
+    return provider
+
+
+def test_prefetched_choices_and_default_used():
+    """Test providers of the next questions are called in the background, once"""
+    choice_calls, default_calls = [], []
+    questions = [
+        {"name": "remote", "type": "text", "message": "Remote?"},
+        {
+            "name": "branch",
+            "type": "select",
+            "message": "Branch?",
+            "choices": recording(choice_calls, ["main", "dev"]),
+        },
+        {
+            "name": "user",
+            "type": "text",
+            "message": "User?",
+            "default": recording(default_calls, "anne"),
+        },
+    ]
+    inputs = "origin" + KeyInputs.ENTER + KeyInputs.DOWN + KeyInputs.ENTER
+    inputs += KeyInputs.ENTER
+    result = patched_prompt(questions, inputs, prefetch=2)
+    assert result == {"remote": "origin", "branch": "dev", "user": "anne"}
+    assert len(choice_calls) == 1 and len(default_calls) == 1
+    assert choice_calls[0].startswith("superprompt-prefetch")
+    assert default_calls[0].startswith("superprompt-prefetch")
+
+
+def test_prefetch_redone_when_answers_read_change():
+    """Test a prefetched result isn't used if an answer it read has changed"""
+    calls = []
+    questions = [
+        {"name": "remote", "type": "text", "message": "Remote?"},
+        {
+            "name": "branch",
+            "type": "select",
+            "message": "Branch?",
+            "choices": recording(calls, lambda answers: [f"{answers['remote']}/main"]),
+        },
+    ]
+    result = patched_prompt(
+        questions, "origin" + KeyInputs.ENTER + KeyInputs.ENTER, prefetch=1
+    )
+    assert result == {"remote": "origin", "branch": "origin/main"}
+    assert calls[0].startswith("superprompt-prefetch")
+    assert calls[1:] == ["MainThread"]
+
+
+def test_prefetch_cancelled_for_branch_not_taken():
+    """Test the prefetch for an 'if' branch that isn't taken is cancelled"""
+    release = threading.Event()
+    branch_calls = []
+
+    def slow_choices(answers):
+        release.wait(5)
+        return ["a", "b"]
+
+    questions = [
+        {
+            "name": "custom",
+            "type": "confirm",
+            "message": "Custom?",
+            "if": [
+                True,
+                [
+                    {
+                        "name": "flavour",
+                        "type": "select",
+                        "message": "Flavour?",
+                        "choices": recording(branch_calls, ["x"]),
+                    }
+                ],
+            ],
+        },
+        {"name": "size", "type": "select", "message": "Size?", "choices": slow_choices},
+    ]
+
+    def on_event(event):
+        # the single prefetch thread is busy with slow_choices until size is reached
+        if event.kind == "question_start" and event.path == "size":
+            release.set()
+
+    result = patched_prompt(
+        questions, "n" + KeyInputs.ENTER, prefetch=1, on_event=on_event
+    )
+    assert result == {"custom": False, "size": "a"}
+    assert branch_calls == []
+
+
+def test_prefetch_ignored_headless():
+    """Test providers are called when their question is reached in headless mode"""
+    calls = []
+    questions = [
+        {"name": "remote", "type": "text", "message": "Remote?"},
+        {
+            "name": "branch",
+            "type": "select",
+            "message": "Branch?",
+            "choices": recording(calls, ["main"]),
+        },
+    ]
+    responses = {"remote": "origin", "branch": "main"}
+    assert superprompt.superprompt(questions, responses=responses, prefetch=2) == (
+        responses
+    )
+    assert calls == ["MainThread"]
@@ -0,0 +1,106 @@
+"""Test the output of print questions for superprompt"""
+
+import io
+
+from prompt_toolkit.application import create_app_session
+from prompt_toolkit.data_structures import Size
+from prompt_toolkit.input.defaults import create_pipe_input
+from prompt_toolkit.output.vt100 import Vt100_Output
+
+import superprompt
+from tests.utils import KeyInputs
+
+
+class CountingStream(io.StringIO):
+    """Terminal stream that counts flushes"""
+
+    def __init__(self):
+        super().__init__()
+        self.flushes = 0
+
+    def flush(self):
+        self.flushes += 1
+
+    def isatty(self):
+        return True
+
+
+def run(questions, text="", **kwargs):
+    """Answer questions with text; return the answers and the output stream"""
+    stream = CountingStream()
+    output = Vt100_Output(stream, lambda: Size(rows=24, columns=80), term="xterm")
+    with create_pipe_input() as inp, create_app_session(output=output):
+        inp.send_text(text)
+        answers = superprompt.superprompt(questions, input=inp, output=output, **kwargs)
+    return answers, stream
+
+
+def test_consecutive_prints_one_flush():
+    """Test consecutive prints are written together, before the next prompt"""
+    questions = [
+        {"type": "print", "message": "Welcome"},
+        {"type": "print", "message": "to the", "style": "bold"},
+        {"name": "hello", "type": "print", "message": "setup", "end": "!\n"},
+    ]
+    answers, stream = run(questions)
+    assert answers == {"hello": None}
+    assert stream.flushes == 1
+    text = stream.getvalue()
+    assert text.index("Welcome\r\n") < text.index("to the") < text.index("setup!")
+    assert "\x1b[0;1m" in text
+
+
+def test_prints_before_prompt():
+    """Test prints are written before the prompt that follows them"""
+    questions = [
+        {"type": "print", "message": "Banner"},
+        {"type": "print", "message": "Help"},
+        {"name": "name", "type": "text", "message": "Name?"},
+        {"type": "print", "message": "Bye"},
+    ]
+    answers, stream = run(questions, "Anne" + KeyInputs.ENTER)
+    assert answers == {"name": "Anne"}
+    text = stream.getvalue()
+    assert text.index("Banner") < text.index("Help") < text.index("Name?")
+    assert text.rindex("Name?") < text.index("Bye")
+
+
+def test_prints_before_callables(monkeypatch):
+    """Test prints are written before the next question's callables are called"""
+    events = []
+    monkeypatch.setattr(
+        superprompt,
+        "_write_prints",
+        lambda prints: events.extend(message for message, _ in prints),
+    )
+
+    def regions(answers):
+        events.append("fetch")
+        return ["eu", "us"]
+
+    questions = [
+        {"type": "print", "message": "Fetching"},
+        {"type": "print", "message": "regions..."},
+        {"name": "region", "type": "select", "message": "Region?", "choices": regions},
+    ]
+    answers, _ = run(questions, KeyInputs.ENTER)
+    assert answers == {"region": "eu"}
+    assert events == ["Fetching", "regions...", "fetch"]
+
+
+def test_prints_not_repeated_going_back():
+    """Test going back doesn't write the prints before the changed answer again"""
+    questions = [
+        {"type": "print", "message": "BANNER-ONE"},
+        {"name": "first", "type": "text", "message": "First?"},
+        {"type": "print", "message": "BANNER-TWO"},
+        {"name": "second", "type": "text", "message": "Second?"},
+        {"name": "third", "type": "text", "message": "Third?"},
+    ]
+    # go back from third to change second
+    text = "a" + KeyInputs.ENTER + "b" + KeyInputs.ENTER + "\x1b[Z"
+    text += "\x7fc" + KeyInputs.ENTER + "d" + KeyInputs.ENTER
+    answers, stream = run(questions, text, back_key="s-tab")
+    assert answers == {"first": "a", "second": "c", "third": "d"}
+    assert stream.getvalue().count("BANNER-ONE") == 1
+    assert stream.getvalue().count("BANNER-TWO") == 1
@@ -0,0 +1,118 @@
+"""Test the search_select question type for superprompt"""
+
+import time
+
+import pytest
+
+import superprompt
+from tests.utils import KeyInputs, patched_prompt
+
+REPOS = ["api-gateway", "billing", "web-frontend", "mobile-app", "data-pipeline"]
+
+
+def test_search_select_type_to_filter():
+    """Test typing filters the choices and enter accepts the pointed choice"""
+    question = {
+        "name": "repo",
+        "type": "search_select",
+        "message": "Repository?",
+        "choices": REPOS,
+    }
+    assert patched_prompt(question, "app" + KeyInputs.ENTER) == {"repo": "mobile-app"}
+    assert patched_prompt(question, "I" + KeyInputs.DOWN + KeyInputs.ENTER) == {
+        "repo": "billing"
+    }
+    inputs = "pi" + KeyInputs.DOWN + KeyInputs.BACK + KeyInputs.BACK + KeyInputs.ENTER
+    assert patched_prompt(question, inputs) == {"repo": "api-gateway"}
+
+
+def test_search_select_values_and_default():
+    """Test mapping choices return their value and default sets the pointer"""
+    question = {
+        "name": "repo",
+        "type": "search_select",
+        "message": "Repository?",
+        "choices": [{"name": name, "value": n} for n, name in enumerate(REPOS)],
+        "default": 3,
+    }
+    assert patched_prompt(question, KeyInputs.ENTER) == {"repo": 3}
+    assert patched_prompt(question, KeyInputs.DOWN + KeyInputs.ENTER) == {"repo": 4}
+
+
+def test_search_select_multiselect():
+    """Test space selects choices with multiselect"""
+    question = {
+        "name": "repos",
+        "type": "search_select",
+        "message": "Repositories?",
+        "choices": superprompt.ChoiceIndex(REPOS),
+        "multiselect": True,
+    }
+    inputs = KeyInputs.SPACE + "front" + KeyInputs.SPACE + KeyInputs.ENTER
+    assert patched_prompt(question, inputs) == {
+        "repos": ["api-gateway", "web-frontend"]
+    }
+
+
+def test_search_select_headless():
+    """Test headless answers must be one of the choices"""
+    question = {
+        "name": "repos",
+        "type": "search_select",
+        "message": "Repositories?",
+        "choices": superprompt.ChoiceIndex(REPOS),
+        "multiselect": True,
+    }
+    responses = {"repos": ["billing"]}
+    assert superprompt.superprompt(question, responses=responses) == responses
+    with pytest.raises(superprompt.ResponseError):
+        superprompt.superprompt(question, responses={"repos": ["unknown"]})
+    with pytest.raises(superprompt.ResponseError):
+        superprompt.superprompt(question, responses={"repos": "billing"})
+
+
+def test_choice_index_search():
+    """Test the index finds every title containing the query, in order"""
+    titles = [f"{word}-{n}" for n in range(200) for word in ("alpha", "beta")]
+    index = superprompt.ChoiceIndex(titles)
+    for query in ["", "a", "ph", "alp", "ALPHA-1", "ta-19", "zzz", "-19"]:
+        expected = [i for i, title in enumerate(titles) if query.lower() in title]
+        assert list(index.search(query)) == expected
+
+
+def test_choice_index_search_no_match():
+    """Test a longer query whose trigrams are common but never together is answered
+    without checking the choices, and mixes of common and rare trigrams still match"""
+    checked = []
+
+    class Titles(list):
+        def __getitem__(self, i):
+            checked.append(i)
+            return super().__getitem__(i)
+
+    titles = [f"{'abc' if n % 2 else 'bcd'}-{n}" for n in range(20_000)]
+    index = superprompt.ChoiceIndex(titles)
+    index._lower = Titles(index._lower)
+    assert list(index.search("abcd")) == []
+    assert checked == []
+    for query in ["abc-1", "bcd-1234", "c-19", "abc-19999", "d-2"]:
+        expected = [i for i, title in enumerate(titles) if query in title]
+        assert list(index.search(query)) == expected
+
+
+def test_search_window_time_does_not_grow():
+    """Test a keystroke's search only finds the matches in the visible window"""
+
+    def keystroke_time(size):
+        index = superprompt.ChoiceIndex(f"repo-{n:07d}" for n in range(size))
+        state = superprompt._SearchState(index, 10, False, None)
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            for query in ["r", "re", "rep", "repo", "repo-", "repo-0"]:
+                state.set_query(query)
+                state.window(">")
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    assert keystroke_time(100_000) < keystroke_time(1_000) * 20 + 0.01
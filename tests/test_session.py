@@ -0,0 +1,49 @@
+"""Test session option for superprompt"""
+
+import prompt_toolkit
+
+import superprompt
+from tests.test_comprehensive import ANSWERS, QUESTIONS, RESPONSE
+from tests.utils import KeyInputs, patched_prompt
+
+
+def test_session_comprehensive():
+    """Test session gives same result as separate applications"""
+    # answer the "Add another book?" confirm prompts too
+    answers = ANSWERS.replace(
+        "Frank Herbert" + KeyInputs.ENTER, "Frank Herbert" + KeyInputs.ENTER + "y"
+    )
+    answers += "n"
+    assert patched_prompt(QUESTIONS, answers, session=True) == RESPONSE
+
+
+def test_session_single_application(monkeypatch):
+    """Test every question runs in the session's application"""
+    ran = []
+    run = prompt_toolkit.Application.run
+
+    def patched_run(self, *args, **kwargs):
+        ran.append(self)
+        return run(self, *args, **kwargs)
+
+    monkeypatch.setattr(prompt_toolkit.Application, "run", patched_run)
+
+    session = superprompt.QuestionSession()
+    questions = [
+        {"name": "title", "type": "text", "message": "Title?"},
+        {"name": "ok", "type": "confirm", "message": "OK?"},
+        {"name": "color", "type": "select", "message": "Color?", "choices": ["a", "b"]},
+        {
+            "name": "books",
+            "type": "text",
+            "message": "Book?",
+            "multiple": -2,
+            "multiple_message": "Another?",
+        },
+    ]
+    answers = "Dune" + KeyInputs.ENTER + "y" + KeyInputs.DOWN + KeyInputs.ENTER
+    answers += "A" + KeyInputs.ENTER + "y" + "B" + KeyInputs.ENTER
+    result = patched_prompt(questions, answers, session=session)
+    assert result == {"title": "Dune", "ok": True, "color": "b", "books": ["A", "B"]}
+    assert len(ran) == 6
+    assert all(app is session.application for app in ran)
@@ -0,0 +1,158 @@
+"""Test asynchronous, debounced validators for superprompt"""
+
+import asyncio
+import threading
+
+import pytest
+
+import superprompt
+from tests.utils import KeyInputs, patched_prompt
+
+TAKEN = {"root", "admin"}
+
+
+def username_question(validate):
+    return {"name": "user", "type": "text", "message": "User?", "validate": validate}
+
+
+def test_coroutine_validator():
+    """Test a coroutine function validator is checked once per distinct value"""
+    checked = []
+
+    async def available(text):
+        checked.append(text)
+        await asyncio.sleep(0)
+        return text not in TAKEN or f"{text} is taken"
+
+    plan = superprompt.compile_questions(username_question(available))
+    inputs = "root" + KeyInputs.ENTER + KeyInputs.BACK * 4 + "anne" + KeyInputs.ENTER
+    assert patched_prompt(plan, inputs) == {"user": "anne"}
+    assert "root" in checked and "anne" in checked
+    assert len(checked) == len(set(checked))
+
+    # verdicts are kept with the plan
+    del checked[:]
+    assert patched_prompt(plan, "anne" + KeyInputs.ENTER) == {"user": "anne"}
+    assert "anne" not in checked
+
+
+def test_threaded_validator():
+    """Test a validator marked for a thread is checked on a worker thread"""
+    threads = []
+
+    def available(text):
+        threads.append(threading.current_thread())
+        return text not in TAKEN
+
+    validation = superprompt.AsyncValidation(available, debounce=0, thread=True)
+    verdict = asyncio.run(validation.check("root", lambda: False))
+    assert verdict == superprompt.INVALID_INPUT
+    assert threads[0] is not threading.main_thread()
+    assert asyncio.run(validation.check("root", lambda: False)) == verdict
+    assert len(threads) == 1
+
+    assert patched_prompt(username_question(validation), "anne\r") == {"user": "anne"}
+
+
+def test_stale_check_kept():
+    """Test a check whose text changes before it finishes is kept, not repeated"""
+    checked = []
+    release = threading.Event()
+
+    def slow(text):
+        checked.append(text)
+        release.wait(5)
+        return True
+
+    validation = superprompt.AsyncValidation(slow, debounce=0, thread=True)
+
+    async def check_then_edit():
+        changed = []
+        task = asyncio.ensure_future(validation.check("ann", lambda: bool(changed)))
+        await asyncio.sleep(0.01)
+        changed.append(True)
+        verdict = await task
+        # the same value is checked again while the first check is still running
+        again = asyncio.ensure_future(validation.check("ann", lambda: False))
+        await asyncio.sleep(0.01)
+        release.set()
+        return verdict, await again
+
+    assert asyncio.run(check_then_edit()) == (superprompt._MISSING, True)
+    assert checked == ["ann"]
+    assert validation("ann") is True
+    assert checked == ["ann"]
+
+
+def test_enter_waits_for_check():
+    """Test validating synchronously, as enter does, shares a check in progress"""
+    calls = []
+
+    async def slow(text):
+        calls.append(text)
+        await asyncio.sleep(0.05)
+        return text != "root"
+
+    validation = superprompt.AsyncValidation(slow, debounce=0)
+
+    async def check_and_enter():
+        task = asyncio.ensure_future(validation.check("root", lambda: False))
+        await asyncio.sleep(0.01)
+        entered = validation("root")
+        return entered, await task
+
+    assert asyncio.run(check_and_enter()) == ((superprompt.INVALID_INPUT,) * 2)
+    assert calls == ["root"]
+
+
+def test_verdict_ttl(monkeypatch):
+    """Test verdicts are checked again once older than ttl"""
+    now = [100.0]
+    monkeypatch.setattr(superprompt.time, "monotonic", lambda: now[0])
+    checked = []
+    validation = superprompt.AsyncValidation(checked.append, ttl=60)
+    validation("anne")
+    now[0] += 30
+    validation("anne")
+    assert checked == ["anne"]
+    now[0] += 31
+    validation("anne")
+    assert checked == ["anne", "anne"]
+
+
+def test_debounce():
+    """Test the text isn't checked if it changes during the debounce time"""
+    checked = []
+    validation = superprompt.AsyncValidation(checked.append, debounce=0.05)
+    assert asyncio.run(validation.check("a", lambda: True)) is superprompt._MISSING
+    assert checked == []
+
+
+def test_verdict_cache_lru():
+    """Test the least recently used verdicts are evicted"""
+    checked = []
+
+    def available(text):
+        checked.append(text)
+        return True
+
+    validation = superprompt.AsyncValidation(available, maxsize=2)
+    for text in ["a", "b", "a", "c", "a", "b"]:
+        assert validation(text) is True
+    assert checked == ["a", "b", "c", "b"]
+
+
+def test_async_validator_headless():
+    """Test coroutine validators check headless answers, also inside an event loop"""
+
+    async def available(text):
+        return text not in TAKEN or f"{text} is taken"
+
+    question = username_question(available)
+    with pytest.raises(superprompt.ResponseError, match="root is taken"):
+        superprompt.superprompt(question, responses={"user": "root"})
+
+    async def run():
+        return await superprompt.superprompt_async(question, responses={"user": "anne"})
+
+    assert asyncio.run(run()) == {"user": "anne"}
@@ -121,6 +121,9 @@ def mock_confirm(answers: list[str]):
         def ask(self):
             return next(self)
 
+        def unsafe_ask(self, patch_stdout=False):
+            return next(self)
+
         def __iter__(self):
             return self
 